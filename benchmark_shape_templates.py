@@ -0,0 +1,61 @@
+import timeit
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+import numpy as np
+from lib_graphic import *
+
+# Micro-benchmark of the cached unit-shape templates of lib_graphic against recomputing the shapes on every call,
+# as arc_sector, arc_arrow and cg_sign did before.
+
+n_calls = 500
+n_draws = 100 # calls of the benchmarks that include a canvas draw
+fig, ax = plt.subplots()
+
+def recomputed_arc_points(center, radius, theta1, theta2, res=50):
+    """arc points regenerated from linspace, cos and sin on every call"""
+    theta = np.linspace(np.radians(theta1), np.radians(theta2), res)
+    return np.vstack((radius*np.cos(theta) + center[0],
+                      radius*np.sin(theta) + center[1]))
+
+previous_patches = []
+
+def recomputed_cg_sign(center, radius=0.1):
+    """a new circle and two new sector polygons per call, replacing the ones of the previous call"""
+    for patch in previous_patches:
+        patch.remove()
+    circle = plt.Circle(center, radius, facecolor=(1,1,1,0), edgecolor="black", linewidth=0.5)
+    ax.add_patch(circle)
+    sectors = []
+    for (theta1, theta2) in ((90, 180), (270, 360)):
+        points = recomputed_arc_points(center, radius, theta1, theta2)
+        points = np.concatenate((points, np.array([[center[0], center[1]]]).T), axis=1)
+        sectors.append(ax.add_patch(mpatches.Polygon(points.T, closed=True, fill=True, color='black')))
+    previous_patches[:] = [circle] + sectors
+
+(placement, patches) = cg_sign(radius=0.1, ax=ax)
+centers = np.random.default_rng(0).uniform(-5, 5, size=(n_calls, 2))
+
+def run(label, func, number=n_calls):
+    """time func over the first number centers and print the cost per call"""
+    i = iter(range(number))
+    seconds = timeit.timeit(lambda: func(centers[next(i)]), number=number) / number
+    print("%-40s %8.2f us/call" % (label, seconds * 1e6))
+    return seconds
+
+print("arc of 50 points, per call:")
+t_old = run("  linspace + cos + sin", lambda c: recomputed_arc_points(c, 0.2, 0, 180))
+t_new = run("  cached unit arc, scaled", lambda c: arc_points(c, 0.2, 0, 180))
+print("  speed-up: %.1fx" % (t_old / t_new))
+
+print("CG sign, per frame:")
+t_old = run("  new circle and sectors", lambda c: recomputed_cg_sign(c))
+t_new = run("  move_placement of the cached sign", lambda c: move_placement(placement, c, 0.1))
+print("  speed-up: %.1fx" % (t_old / t_new))
+
+print("CG sign, per frame including the draw:")
+t_old = run("  new circle and sectors", lambda c: (recomputed_cg_sign(c), fig.canvas.draw()), n_draws)
+t_new = run("  move_placement of the cached sign", lambda c: (move_placement(placement, c, 0.1), fig.canvas.draw()),
+            n_draws)
+print("  speed-up: %.1fx" % (t_old / t_new))
@@ -4,6 +4,8 @@ from matplotlib.animation import FuncAnimation
 from matplotlib.widgets import Slider
 from vehicle2d_dual_track import *
 from vehicle_plot import *
+from vehicle_renderer import *
+from vehicle_timeline import *
 
 # Set up the animation parameters
 min_time = 0
@@ -18,14 +20,21 @@ y_max = 5
 v = vehicle2d_dual_track()
 p = vehicle_plot(v, csv_data_file='drift_data.csv')
 
-# Set up the figure and axis
-fig, ax = plt.subplots()
+# Set up the figure with the vehicle view on top of a timeline of the tire forces
+fig, (ax, ax_timeline) = plt.subplots(2, 1, figsize=(6.4, 8), gridspec_kw={'height_ratios': (3, 1)})
 ax.set_aspect('equal')  # Set aspect ratio to maintain proper scaling
 ax.set_xlim(x_min, x_max)
 ax.set_ylim(y_min, y_max)
 
-# Create an initial empty vehicle plot
-initial_vehicle_plot, = ax.plot([], [], 'b')
+# Create the vehicle artists once, the slider only moves them
+r = vehicle_renderer(v, ax=ax, z_up=-1)
+r.init_artists()
+
+# The timeline draws a min/max/mean summary of the whole log at the width of the panel, zooming in (e.g. with the
+# toolbar) fetches finer levels down to the full resolution samples
+pyramid = lod_pyramid(p, fields=('Fy_0', 'Fy_1', 'Fy_2', 'Fy_3'))
+timeline = timeline_panel(pyramid, pyramid.fields, ax=ax_timeline)
+timeline.init_artists()
 
 # Create a slider
 ax_slider = plt.axes([0.25, 0.02, 0.65, 0.03])
@@ -33,12 +42,9 @@ time_slider = Slider(ax_slider, 'Time', min_time, max_time, valinit=min_time)
 
 # Function to update the plot based on slider
 def slider_update(val):
-    ax.clear()
     p.update_vehicle_by_time(val)
-    # v.draw_veh_body(ax=ax, z_up=-1)
-    v.draw_vehicle(ax=ax, z_up=-1)
-    ax.set_xlim(x_min, x_max)
-    ax.set_ylim(y_min, y_max)
+    r.update()
+    timeline.set_cursor(val)
     fig.canvas.draw_idle()
 
 # Link the slider update function
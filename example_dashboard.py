@@ -0,0 +1,13 @@
+import matplotlib.pyplot as plt
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_dashboard import *
+
+# Vehicle view next to the per-wheel Fx, Fy and Alpha of the log, click or drag on a time series (or press the
+# left/right arrow keys) to move the cursor of every panel
+v = vehicle2d_dual_track()
+p = vehicle_plot(v, csv_data_file='drift_data.csv')
+d = vehicle_dashboard(p, view_limits=((-5, 5), (-5, 5)))
+d.set_time(8.5)
+
+plt.show()
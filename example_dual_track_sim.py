@@ -0,0 +1,26 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_animation import *
+from vehicle_sim import *
+
+# Regenerate drift-style logs of one four-wheel vehicle from 200 initial conditions: speed, sideslip and yaw rate
+n = 200
+rng = np.random.default_rng(0)
+initial_states = np.vstack((np.zeros((3, n)), rng.uniform(5, 15, n), rng.uniform(-1, 1, n), rng.uniform(-0.3, 0.3, n)))
+v = vehicle2d_dual_track()
+sim = dual_track_sim(v)
+# rear wheel drive with a steady steering angle
+result = sim.simulate(np.arange(0, 5, 0.005), initial_state=initial_states, steering=0.1, wheel_torques=(0, 0, 300, 300))
+result.write_csv('dual_track_{}.csv', vehicle_nums=range(3))
+
+# Play back the first vehicle like a recorded log
+p = vehicle_plot(v, data_source=result.data_source(0), world_frame=True)
+fig, ax = plt.subplots()
+ax.set_aspect('equal')
+a = vehicle_animation(p, ax=ax, z_up=-1, step_by='time', time_step=1/30, draw_trace=True, follow=True,
+                      view_size=(12, 12))
+anim = a.animate(fig=fig, blit=False)
+
+plt.show()
@@ -0,0 +1,37 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.widgets import Slider
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_sim import *
+from vehicle_fleet import *
+
+# 20 single-track runs of the same sine steer with increasing front cornering stiffness, logged at 100 Hz (even
+# runs) or 20 Hz (odd runs) and laid side by side, replayed with one time cursor
+n = 20
+front_stiffness = np.linspace(80000, 240000, n)
+sim = single_track_sim(cornering_stiffness=np.column_stack((front_stiffness, np.full(n, 190000))))
+initial_states = np.tile(np.array([[0], [0], [0], [15], [0], [0]]), (1, n))
+result = sim.simulate(np.arange(0, 8, 0.01), initial_state=initial_states, steering=lambda t: 0.05 * np.sin(1.5 * t))
+
+v = vehicle2d_dual_track()
+fig, ax = plt.subplots(figsize=(10, 6))
+s = fleet_scene(ax=ax)
+for i in range(n):
+    data = result.to_frame(i)
+    data = data if i % 2 == 0 else data.iloc[::5] # a slower logger
+    s.add_run(vehicle_plot(v, data_source=csv_data_source(data)), offset=(0, 4 * i),
+              label='%d N/rad' % front_stiffness[i] if i in (0, n - 1) else None)
+s.init_artists()
+s.legend(loc='upper left')
+
+ax_slider = plt.axes([0.25, 0.02, 0.65, 0.03])
+time_slider = Slider(ax_slider, 'Time', *s.time_range(), valinit=0)
+
+def slider_update(val):
+    s.set_time(val)
+    fig.canvas.draw_idle()
+
+time_slider.on_changed(slider_update)
+
+plt.show()
@@ -0,0 +1,24 @@
+import matplotlib.pyplot as plt
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_renderer import *
+from vehicle_live import *
+
+# Stream drift_data.csv at twice the real time through a local replay server and watch it live, the same
+# live_data_source reads a running simulator that serves (or sends over UDP, or pipes) its rows as csv text:
+#   python vehicle_live.py drift_data.csv --speed 2
+server = replay_server('drift_data.csv', speed=2, port=5005).start()
+source = live_data_source(capacity=10000).start('tcp://127.0.0.1:5005')
+
+v = vehicle2d_dual_track()
+p = vehicle_plot(v, data_source=source, world_frame=True)
+fig, ax = plt.subplots()
+ax.set_aspect('equal')
+ax.set_xlim(-50, 50)
+ax.set_ylim(-50, 50)
+r = vehicle_renderer(v, ax=ax, z_up=-1, draw_trace=True)
+
+# at most 30 frames per second, always of the latest row
+view = live_view(p, r, max_fps=30).start()
+
+plt.show()
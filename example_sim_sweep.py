@@ -0,0 +1,27 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_ghost import *
+from vehicle_sim import *
+
+# Sweep the front cornering stiffness and the mass of 1000 single-track vehicles through the same sine steer
+n = 1000
+(front_stiffness, mass) = np.meshgrid(np.linspace(80000, 240000, 40), np.linspace(1200, 2200, 25))
+sim = single_track_sim(mass=mass.ravel(), cornering_stiffness=np.column_stack((front_stiffness.ravel(),
+                                                                               np.full(n, 190000))))
+times = np.arange(0, 8, 0.01)
+result = sim.simulate(times, steering=lambda t: 0.05 * np.sin(1.5 * t))
+
+# Paths of every 50th vehicle, X up as in the z-down convention
+fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
+for i in range(0, n, 50):
+    ax1.plot(result.states[1, i], result.states[0, i], linewidth=0.5)
+ax1.set_aspect('equal')
+
+# Each vehicle is a drift_data.csv layout log: ghost poses of the first one
+v = vehicle2d_dual_track()
+p = vehicle_plot(v, data_source=result.data_source(0), world_frame=True)
+vehicle_ghost(p, ax=ax2, z_up=-1).draw_poses(every=50)
+
+plt.show()
@@ -0,0 +1,12 @@
+import numpy as np
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_svg import *
+
+# Create a vehicle object and a vehicle plot object that places the vehicle at its logged (X, Y) position
+v = vehicle2d_dual_track()
+p = vehicle_plot(v, csv_data_file='drift_data.csv', world_frame=True)
+
+# Stream every 25th pose of the log to a vector file, older poses fade out
+with vehicle_svg(v, 'vehicle_poses.svg', xlim=(-60, 60), ylim=(-60, 60), width=8) as svg:
+    svg.write_rows(p, np.arange(0, len(p), 25), alpha_range=(0.2, 1.0))
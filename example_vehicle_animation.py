@@ -0,0 +1,26 @@
+import matplotlib.pyplot as plt
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_animation import *
+
+# Set up the animation parameters
+x_min = -5
+x_max = 5
+y_min = -5
+y_max = 5
+
+# Create a vehicle object and a vehicle plot object
+v = vehicle2d_dual_track()
+p = vehicle_plot(v, csv_data_file='drift_data.csv')
+
+# Set up the figure and axis
+fig, ax = plt.subplots()
+ax.set_aspect('equal')  # Set aspect ratio to maintain proper scaling
+ax.set_xlim(x_min, x_max)
+ax.set_ylim(y_min, y_max)
+
+# Play the drift run back in real time at 30 frames per second, redrawing only the vehicle artists
+a = vehicle_animation(p, ax=ax, z_up=-1, step_by='time', time_step=1/30)
+anim = a.animate(fig=fig, blit=True)
+
+plt.show()
@@ -0,0 +1,19 @@
+import matplotlib.pyplot as plt
+from vehicle2d_dual_track import *
+from vehicle_plot import *
+from vehicle_animation import *
+
+# Create a vehicle object and a vehicle plot object that places the vehicle at its logged (X, Y) position
+v = vehicle2d_dual_track()
+p = vehicle_plot(v, csv_data_file='drift_data.csv', world_frame=True)
+
+# Set up the figure and axis
+fig, ax = plt.subplots()
+ax.set_aspect('equal')  # Set aspect ratio to maintain proper scaling
+
+# Trace the path of the CG and keep the camera on the vehicle; the view moves, so blitting is off
+a = vehicle_animation(p, ax=ax, z_up=-1, step_by='time', time_step=1/30, draw_trace=True, follow=True,
+                      view_size=(12, 12))
+anim = a.animate(fig=fig, blit=False)
+
+plt.show()
@@ -0,0 +1,107 @@
+# vectorized vehicle geometry for many frames at once
+# All functions take arrays over N frames and return world frame points with shape (N, ..., 2), last axis (x, y).
+# The rotations are the same as the per-frame draw_* methods: body frame vectors are rotated back to the
+# world frame by the heading angle.
+import math
+import numpy as np
+
+def rotation_matrices(heading):
+    """returns the (N,2,2) rotation matrices from body (or tire) frame to world frame
+    heading: array of N heading angles in radians
+    """
+    heading = np.asarray(heading, dtype=np.float64)
+    c = np.cos(heading)
+    s = np.sin(heading)
+    return np.stack((np.stack((c, -s), axis=-1),
+                     np.stack((s, c), axis=-1)), axis=-2)
+
+def transform_points(points, heading, origin=None):
+    """rotate local points by heading and translate them to origin
+    points: (k,2) points shared by all frames, or (N,k,2) points per frame, in the local frame
+    heading: array of N heading angles in radians (any leading shape matching points)
+    origin: optional (N,2) (or matching leading shape) world frame position of the local frame origin
+    output:
+    (N,k,2) world frame points
+    """
+    heading = np.asarray(heading, dtype=np.float64)
+    c = np.cos(heading)[..., None]
+    s = np.sin(heading)[..., None]
+    points = np.asarray(points, dtype=np.float64)
+    x = points[..., 0]
+    y = points[..., 1]
+    out = np.stack((c * x - s * y, s * x + c * y), axis=-1)
+    if origin is not None:
+        out += np.asarray(origin, dtype=np.float64)[..., None, :]
+    return out
+
+def rectangle_outline(length, width):
+    """returns the (5,2) closed outline of a rectangle centered at the origin and aligned with the x axis"""
+    (a, b) = (length / 2, width / 2)
+    return np.array([[a, b], [a, -b], [-a, -b], [-a, b], [a, b]])
+
+def body_outlines(heading, body_size, position=None):
+    """returns the (N,5,2) vehicle body outlines
+    heading: array of N body headings in radians
+    body_size: (length, width) in meter
+    position: optional (N,2) world frame CG positions, default at the origin
+    """
+    return transform_points(rectangle_outline(*body_size), heading, position)
+
+def axle_centers(heading, front_to_cg, wheel_base, position=None):
+    """returns the (N,2,2) front and rear axle centers"""
+    b = wheel_base - front_to_cg
+    return transform_points(np.array([[front_to_cg, 0.0], [-b, 0.0]]), heading, position)
+
+def tire_centers(heading, front_to_cg, wheel_base, track_widths, position=None):
+    """returns the (N,4,2) tire centers in the fl, fr, rl, rr order of vehicle2d_dual_track"""
+    a = front_to_cg
+    b = wheel_base - front_to_cg
+    centers_bframe = np.array([[a, track_widths[0] / 2], [a, -track_widths[0] / 2],
+                               [-b, -track_widths[1] / 2], [-b, track_widths[1] / 2]])
+    return transform_points(centers_bframe, heading, position)
+
+def tire_outlines(centers, tire_headings, tire_size):
+    """returns the (N,m,5,2) tire outlines
+    centers: (N,m,2) tire centers in world frame
+    tire_headings: (N,m) tire headings in world frame
+    tire_size: (width, diameter) in meter
+    """
+    (w, d) = tire_size
+    outline = rectangle_outline(d, w)
+    return transform_points(outline, tire_headings, centers)
+
+def tire_x_axes(centers, tire_headings, dash_length=2):
+    """returns the (N,m,2,2) end points of the tire frame x axis lines"""
+    half = np.array([[0.5 * dash_length, 0.0], [-0.5 * dash_length, 0.0]])
+    return transform_points(half, tire_headings, centers)
+
+def vector_lines(starts, vectors_local, heading, scale=1.0):
+    """returns the (...,2,2) [start, end] lines of local frame vectors drawn from world frame start points
+    starts: (...,2) world frame start points
+    vectors_local: (...,2) vectors in the local frame
+    heading: (...) local frame heading in world frame
+    scale: divisor of the vector length (e.g. a force-length or velocity-length ratio)
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    vectors_local = np.asarray(vectors_local, dtype=np.float64) / scale
+    heading = np.asarray(heading, dtype=np.float64)
+    c = np.cos(heading)
+    s = np.sin(heading)
+    vx = vectors_local[..., 0]
+    vy = vectors_local[..., 1]
+    ends = starts + np.stack((c * vx - s * vy, s * vx + c * vy), axis=-1)
+    return np.stack((starts, ends), axis=-2)
+
+def tire_force_lines(centers, tire_headings, tire_forces, fl_ratio=2000):
+    """returns the (N,m,2,2) longitudinal and (N,m,2,2) lateral tire force arrow lines
+    centers: (N,m,2) tire centers in world frame
+    tire_headings: (N,m) tire headings in world frame
+    tire_forces: (N,m,2) tire forces (longitudinal, lateral) in tire frame, in Newton
+    fl_ratio: force(N)-length(m) ratio of the force arrows
+    """
+    tire_forces = np.asarray(tire_forces, dtype=np.float64)
+    zeros = np.zeros_like(tire_forces[..., 0])
+    fx = np.stack((tire_forces[..., 0], zeros), axis=-1)
+    fy = np.stack((zeros, tire_forces[..., 1]), axis=-1)
+    return (vector_lines(centers, fx, tire_headings, fl_ratio),
+            vector_lines(centers, fy, tire_headings, fl_ratio))
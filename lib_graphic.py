@@ -1,35 +1,222 @@
 # graphics library for plotting
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.transforms import Affine2D
+import functools
 import math
 import numpy as np
 
+# cached unit shapes, placed by an affine transform instead of being recomputed on every call
+@functools.lru_cache(maxsize=64)
+def unit_shape(kind, resolution=50, theta1=0, theta2=360):
+    """returns the (resolution,2) points of a shape of radius 1 centered at the origin, computed once per key
+    kind: 'arc' for the points on the arc from theta1 to theta2 (in degrees), 'sector' for the same arc closed
+    through the center (one more point)
+    resolution: number of points on the arc
+    The array is shared by every caller and therefore read-only: scale and translate it into a new array, or draw it
+    with the transform of shape_placement.
+    """
+    theta = np.linspace(np.radians(theta1), np.radians(theta2), resolution)
+    points = np.stack((np.cos(theta), np.sin(theta)), axis=-1)
+    if kind == 'sector':
+        points = np.vstack((points, [[0.0, 0.0]]))
+    elif kind != 'arc':
+        raise ValueError("unknown shape kind %r, expected 'arc' or 'sector'" % (kind,))
+    points.setflags(write=False)
+    return points
+
+def shape_placement(center=(0,0), radius=1):
+    """returns the Affine2D that scales a unit shape by radius and moves it to center (plotting coordinates)"""
+    return Affine2D().scale(radius).translate(center[0], center[1])
+
+def move_placement(placement, center, radius=1):
+    """move a shape_placement in place, every artist drawn through it follows without recomputing its path"""
+    return placement.clear().scale(radius).translate(center[0], center[1])
+
 # filled arc sector, inspired by https://stackoverflow.com/questions/30642391/how-to-draw-a-filled-arc-in-matplotlib
-def arc_sector(center, radius, theta1, theta2, ax=None, resolution=50, **kwargs):
+def arc_sector(center, radius, theta1, theta2, ax=None, resolution=50, placement=None, transform=None, **kwargs):
+    """draws a filled arc sector from the cached unit sector
+    placement: optional shape_placement shared with other shapes, replaces center and radius
+    transform: the transform from the frame of center to display, default to the data coordinates of ax
+    """
     # make sure ax is not empty
     if ax is None:
         ax = plt.gca()
-    # generate the points
-    theta = np.linspace(np.radians(theta1), np.radians(theta2), resolution) # 1xresolution row vector
-    points = np.vstack((radius*np.cos(theta) + center[0], 
-                        radius*np.sin(theta) + center[1])) # 2xresolution matrix
-    points = np.concatenate((points, np.array([[center[0],center[1]]]).T), axis=1) # add center to the points array
-    # build the polygon and add it to the axes
-    poly = mpatches.Polygon(points.T, closed=True, **kwargs)
+    if placement is None:
+        placement = shape_placement(center, radius)
+    # the polygon keeps the unit sector points, the placement maps them to the center and radius
+    if transform is None:
+        transform = ax.transData
+    poly = mpatches.Polygon(unit_shape('sector', resolution, theta1, theta2), closed=True,
+                            transform=placement + transform, **kwargs)
     ax.add_patch(poly)
     return poly
 
+# arc points on a circle
+def arc_points(center, radius, theta1, theta2, res=50):
+    """returns the 2xres matrix of points on an arc from theta1 to theta2 (in degrees)"""
+    return (radius * unit_shape('arc', res, theta1, theta2) + center).T # 2xresolution matrix
+
+# growing path trace
+class path_trace:
+    """a polyline that grows by appending points, drawn as a single LineCollection
+    The points are written into a preallocated buffer that doubles when full, so appending is amortized O(1). The
+    collection holds the trace as polyline pieces of at most piece_size points that are views into the buffer; only
+    the last piece changes when a point is appended, so a frame hands n/piece_size buffer views to one artist instead
+    of re-plotting the whole path.
+    """
+
+    def __init__(self, ax=None, piece_size=256, capacity=1024, **kwargs):
+        """
+        ax: Matplotlib axis to draw on.
+        piece_size: number of points per polyline piece of the collection
+        capacity: initial number of points of the buffer
+        kwargs: passed on to the LineCollection (e.g. colors, linewidths)
+        """
+        if ax is None:
+            ax = plt.gca()
+        kwargs.setdefault('colors', 'gray')
+        kwargs.setdefault('linewidths', 0.8)
+        self.piece_size = max(int(piece_size), 2)
+        self.points = np.empty((max(int(capacity), 2), 2))
+        self.n_points = 0
+        self.pieces = []
+        self.collection = LineCollection([], **kwargs)
+        ax.add_collection(self.collection)
+
+    def append(self, x, y):
+        """append one point (in plotting coordinates) to the trace"""
+        if self.n_points == len(self.points):
+            grown = np.empty((2 * len(self.points), 2))
+            grown[:self.n_points] = self.points[:self.n_points]
+            self.points = grown
+            # the pieces are views into the old buffer, rebuild them on the new one
+            self.pieces = [self.points[i:min(i + self.piece_size, self.n_points)]
+                           for i in range(0, max(self.n_points - 1, 1), self.piece_size - 1)]
+        self.points[self.n_points] = (x, y)
+        self.n_points += 1
+        # consecutive pieces share their end point, so the trace has no gaps
+        start = (len(self.pieces) - 1) * (self.piece_size - 1) if self.pieces else 0
+        if self.pieces and self.n_points - start > self.piece_size:
+            start += self.piece_size - 1
+            self.pieces.append(None)
+        elif not self.pieces:
+            self.pieces.append(None)
+        self.pieces[-1] = self.points[start:self.n_points]
+        self.collection.set_segments(self.pieces)
+
+    def reset(self):
+        """remove all points of the trace"""
+        self.n_points = 0
+        self.pieces = []
+        self.collection.set_segments([])
+
+# plotting coordinates under the z-up or z-down convention
+def xy_by_convention(points, z_up=-1):
+    """returns the (horizontal, vertical) plotting coordinates of a 2xN matrix of world frame points
+    z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+    In z-down convention the world x axis points up on the figure, so the two rows are swapped.
+    """
+    if z_up == 1:
+        return points[0], points[1]
+    return points[1], points[0]
+
+def points_by_convention(points, z_up=-1):
+    """returns an (...,2) array of world frame points in plotting coordinates (see xy_by_convention)"""
+    points = np.asarray(points)
+    return points if z_up == 1 else points[..., ::-1]
+
+# filled arrow outlines for many vectors at once
+def arrow_polygons(starts, ends, width=0.01, head_width=0.05, head_length=0.1):
+    """returns the (N,7,2) outlines of arrows from starts to ends, shaped like ax.arrow(length_includes_head=True)
+    starts, ends: (N,2) arrow tails and tips
+    width: width of the arrow shaft
+    head_width, head_length: size of the arrow head, the head is shortened for arrows shorter than head_length
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    d = ends - starts
+    length = np.hypot(d[:, 0], d[:, 1])
+    safe = np.where(length > 0, length, 1.0)
+    u = d / safe[:, None] # unit vector along the arrow
+    n = np.stack((-u[:, 1], u[:, 0]), axis=-1) # unit normal
+    hl = np.minimum(head_length, length)[:, None]
+    neck = ends - u * hl
+    (w, hw) = (width / 2, head_width / 2)
+    outline = np.stack((starts + n * w, neck + n * w, neck + n * hw, ends,
+                        neck - n * hw, neck - n * w, starts - n * w), axis=1)
+    # zero-length arrows collapse onto their start point instead of drawing a stray head
+    outline[length == 0] = starts[length == 0][:, None, :]
+    return outline
+
+# many filled arrows as one artist
+class arrow_collection:
+    """filled arrows for many vectors at once, drawn as a single PolyCollection
+    The arrow outlines are built as one numpy array by arrow_polygons, so N arrows cost one artist and one path
+    update instead of N FancyArrow patches. set_arrows() moves the arrows in place, e.g. once per animation frame.
+    """
+
+    def __init__(self, starts=(), ends=(), ax=None, colors='k', width=0.01, head_width=0.05, head_length=0.1,
+                 **kwargs):
+        """
+        starts, ends: (N,2) arrow tails and tips in plotting coordinates, may be empty and set later
+        ax: Matplotlib axis to draw on.
+        colors: one color or a list of N colors, used for both face and edge like ax.arrow(edgecolor, facecolor)
+        width, head_width, head_length: arrow shape, see arrow_polygons
+        kwargs: passed on to the PolyCollection (e.g. linewidths, zorder)
+        """
+        if ax is None:
+            ax = plt.gca()
+        self.width = width
+        self.head_width = head_width
+        self.head_length = head_length
+        self.collection = PolyCollection(self.polygons(starts, ends), facecolors=colors, edgecolors=colors,
+                                         **kwargs)
+        ax.add_collection(self.collection)
+
+    def polygons(self, starts, ends):
+        """returns the (N,7,2) arrow outlines from starts to ends"""
+        return arrow_polygons(starts, ends, width=self.width, head_width=self.head_width,
+                              head_length=self.head_length)
+
+    def set_arrows(self, starts, ends, colors=None):
+        """move the arrows in place
+        starts, ends: (N,2) arrow tails and tips in plotting coordinates
+        colors: optional new color or list of N colors
+        """
+        self.collection.set_verts(self.polygons(starts, ends), closed=True)
+        if colors is not None:
+            self.collection.set_facecolor(colors)
+            self.collection.set_edgecolor(colors)
+
+    def remove(self):
+        """remove the arrows from the axes"""
+        self.collection.remove()
+
 # the center of gravity sign
-def cg_sign(radius=1,ax=None,linewidth=0.5):
+def cg_sign(radius=1,ax=None,linewidth=0.5,center=(0,0),transform=None):
+    """draws the center of gravity sign from cached unit shapes
+    transform: the transform from the frame of center to display, default to the data coordinates of ax
+    output:
+    placement: the shape_placement of the sign, move_placement moves the whole sign without new artists
+    patches: the circle and the two filled sectors
+    """
     # make sure ax is not empty
     if ax is None:
         ax = plt.gca()
-    circle = plt.Circle((0, 0), radius,facecolor=(1,1,1,0),edgecolor="black",linewidth=linewidth)
+    if transform is None:
+        transform = ax.transData
+    placement = shape_placement(center, radius)
+    circle = plt.Circle((0,0), 1, facecolor=(1,1,1,0), edgecolor="black", linewidth=linewidth,
+                        transform=placement + transform)
     ax.add_patch(circle)
-    ax.plot(0,0,'k')
-    arc_sector((0,0), radius, 90, 180,ax=ax, fill=True, color='black')
-    arc_sector((0,0), radius, 270, 360,ax=ax, fill=True, color='black')
+    patches = [circle]
+    for (theta1, theta2) in ((90, 180), (270, 360)):
+        patches.append(arc_sector(center, radius, theta1, theta2, ax=ax, placement=placement, transform=transform,
+                                  fill=True, color='black'))
     ax.set_aspect('equal', adjustable='box')
+    return placement, patches
     
 # arc with an arrow end
 def arc_arrow(center, radius, theta1, theta2, ax=None, res=50,z_up=1, **kwargs):
@@ -37,9 +224,7 @@ def arc_arrow(center, radius, theta1, theta2, ax=None, res=50,z_up=1, **kwargs):
     if ax is None:
         ax = plt.gca()
     # generate the points
-    theta = np.linspace(np.radians(theta1), np.radians(theta2), res) # 1xresolution row vector
-    points = np.vstack((radius*np.cos(theta) + center[0], 
-                        radius*np.sin(theta) + center[1])) # 2xresolution matrix
+    points = arc_points(center, radius, theta1, theta2, res) # 2xresolution matrix
     
     if (z_up==1):
         ax.plot(points[0],points[1],'k',**kwargs) # plot the arc
@@ -97,6 +282,19 @@ def draw_vector_with_text(vector,color,text=r"$V$",l_text=0.3,z_up=-1,turn_ang=5
         axes.text(vector[1][1]+l_text*math.cos(arrow_angle+turn_ang),
                   vector[0][1]+l_text*math.sin(arrow_angle+turn_ang), text, color=color, fontsize=10)
 
+def vector_text_position(vector, l_text=0.3, z_up=-1, turn_ang=5/6*math.pi):
+    """returns the plotting position (x, y) of the text placed near the head of a vector
+    vector: 2x2 array of [[x1, x2], [y1, y2]].
+    l_text: Length of travel after a sharp 150-degree u-turn at the arrow head.
+    z_up: The z-up (or z-down) convention for drawing (1 for z-up, -1 for z-down).
+    turn_ang: U-turn angle, default at 150 degrees.
+    """
+    arrow_angle = np.arctan2(vector[1][1] - vector[1][0],
+                             vector[0][1] - vector[0][0])
+    (x_head, y_head) = xy_by_convention(np.asarray(vector)[:, 1], z_up)
+    return (x_head + l_text * math.cos(arrow_angle + turn_ang),
+            y_head + l_text * math.sin(arrow_angle + turn_ang))
+
 def draw_vector_with_text_rf(vector, ax=None, color='black', text=r"$V$", l_text=0.3, z_up=-1, turn_ang=5/6*math.pi):
     """
     Draws a vector with an arrow and a text near the head of the arrow.
@@ -107,33 +305,15 @@ def draw_vector_with_text_rf(vector, ax=None, color='black', text=r"$V$", l_text
     text: Text to add near the head of the arrow, located at a length of l_text after a 150-degree u-turn.
     l_text: Length of travel after a sharp 150-degree u-turn at the arrow head.
     turn_ang: U-turn angle, default at 150 degrees.
+    output:
+    arrow: the arrow_collection holding the arrow
     """
     if ax is None:
         ax = plt.gca()
 
-    if z_up == 1:
-        arrow = ax.arrow(vector[0][0], vector[1][0],
-                        vector[0][1] - vector[0][0],
-                        vector[1][1] - vector[1][0], width=0.01,
-                        head_width=0.05, head_length=0.1, length_includes_head=True,
-                        edgecolor=color, facecolor=color)
-
-        arrow_angle = np.arctan2(vector[1][1] - vector[1][0],
-                                vector[0][1] - vector[0][0])
-        ax.text(vector[0][1] + l_text * math.cos(arrow_angle + turn_ang),
-                vector[1][1] + l_text * math.sin(arrow_angle + turn_ang),
-                text, color=color, fontsize=10)
-    else:
-        arrow = ax.arrow(vector[1][0], vector[0][0],
-                        vector[1][1] - vector[1][0],
-                        vector[0][1] - vector[0][0], width=0.01,
-                        head_width=0.05, head_length=0.1, length_includes_head=True,
-                        edgecolor=color, facecolor=color)
-
-        arrow_angle = np.arctan2(vector[1][1] - vector[1][0],
-                                vector[0][1] - vector[0][0])
-        ax.text(vector[1][1] + l_text * math.cos(arrow_angle + turn_ang),
-                vector[0][1] + l_text * math.sin(arrow_angle + turn_ang),
-                text, color=color, fontsize=10)
+    line = points_by_convention(np.asarray(vector, dtype=np.float64).T, z_up) # [start, end] in plotting coordinates
+    arrow = arrow_collection(line[:1], line[1:], ax=ax, colors=color)
+    ax.text(*vector_text_position(vector, l_text=l_text, z_up=z_up, turn_ang=turn_ang),
+            text, color=color, fontsize=10)
 
     return arrow
@@ -3,6 +3,203 @@ import math
 import numpy as np
 from lib_graphic import *
 
+class tire_model:
+    """base class of the vectorized tire force models
+    forces() evaluates whole arrays of slip angles, slip ratios and normal loads (of any broadcastable shapes) in one
+    call. A model is also callable as model(alpha, kappa, normal_load), so it can be passed as the tire_model of
+    dual_track_sim. The slip angle is positive when the lateral force is along the tire y axis, as the Alpha columns
+    of drift_data.csv, and the slip ratio is (Omega*R - v) / |v|.
+    """
+
+    def forces(self, alpha, kappa, normal_load):
+        """evaluate the tire forces
+        alpha: slip angles in radians
+        kappa: slip ratios
+        normal_load: normal loads in N
+        output:
+        (fx, fy) arrays of the longitudinal and lateral forces in tire frame in N
+        """
+        raise NotImplementedError
+
+    def __call__(self, alpha, kappa, normal_load):
+        return self.forces(alpha, kappa, normal_load)
+
+    def tabulated(self, alpha_range=(-0.6, 0.6), kappa_range=(-1.0, 1.0), load_range=(0.0, 10000.0),
+                  shape=(121, 101, 11)):
+        """returns a lookup_table_tire_model of the model, cached on the model for the same table layout"""
+        key = (tuple(alpha_range), tuple(kappa_range), tuple(load_range), tuple(shape))
+        tables = self.__dict__.setdefault('_tables', {})
+        if key not in tables:
+            tables[key] = lookup_table_tire_model(self, alpha_range, kappa_range, load_range, shape)
+        return tables[key]
+
+class linear_tire_model(tire_model):
+    """linear tire, optionally bounded by the friction circle
+    fx = longitudinal_stiffness * kappa, fy = cornering_stiffness * alpha, scaled down together so that the
+    resultant force does not exceed friction * normal_load
+    """
+
+    def __init__(self, cornering_stiffness=80000, longitudinal_stiffness=100000, friction=None):
+        """
+        cornering_stiffness: cornering stiffness in N/rad
+        longitudinal_stiffness: longitudinal slip stiffness in N
+        friction: friction coefficient of the friction circle, None for unbounded forces
+        """
+        self.cornering_stiffness = cornering_stiffness
+        self.longitudinal_stiffness = longitudinal_stiffness
+        self.friction = friction
+
+    def forces(self, alpha, kappa, normal_load):
+        fx = self.longitudinal_stiffness * np.asarray(kappa, dtype=np.float64)
+        fy = self.cornering_stiffness * np.asarray(alpha, dtype=np.float64)
+        if self.friction is None:
+            return np.broadcast_arrays(fx, fy, normal_load)[:2]
+        scale = np.minimum(1.0, self.friction * np.asarray(normal_load) / np.maximum(np.hypot(fx, fy), 1e-9))
+        return (fx * scale, fy * scale)
+
+class brush_tire_model(tire_model):
+    """Fiala brush tire with combined slip
+    The theoretical slips sx = kappa / (1 + kappa) and sy = tan(alpha) / (1 + kappa) make the combined linear force
+    theta = hypot(Cx*sx, Cy*sy), which saturates with the parabolic pressure distribution of the brush model:
+    F = theta - theta^2 / (3*mu*Fz) + theta^3 / (27*(mu*Fz)^2) up to full sliding at theta = 3*mu*Fz, where F = mu*Fz.
+    F is shared between fx and fy along the direction of the theoretical slip.
+    """
+
+    def __init__(self, cornering_stiffness=80000, longitudinal_stiffness=100000, friction=1.0):
+        """
+        cornering_stiffness: cornering stiffness Cy in N/rad
+        longitudinal_stiffness: longitudinal slip stiffness Cx in N
+        friction: friction coefficient mu
+        """
+        self.cornering_stiffness = cornering_stiffness
+        self.longitudinal_stiffness = longitudinal_stiffness
+        self.friction = friction
+
+    def forces(self, alpha, kappa, normal_load):
+        alpha = np.asarray(alpha, dtype=np.float64)
+        kappa = np.asarray(kappa, dtype=np.float64)
+        # 1 + kappa stays positive up to a locked wheel (kappa = -1)
+        rolling = np.maximum(1.0 + kappa, 1e-3)
+        fx_linear = self.longitudinal_stiffness * kappa / rolling
+        fy_linear = self.cornering_stiffness * np.tan(alpha) / rolling
+        theta = np.hypot(fx_linear, fy_linear)
+        limit = self.friction * np.asarray(normal_load, dtype=np.float64)
+        ratio = theta / np.maximum(3 * limit, 1e-9)
+        force = np.where(ratio < 1.0, theta * (1 - ratio + ratio ** 2 / 3), limit)
+        scale = force / np.maximum(theta, 1e-9)
+        return (fx_linear * scale, fy_linear * scale)
+
+class magic_formula_tire_model(tire_model):
+    """Pacejka Magic Formula tire with combined slip
+    The pure slip forces are D*sin(C*atan(B*s - E*(B*s - atan(B*s)))) with s the slip ratio (longitudinal) or the
+    slip angle (lateral), and the peak D = mu * Fz * (1 + load_sensitivity * (Fz - nominal_load) / nominal_load).
+    Combined slip weights the pure slip forces with the cosine weighting functions of Pacejka (2002), without the
+    shift terms: Gxa = cos(rCx * atan(Bxa * alpha)), Bxa = rBx1 * cos(atan(rBx2 * kappa)) and
+    Gyk = cos(rCy * atan(Byk * kappa)), Byk = rBy1 * cos(atan(rBy2 * alpha)).
+    Each call evaluates about a dozen transcendental functions per sample, tabulated() trades them for a table
+    lookup, see lookup_table_tire_model for its cost and accuracy.
+    """
+
+    def __init__(self, Bx=12.0, Cx=1.65, Ex=0.1, By=10.0, Cy=1.3, Ey=-0.5, friction=1.0, nominal_load=4000.0,
+                 load_sensitivity=-0.1, rBx=(12.35, -10.77), rCx=1.092, rBy=(6.46, 4.196), rCy=1.081):
+        """
+        Bx, Cx, Ex: stiffness, shape and curvature factors of the longitudinal force
+        By, Cy, Ey: stiffness, shape and curvature factors of the lateral force
+        friction: friction coefficient mu at the nominal load
+        nominal_load: nominal normal load in N
+        load_sensitivity: relative change of the friction coefficient per relative change of the normal load
+        rBx, rCx: (rBx1, rBx2) and rCx1 of the weighting of the longitudinal force by the slip angle
+        rBy, rCy: (rBy1, rBy2) and rCy1 of the weighting of the lateral force by the slip ratio
+        """
+        (self.Bx, self.Cx, self.Ex) = (Bx, Cx, Ex)
+        (self.By, self.Cy, self.Ey) = (By, Cy, Ey)
+        self.friction = friction
+        self.nominal_load = nominal_load
+        self.load_sensitivity = load_sensitivity
+        (self.rBx, self.rCx, self.rBy, self.rCy) = (rBx, rCx, rBy, rCy)
+
+    @staticmethod
+    def pure_slip(slip, B, C, D, E):
+        """Magic Formula D*sin(C*atan(B*s - E*(B*s - atan(B*s))))"""
+        Bs = B * slip
+        return D * np.sin(C * np.arctan(Bs - E * (Bs - np.arctan(Bs))))
+
+    def forces(self, alpha, kappa, normal_load):
+        alpha = np.asarray(alpha, dtype=np.float64)
+        kappa = np.asarray(kappa, dtype=np.float64)
+        normal_load = np.maximum(np.asarray(normal_load, dtype=np.float64), 0.0)
+        peak = self.friction * normal_load * (1 + self.load_sensitivity * (normal_load - self.nominal_load)
+                                              / self.nominal_load)
+        fx0 = self.pure_slip(kappa, self.Bx, self.Cx, peak, self.Ex)
+        fy0 = self.pure_slip(alpha, self.By, self.Cy, peak, self.Ey)
+        Bxa = self.rBx[0] * np.cos(np.arctan(self.rBx[1] * kappa))
+        Byk = self.rBy[0] * np.cos(np.arctan(self.rBy[1] * alpha))
+        return (fx0 * np.cos(self.rCx * np.arctan(Bxa * alpha)), fy0 * np.cos(self.rCy * np.arctan(Byk * kappa)))
+
+class lookup_table_tire_model(tire_model):
+    """tire model interpolated in a table of another model
+    The forces of the model are evaluated once on a regular (alpha, kappa, normal load) grid, then each call is a
+    trilinear interpolation of the 8 surrounding grid points. Inputs outside the grid are clamped to its edges.
+    fx and fy are interleaved in one complex64 table (real part fx, imaginary part fy), so each corner costs a single
+    gather and both forces are interpolated together in float32.
+    The speed gain depends on the machine and can vanish, so tabulation is opt-in (tabulated()): measure it before
+    use. Tabulating the default magic_formula_tire_model on the default (121, 101, 11) grid, a call on 4000 to
+    1000000 random samples took 0.5-0.75 times the time of the closed form on the machine it was measured on, with a
+    maximum interpolation error of about 115 N in fx and 30 N in fy. A finer (241, 201, 11) grid cuts the error to
+    about 30 N and 10 N, but its 4 MB table took 0.65-0.9 times the time there and was no faster on another machine.
+    Grid points such as zero slip are still off by the float32 rounding of the table.
+    """
+
+    def __init__(self, model, alpha_range=(-0.6, 0.6), kappa_range=(-1.0, 1.0), load_range=(0.0, 10000.0),
+                 shape=(121, 101, 11)):
+        """
+        model: the tire_model to tabulate
+        alpha_range, kappa_range, load_range: (min, max) of the slip angle, slip ratio and normal load axes
+        shape: number of grid points along the three axes
+        """
+        self.model = model
+        self.ranges = np.array([alpha_range, kappa_range, load_range], dtype=np.float64)
+        self.shape = tuple(int(n) for n in shape)
+        axes = [np.linspace(low, high, n) for ((low, high), n) in zip(self.ranges, self.shape)]
+        (fx, fy) = model.forces(*np.meshgrid(*axes, indexing='ij'))
+        # flat table, gathered with take() which is much cheaper than fancy indexing a 3d table
+        self.table = np.empty(fx.size, dtype=np.complex64)
+        self.table.real = np.ravel(fx)
+        self.table.imag = np.ravel(fy)
+        self.steps = (self.ranges[:, 1] - self.ranges[:, 0]) / (np.array(self.shape) - 1)
+        self.strides = (self.shape[1] * self.shape[2], self.shape[2], 1)
+
+    def forces(self, alpha, kappa, normal_load):
+        (alpha, kappa, normal_load) = np.broadcast_arrays(alpha, kappa, normal_load)
+        shape = alpha.shape
+        flat = 0
+        weights = []
+        for (values, (low, _), step, n, stride) in zip((alpha, kappa, normal_load), self.ranges, self.steps,
+                                                       self.shape, self.strides):
+            # grid position in float32, updated in place to keep the number of temporaries down
+            position = np.subtract(np.ravel(values), low, dtype=np.float32)
+            position *= np.float32(1 / step)
+            np.clip(position, 0, n - 1, out=position)
+            index = np.minimum(position.astype(np.intp), n - 2)
+            position -= index
+            flat = flat + index * stride
+            weights.append(position)
+        (wa, wk, wl) = weights
+        (sa, sk, sl) = self.strides
+
+        def lerp(low, high, w):
+            high -= low
+            high *= w
+            high += low
+            return high
+        # interpolate along the load axis, then the slip ratio, then the slip angle
+        corner = lambda offset: self.table.take(flat + offset)
+        k0 = lerp(lerp(corner(0), corner(sl), wl), lerp(corner(sk), corner(sk + sl), wl), wk)
+        k1 = lerp(lerp(corner(sa), corner(sa + sl), wl), lerp(corner(sa + sk), corner(sa + sk + sl), wl), wk)
+        forces = lerp(k0, k1, wa)
+        # [()] turns 0-d results into float64 scalars, as the closed-form models return for scalar inputs
+        return (forces.real.astype(np.float64).reshape(shape)[()], forces.imag.astype(np.float64).reshape(shape)[()])
+
 class tire2d:
     """vehicle tire in 2d
     The tire contour and forces drawings are first rotated by the tire heading, then translated by
@@ -13,12 +210,17 @@ class tire2d:
     longitudinal_force_tframe = [] # Newton
     lateral_force_tframe = [] # Newton
     slip_angle = [] # radian
+    slip_ratio = 0 # (Omega*R - v) / |v|
+    normal_load = [] # Newton
+    model = None # tire_model computing the forces from the slips, None when the forces are given externally
     
-    def __init__(self,tsize=(0.3,0.6),long_f_tframe=100,lat_f_tframe=1000,slip_ang=0.05):
+    def __init__(self,tsize=(0.3,0.6),long_f_tframe=100,lat_f_tframe=1000,slip_ang=0.05,model=None,normal_load=4000):
         self.tire_size = tsize
         self.longitudinal_force_tframe = long_f_tframe
         self.lateral_force_tframe = lat_f_tframe
         self.slip_angle = slip_ang
+        self.model = model
+        self.normal_load = normal_load
     
     def update_tire_force(self,f_tframe,slip_ang):
         """update the tire force
@@ -28,21 +230,40 @@ class tire2d:
         self.longitudinal_force_tframe = f_tframe[0]
         self.lateral_force_tframe = f_tframe[1]
         self.slip_angle = slip_ang
-        
 
-    def draw_tire(self, ax=None, tire_pose=None, z_up=-1, draw_force=True, draw_x_axis=True, fl_ratio=2000):
+    def calc_tire_forces(self,slip_angles,slip_ratios=0,normal_loads=None):
+        """calculate the tire forces of the tire model for whole arrays of slips in one call (e.g. a log or a sweep)
+        slip_angles: array of slip angles in radian
+        slip_ratios: array of slip ratios
+        normal_loads: array of normal loads in Newton, default to the normal load of the tire
+        output:
+        (Fxt, Fyt): arrays of the longitudinal and lateral forces in tire frame
         """
-        Draws the tire.
+        if self.model is None:
+            raise ValueError("the tire has no tire model, see tire2d(model=...)")
+        if normal_loads is None:
+            normal_loads = self.normal_load
+        return self.model.forces(slip_angles,slip_ratios,normal_loads)
+
+    def update_tire_force_by_slip(self,slip_ang,slip_ratio=0,normal_load=None):
+        """update the tire force from the slips with the tire model
+        slip_ang: the slip angle in radian
+        slip_ratio: the slip ratio
+        normal_load: the normal load in Newton, unchanged if None
+        """
+        if normal_load is not None:
+            self.normal_load = normal_load
+        (Fxt,Fyt) = self.calc_tire_forces(slip_ang,slip_ratio)
+        self.update_tire_force((float(Fxt),float(Fyt)),slip_ang)
+        self.slip_ratio = slip_ratio
         
-        ax: Matplotlib axis to draw on.
+
+    def calc_tire_edges(self, tire_pose=None):
+        """calculate the tire contour in world frame
         tire_pose: Tuple of (x_tire, y_tire, heading_tire) in (meter, meter, radian), all in world frame.
-        z_up: The z-up (or z-down) convention for drawing (1 for z-up, -1 for z-down).
-        draw_force: Whether tire forces are drawn (True for yes, False for no).
-        fl_ratio: Force (N)-length (m) ratio for determining the length of force arrow on figure.
+        output:
+        tire_edges: 2x5 matrix [[x1..x5],[y1..y5]], one edge is repeated to close the loop
         """
-        if ax is None:
-            ax = plt.gca()
-
         if tire_pose is None:
             tire_pose = (0, 0, 0)  # Default tire pose if not provided
 
@@ -53,12 +274,67 @@ class tire2d:
         rotation_matrix = [[math.cos(-heading_tire), math.sin(-heading_tire)],
                         [-math.sin(-heading_tire), math.cos(-heading_tire)]]
         tire_edges_rotated = np.matmul(rotation_matrix, tire_edges_default)
-        tire_edges_rotated_translated = [tire_edges_rotated[0] + x_tire, tire_edges_rotated[1] + y_tire]
+        return np.array([tire_edges_rotated[0] + x_tire, tire_edges_rotated[1] + y_tire])
+
+    def calc_tire_force_lines(self, tire_pose=None, fl_ratio=2000):
+        """calculate the tire force vectors in world frame, starting at the tire CG
+        tire_pose: Tuple of (x_tire, y_tire, heading_tire) in (meter, meter, radian), all in the world frame.
+        fl_ratio: Force (N)-length (m) ratio for determining the length of force arrow on the figure.
+        output:
+        (Fxt_line, Fyt_line): two 2x2 matrices in vector format [[x1,x2],[y1,y2]]
+        """
+        if tire_pose is None:
+            tire_pose = (0, 0, 0)  # Default tire pose if not provided
 
-        if z_up == 1:
-            ax.plot(tire_edges_rotated_translated[0], tire_edges_rotated_translated[1], 'k', linestyle="-")
-        else:
-            ax.plot(tire_edges_rotated_translated[1], tire_edges_rotated_translated[0], 'k', linestyle="-")
+        (x_tire, y_tire, heading_tire) = tire_pose
+        rotation_matrix = [[math.cos(-heading_tire), math.sin(-heading_tire)],
+                        [-math.sin(-heading_tire), math.cos(-heading_tire)]]
+
+        Fxt_scaled = self.longitudinal_force_tframe / fl_ratio
+        Fyt_scaled = self.lateral_force_tframe / fl_ratio
+        Fxt_line_default = [[0, Fxt_scaled], [0, 0]]
+        Fyt_line_default = [[0, 0], [0, Fyt_scaled]]
+
+        Fxt_line_rotated = np.matmul(rotation_matrix, Fxt_line_default)
+        Fyt_line_rotated = np.matmul(rotation_matrix, Fyt_line_default)
+
+        Fxt_line_rotated_translated = np.array([Fxt_line_rotated[0] + x_tire, Fxt_line_rotated[1] + y_tire])
+        Fyt_line_rotated_translated = np.array([Fyt_line_rotated[0] + x_tire, Fyt_line_rotated[1] + y_tire])
+        return (Fxt_line_rotated_translated, Fyt_line_rotated_translated)
+
+    def calc_tire_x_axis(self, tire_pose=None, dash_length=2):
+        """calculate the end points of the tire frame x axis line in world frame
+        tire_pose: Tuple of (x_tire, y_tire, heading_tire) in (meter, meter, radian), all in world frame.
+        dash_length: The length of the dashed line.
+        output:
+        x_axis_line: 2x2 matrix in vector format [[x1,x2],[y1,y2]]
+        """
+        if tire_pose is None:
+            tire_pose = (0, 0, 0)  # Default tire pose if not provided
+
+        (x_tire, y_tire, heading_tire) = tire_pose
+
+        x_edge_1 = x_tire + 0.5 * dash_length * math.cos(heading_tire)
+        x_edge_2 = x_tire - 0.5 * dash_length * math.cos(heading_tire)
+        y_edge_1 = y_tire + 0.5 * dash_length * math.sin(heading_tire)
+        y_edge_2 = y_tire - 0.5 * dash_length * math.sin(heading_tire)
+        return np.array([[x_edge_1, x_edge_2], [y_edge_1, y_edge_2]])
+
+    def draw_tire(self, ax=None, tire_pose=None, z_up=-1, draw_force=True, draw_x_axis=True, fl_ratio=2000):
+        """
+        Draws the tire.
+        
+        ax: Matplotlib axis to draw on.
+        tire_pose: Tuple of (x_tire, y_tire, heading_tire) in (meter, meter, radian), all in world frame.
+        z_up: The z-up (or z-down) convention for drawing (1 for z-up, -1 for z-down).
+        draw_force: Whether tire forces are drawn (True for yes, False for no).
+        fl_ratio: Force (N)-length (m) ratio for determining the length of force arrow on figure.
+        """
+        if ax is None:
+            ax = plt.gca()
+
+        tire_edges = self.calc_tire_edges(tire_pose)
+        ax.plot(*xy_by_convention(tire_edges, z_up), 'k', linestyle="-")
 
         # axes = plt.gca()
         ax.set_aspect('equal', adjustable='box')
@@ -77,48 +353,14 @@ class tire2d:
         tire_pose: Tuple of (x_tire, y_tire, heading_tire) in (meter, meter, radian), all in the world frame.
         fl_ratio: Force (N)-length (m) ratio for determining the length of force arrow on the figure.
         z_up: The z-up (or z-down) convention for drawing (1 for z-up, -1 for z-down).
+        output:
+        arrows: the arrow_collection of the longitudinal (red) and lateral (green) forces
         """
         if ax is None:
             ax = plt.gca()
 
-        if tire_pose is None:
-            tire_pose = (0, 0, 0)  # Default tire pose if not provided
-
-        (x_tire, y_tire, heading_tire) = tire_pose
-        rotation_matrix = [[math.cos(-heading_tire), math.sin(-heading_tire)],
-                        [-math.sin(-heading_tire), math.cos(-heading_tire)]]
-
-        Fxt_scaled = self.longitudinal_force_tframe / fl_ratio
-        Fyt_scaled = self.lateral_force_tframe / fl_ratio
-        Fxt_line_default = [[0, Fxt_scaled], [0, 0]]
-        Fyt_line_default = [[0, 0], [0, Fyt_scaled]]
-
-        Fxt_line_rotated = np.matmul(rotation_matrix, Fxt_line_default)
-        Fyt_line_rotated = np.matmul(rotation_matrix, Fyt_line_default)
-
-        Fxt_line_rotated_translated = [Fxt_line_rotated[0] + x_tire, Fxt_line_rotated[1] + y_tire]
-        Fyt_line_rotated_translated = [Fyt_line_rotated[0] + x_tire, Fyt_line_rotated[1] + y_tire]
-
-        if z_up == 1:
-            ax.arrow(Fxt_line_rotated_translated[0][0], Fxt_line_rotated_translated[1][0],
-                    Fxt_line_rotated_translated[0][1] - Fxt_line_rotated_translated[0][0],
-                    Fxt_line_rotated_translated[1][1] - Fxt_line_rotated_translated[1][0], width=0.01,
-                    head_width=0.05, head_length=0.1, length_includes_head=True, edgecolor='r', facecolor='r')
-
-            ax.arrow(Fyt_line_rotated_translated[0][0], Fyt_line_rotated_translated[1][0],
-                    Fyt_line_rotated_translated[0][1] - Fyt_line_rotated_translated[0][0],
-                    Fyt_line_rotated_translated[1][1] - Fyt_line_rotated_translated[1][0], width=0.01,
-                    head_width=0.05, head_length=0.1, length_includes_head=True, edgecolor='g', facecolor='g')
-        else:
-            ax.arrow(Fxt_line_rotated_translated[1][0], Fxt_line_rotated_translated[0][0],
-                    Fxt_line_rotated_translated[1][1] - Fxt_line_rotated_translated[1][0],
-                    Fxt_line_rotated_translated[0][1] - Fxt_line_rotated_translated[0][0], width=0.01,
-                    head_width=0.05, head_length=0.1, length_includes_head=True, edgecolor='r', facecolor='r')
-
-            ax.arrow(Fyt_line_rotated_translated[1][0], Fyt_line_rotated_translated[0][0],
-                    Fyt_line_rotated_translated[1][1] - Fyt_line_rotated_translated[1][0],
-                    Fyt_line_rotated_translated[0][1] - Fyt_line_rotated_translated[0][0], width=0.01,
-                    head_width=0.05, head_length=0.1, length_includes_head=True, edgecolor='g', facecolor='g')
+        lines = points_by_convention(np.transpose(self.calc_tire_force_lines(tire_pose, fl_ratio), (0, 2, 1)), z_up)
+        return arrow_collection(lines[:, 0], lines[:, 1], ax=ax, colors=['r', 'g'])
 
 
     def draw_tire_x_axis(self, ax=None, tire_pose=None, dash_length=2, z_up=-1):
@@ -133,17 +375,5 @@ class tire2d:
         if ax is None:
             ax = plt.gca()
 
-        if tire_pose is None:
-            tire_pose = (0, 0, 0)  # Default tire pose if not provided
-
-        (x_tire, y_tire, heading_tire) = tire_pose
-
-        x_edge_1 = x_tire + 0.5 * dash_length * math.cos(heading_tire)
-        x_edge_2 = x_tire - 0.5 * dash_length * math.cos(heading_tire)
-        y_edge_1 = y_tire + 0.5 * dash_length * math.sin(heading_tire)
-        y_edge_2 = y_tire - 0.5 * dash_length * math.sin(heading_tire)
-
-        if z_up == 1:
-            ax.plot([x_edge_1, x_edge_2], [y_edge_1, y_edge_2], 'k--', linewidth=0.5)
-        else:
-            ax.plot([y_edge_1, y_edge_2], [x_edge_1, x_edge_2], 'k--', linewidth=0.5)
+        x_axis_line = self.calc_tire_x_axis(tire_pose, dash_length)
+        ax.plot(*xy_by_convention(x_axis_line, z_up), 'k--', linewidth=0.5)
@@ -2,10 +2,11 @@ import matplotlib.pyplot as plt
 import math
 import numpy as np
 from lib_graphic import *
+from lib_geometry import *
 
 class vehicle2d:
     """vehicle for drawing vehicle diagram in 2d
-    The vehicle CG is always assumed at the origin on the plotting axes.
+    The vehicle CG is placed at position on the plotting axes, which defaults to the origin.
     """
     wheel_base = [] # distance between front and rear axle in meter
     front_to_cg = [] # distance between front axle to cg in meter
@@ -14,9 +15,10 @@ class vehicle2d:
     heading = [] # vehicle body longitudinal axis heading in radians
     vel_bframe = [] # (vel_long_bframe,vel_lat_bframe) vehicle body velocity in body frame
     yaw_rate = [] # body yaw rate in rad/s
+    position = [] # (X,Y) world frame position of the vehicle CG in meter
     
     def __init__(self,wheel_base=3.075,front_to_cg=1.392,body_size=(4.5,1.8),tire_size=(0.3,0.6),heading=math.pi/6,vel_bframe=(10,4),
-                yaw_rate=0.5):
+                yaw_rate=0.5,position=(0,0)):
         self.wheel_base = wheel_base
         self.front_to_cg = front_to_cg
         self.body_size = body_size
@@ -24,44 +26,120 @@ class vehicle2d:
         self.heading = heading
         self.vel_bframe = vel_bframe
         self.yaw_rate = yaw_rate
+        self.position = position
         
+    def calc_body_edges(self):
+        """calculate the vehicle body contour in world frame
+        output:
+        body_edges: 2x5 matrix [[x1..x5],[y1..y5]], one edge is repeated to close the loop
+        """
+        # calculate coordinates for the vehicle body using body_size,front_to_cg, and heading
+        (a,b) = self.body_size
+        body_edges_default = [[a/2,a/2,-a/2,-a/2,a/2],[b/2,-b/2,-b/2,b/2,b/2]] # 2x5 matrix, one edge is repeated to close the loop
+        # the rotation_matrix rotates vectors in the body frame back to the world frame with an angle of -self.heading
+        rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
+                           [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
+        body_edges = np.matmul(rotation_matrix,body_edges_default) # 2x5 matrix
+        return body_edges + np.reshape(self.position, (2,1)) # translated to the CG position
+
+    def calc_veh_vel_line(self, vl_ratio=10):
+        """calculate the vehicle body velocity vector in world frame, starting at the vehicle CG
+        vl_ratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
+        output:
+        V_line: 2x2 matrix in vector format [[x1,x2],[y1,y2]]
+        """
+        # the rotation_matrix rotates vectors in the body frame back to the world frame with an angle of -self.heading
+        rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
+                           [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
+        (Vxb,Vyb) = self.vel_bframe
+        Vxb_scaled = Vxb / vl_ratio
+        Vyb_scaled = Vyb / vl_ratio
+        V_line_default = [[0,Vxb_scaled],[0,Vyb_scaled]] # vector format 2x2 [[x1,x2],[y1,y2]], for both z-up and z-down
+        V_line_rotated = np.matmul(rotation_matrix,V_line_default) # velocity rotated to world frame but centered at origin
+        return V_line_rotated + np.reshape(self.position, (2,1)) # translated to the CG position
+
+    def get_wheel_angles(self):
+        """return the wheel angles in body frame, one per tire of get_tires() (a bare body has no tires)"""
+        return ()
+
+    def calc_tire_centers_batch(self, headings, positions=None):
+        """calculate the (N,m,2) tire centers for N body headings (a bare body has no tires)"""
+        return np.zeros((len(headings), 0, 2))
+
+    def calc_geometry_batch(self, headings, wheel_angles=None, vels_bframe=None, tire_forces=None, positions=None,
+                            fl_ratio=2000, vl_ratio=10, yaw_rates=None):
+        """calculate the drawing geometry of N frames in one vectorized pass
+        headings: array of N body headings in radians
+        wheel_angles: (N,m) wheel angles in body frame, default to the current wheel angles of the vehicle
+        vels_bframe: optional (N,2) body velocities in body frame
+        tire_forces: optional (N,m,2) tire forces (longitudinal, lateral) in tire frame
+        positions: optional (N,2) world frame CG positions, default to the current position of the vehicle
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrow
+        yaw_rates: optional array of N yaw rates, with vels_bframe gives the front axle velocity lines
+        output:
+        geometry: dictionary of world frame arrays, last axis (x, y):
+        'positions' (N,2) CG positions, 'body' (N,5,2) body outlines, 'axle_centers' (N,2,2) front and rear axle
+        centers, 'tire_centers' (N,m,2), 'tire_headings' (N,m), 'tires' (N,m,5,2) tire outlines,
+        'tire_x_axes' (N,m,2,2), and when given the inputs, 'vel' (N,2,2) body velocity lines,
+        'whl_vel' (N,2,2) front axle velocity lines, 'fx' and 'fy' (N,m,2,2) tire force lines
+        """
+        headings = np.asarray(headings, dtype=np.float64)
+        n = len(headings)
+        if positions is None:
+            positions = np.broadcast_to(np.asarray(self.position, dtype=np.float64), (n, 2))
+        positions = np.asarray(positions, dtype=np.float64)
+        if wheel_angles is None:
+            wheel_angles = np.asarray(self.get_wheel_angles(), dtype=np.float64)[None, :]
+        tire_headings = headings[:, None] + np.asarray(wheel_angles, dtype=np.float64)
+
+        geometry = {'positions': positions, 'body': body_outlines(headings, self.body_size, positions),
+                    'axle_centers': axle_centers(headings, self.front_to_cg, self.wheel_base, positions)}
+        centers = self.calc_tire_centers_batch(headings, positions)
+        geometry['tire_centers'] = centers
+        geometry['tire_headings'] = tire_headings
+        geometry['tires'] = tire_outlines(centers, tire_headings, self.tire_size)
+        geometry['tire_x_axes'] = tire_x_axes(centers, tire_headings)
+        if vels_bframe is not None:
+            geometry['vel'] = vector_lines(positions, vels_bframe, headings, vl_ratio)
+            if yaw_rates is not None:
+                # Vxfb = Vxb, Vyfb = Vyb + r*a, see calc_vel_axles_bframe
+                vels_front = np.array(vels_bframe, dtype=np.float64)
+                vels_front[:, 1] += np.asarray(yaw_rates, dtype=np.float64) * self.front_to_cg
+                geometry['whl_vel'] = vector_lines(geometry['axle_centers'][:, 0], vels_front, headings, vl_ratio)
+        if tire_forces is not None:
+            (geometry['fx'], geometry['fy']) = tire_force_lines(centers, tire_headings, tire_forces, fl_ratio)
+        return geometry
+
     def draw_veh_body(self, ax = None, z_up=-1, draw_vel=True):
         """draws the body of the vehicle
         z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
         ax: Matplotlib axis to draw on.
         draw_vel: whether to draw vehicle body velocity vector.
-        NOTE: currently, vehicle center of gravity (CG) is chosen to be the origin in the drawing.
+        NOTE: the vehicle center of gravity (CG) is drawn at self.position, the origin by default.
         the vehicle body box is assumed to be centered at the vehicle CG. This will be generalized in the future.
         """
         if ax is None:
             ax = plt.gca()  # Get the current axis if not provided
         
-        # calculate coordinates for the vehicle body using body_size,front_to_cg, and heading
-        (a,b) = self.body_size
-        body_edges_default = [[a/2,a/2,-a/2,-a/2,a/2],[b/2,-b/2,-b/2,b/2,b/2]] # 2x5 matrix, one edge is repeated to close the loop
-        # the rotation_matrix rotates vectors in the body frame back to the world frame with an angle of -self.heading
-        rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
-                           [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
-        body_edges = np.matmul(rotation_matrix,body_edges_default) # 2x5 matrix
+        body_edges = self.calc_body_edges() # 2x5 matrix
 
         # Use the plot data returned by plt.plot() to draw the vehicle body
-        if z_up == 1:
-            line, = ax.plot(body_edges[0], body_edges[1], 'b', linestyle="--")
-        else:
-            line, = ax.plot(body_edges[1], body_edges[0], 'b', linestyle="--")
+        line, = ax.plot(*xy_by_convention(body_edges, z_up), 'b', linestyle="--")
 
         # axes=plt.gca()
         # axes.set_aspect('equal', adjustable='box')
 
         # draw center of gravity sign (this function may need refactoring in terms of axes)
-        cg_sign(radius=0.1,ax=ax) 
+        (x_cg, y_cg) = xy_by_convention(self.position, z_up) # CG in plotting coordinates
+        cg_sign(radius=0.1,ax=ax,center=(x_cg,y_cg))
 
         # draw yaw rate arc arrow
         if self.yaw_rate > 0:
-            arc_arrow((0, 0), 0.2, 0, 180, ax=ax, linewidth=0.5, z_up=z_up)
+            arc_arrow(self.position, 0.2, 0, 180, ax=ax, linewidth=0.5, z_up=z_up)
         else:
-            arc_arrow((0, 0), 0.2, 0, -180, ax=ax, linewidth=0.5, z_up=z_up)
-        ax.text(0, 0.4, r"$r$", color='k', fontsize=10)
+            arc_arrow(self.position, 0.2, 0, -180, ax=ax, linewidth=0.5, z_up=z_up)
+        ax.text(x_cg, y_cg + 0.4, r"$r$", color='k', fontsize=10)
 
         if draw_vel:
             self.draw_veh_vel(ax=ax, z_up=z_up)
@@ -80,13 +158,6 @@ class vehicle2d:
         """
         if ax is None:
             ax = plt.gca()
-        # the rotation_matrix rotates vectors in the body frame back to the world frame with an angle of -self.heading
-        rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
-                           [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
-        (Vxb,Vyb) = self.vel_bframe
-        Vxb_scaled = Vxb / vl_ratio
-        Vyb_scaled = Vyb / vl_ratio
-        V_line_default = [[0,Vxb_scaled],[0,Vyb_scaled]] # vector format 2x2 [[x1,x2],[y1,y2]], for both z-up and z-down
-        V_line_rotated = np.matmul(rotation_matrix,V_line_default) # force rotated to world frame but centered at tire CG
+        V_line_rotated = self.calc_veh_vel_line(vl_ratio) # velocity rotated to world frame but centered at vehicle CG
         # draw_vector_with_text(V_line_rotated,"k",ax=ax, text=r"$V$",l_text=0.3,z_up=z_up,turn_ang=5/6*math.pi)
         draw_vector_with_text_rf(V_line_rotated, ax=ax, z_up=z_up, turn_ang=5/6*math.pi)
\ No newline at end of file
@@ -7,6 +7,7 @@ from tire2d import *
 
 class vehicle2d_dual_track(vehicle2d):
     """dual track vehicle (two tires per axle)"""
+    num_front_tires = 2 # the first num_front_tires entries of get_tires() are on the front axle
     # fl_tire = []
     # fr_tire = []
     # rl_tire = []
@@ -29,13 +30,16 @@ class vehicle2d_dual_track(vehicle2d):
         self.wheel_velocities = ((0,0),(0,0),(0,0),(0,0)) # default wheel velocities
         self.track_widths = (1.5,1.5) # default front/rear track widths
     
-    def update_body_pose(self,heading,vel_bframe):
+    def update_body_pose(self,heading,vel_bframe,position=None):
         """update the body pose
         heading: the heading angle in radians
         vel_bframe: the body velocity in body frame
+        position: the (X,Y) world frame CG position, unchanged if None
         """
         self.heading = heading
         self.vel_bframe = vel_bframe
+        if position is not None:
+            self.position = position
     
     def update_tire_forces(self,tire_forces,slip_angles):
         """update the tire forces
@@ -62,13 +66,7 @@ class vehicle2d_dual_track(vehicle2d):
 
         self.draw_veh_body(ax=ax, z_up=z_up)
         # calculate the tires' poses
-        tires_center = self.calc_tires_centers()
-        tires_wheel_angles_bframe = np.array(self.wheel_angles) # assume rear wheel is always alined with body axis
-        tires_headings = tires_wheel_angles_bframe + self.heading # 2x1 matrix
-        tire_pose_fl = (tires_center[0,0],tires_center[1,0],tires_headings[0])
-        tire_pose_fr = (tires_center[0,1],tires_center[1,1],tires_headings[1])
-        tire_pose_rl = (tires_center[0,2],tires_center[1,2],tires_headings[2])
-        tire_pose_rr = (tires_center[0,3],tires_center[1,3],tires_headings[3])
+        (tire_pose_fl,tire_pose_fr,tire_pose_rl,tire_pose_rr) = self.calc_tire_poses()
         self.update_axle_velocity() # use body velocity, yawrate, and steer angle to calculate axle velocity
         if draw_whl_v:
             self.draw_wheel_velocity(ax=ax, z_up=z_up)
@@ -82,6 +80,28 @@ class vehicle2d_dual_track(vehicle2d):
 
         return ax
             
+    def get_tires(self):
+        """return the tires in the fl, fr, rl, rr order"""
+        return (self.fl_tire,self.fr_tire,self.rl_tire,self.rr_tire)
+
+    def calc_tire_poses(self):
+        """calculate the tires' poses in world frame
+        output:
+        tire_poses: tuple of (x_tire, y_tire, heading_tire) per tire, in the fl, fr, rl, rr order
+        """
+        tires_center = self.calc_tires_centers()
+        tires_wheel_angles_bframe = np.array(self.wheel_angles) # assume rear wheel is always alined with body axis
+        tires_headings = tires_wheel_angles_bframe + self.heading # 4x1 matrix
+        return tuple((tires_center[0,i],tires_center[1,i],tires_headings[i]) for i in range(4))
+
+    def get_wheel_angles(self):
+        """return the wheel angles in body frame in the fl, fr, rl, rr order"""
+        return self.wheel_angles
+
+    def calc_tire_centers_batch(self, headings, positions=None):
+        """calculate the (N,4,2) tire centers for N body headings, in the fl, fr, rl, rr order"""
+        return tire_centers(headings, self.front_to_cg, self.wheel_base, self.track_widths, positions)
+
     def calc_axles_center(self):
         """calculate the front and rear axle geometric center"""
         a = self.front_to_cg
@@ -91,7 +111,7 @@ class vehicle2d_dual_track(vehicle2d):
         rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
                            [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
         axles_center = np.matmul(rotation_matrix,axles_center_bframe) # 2x2 matrix ([[axle_f_x,axle_r_x],[axle_f_y,axle_r_y])
-        return axles_center
+        return axles_center + np.reshape(self.position, (2,1)) # translated to the CG position
     
     def calc_tires_centers(self):
         """calculate the tires' geometric centers"""
@@ -105,7 +125,7 @@ class vehicle2d_dual_track(vehicle2d):
         rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
                            [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
         tires_centers_global = np.matmul(rotation_matrix,tires_center_bframe) # 2x4 matrix 
-        return tires_centers_global
+        return tires_centers_global + np.reshape(self.position, (2,1)) # translated to the CG position
             
     def calc_vel_axles_bframe(self):
         """calculate the front and rear axle velocity in body frame
@@ -119,29 +139,36 @@ class vehicle2d_dual_track(vehicle2d):
         Vyrb = self.vel_bframe[1]-self.yaw_rate*(self.wheel_base-self.front_to_cg)
         return (Vxfb,Vyfb,Vxrb,Vyrb)
     
+    def calc_vel_wheels_bframe(self):
+        """calculate the wheel center velocities in body frame
+        Vxib = Vxb - r*yi, Vyib = Vyb + r*xi with (xi, yi) the wheel center in body frame (valid for both z-up and z-down)
+        output:
+        vel_wheels_bframe: tuple of (Vxib,Vyib) per tire, in the fl, fr, rl, rr order
+        """
+        tires_center_bframe = self.calc_tire_centers_batch(np.zeros(1))[0] # 4x2 matrix, vehicle aligned with x axis
+        (Vxb,Vyb) = self.vel_bframe
+        return tuple((Vxb-self.yaw_rate*y,Vyb+self.yaw_rate*x) for (x,y) in tires_center_bframe)
+
     def calc_force_axles_bframe(self):
         """calculate the front and rear axle forces in body frame
-        This is performed by transforming the tire frame tire forces into body frame
+        This is performed by transforming the tire frame tire forces into body frame with the wheel angles, then
+        summing the two tires of each axle
         output:
         force_axle_bframe (Fxfb,Fyfb,Fxrb,Fyrb) tuple
         
         Here it is assumed that the tire frame and the body frame are either both z-up or both z-down
         """
-        # list the tire forces
-        Fxft=self.front_tire.longitudinal_force_tframe
-        Fyft=self.front_tire.lateral_force_tframe
-        Fxrt=self.rear_tire.longitudinal_force_tframe
-        Fyrt=self.rear_tire.lateral_force_tframe
-        # the rotation_matrix rotates vectors in the front tire frame back to the body frame with an angle of -self.front_wheel_angle
-        rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
-                           [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
-        Fft = [[Fxft],[Fyft]] # 2x1 array
-        Ffb = np.matmul(rotation_matrix,Fft) # matrix multiply
-        Fxfb = Ffb[0]
-        Fyfb = Ffb[1]
-        Fxrb = Fxrt
-        Fyrb = Fyrt
-        # make result into 4-tuple
+        forces_bframe = []
+        for (tire,wheel_angle) in zip(self.get_tires(),self.wheel_angles):
+            Fxt = tire.longitudinal_force_tframe
+            Fyt = tire.lateral_force_tframe
+            # rotates the tire frame force back to the body frame with an angle of -wheel_angle
+            forces_bframe.append((Fxt*math.cos(wheel_angle)-Fyt*math.sin(wheel_angle),
+                                  Fxt*math.sin(wheel_angle)+Fyt*math.cos(wheel_angle)))
+        Fxfb = forces_bframe[0][0]+forces_bframe[1][0]
+        Fyfb = forces_bframe[0][1]+forces_bframe[1][1]
+        Fxrb = forces_bframe[2][0]+forces_bframe[3][0]
+        Fyrb = forces_bframe[2][1]+forces_bframe[3][1]
         return (Fxfb,Fyfb,Fxrb,Fyrb)
     
     def update_axle_velocity(self):
@@ -149,15 +176,13 @@ class vehicle2d_dual_track(vehicle2d):
         (Vxfb,Vyfb,Vxrb,Vyrb) = self.calc_vel_axles_bframe()
         self.vel_front_bframe = (Vxfb,Vyfb)
         self.vel_rear_bframe = (Vxrb,Vyrb)
+        self.wheel_velocities = self.calc_vel_wheels_bframe()
     
-    def draw_wheel_velocity(self,ax= None, z_up=-1,vlratio=10):
-        """
-        ax: Matplotlib axis to draw on.
-        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
-        vl_ratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
-        
-        the wheel velocity in body frame is first rotated to the global frame, then translated
-        to the axle/wheel center (currently only the front wheel velocity is implemented)
+    def calc_wheel_vel_line(self,vlratio=10):
+        """calculate the front axle velocity vector in world frame, starting at the front axle center
+        vlratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
+        output:
+        Vf_line: 2x2 matrix in vector format [[x1,x2],[y1,y2]]
         """
         (Vxfb,Vyfb) = self.vel_front_bframe
         Vxfb_scaled = Vxfb / vlratio
@@ -168,7 +193,19 @@ class vehicle2d_dual_track(vehicle2d):
                            [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
         Vf_line_rotated = np.matmul(rotation_matrix,Vf_line_default) # force rotated to world frame but centered at tire CG
         axles_center = self.calc_axles_center() # 2x2 matrix ([[axle_f_x,axle_r_x],[axle_f_y,axle_r_y])
-        Vf_line_rotated_translated = [Vf_line_rotated[0]+axles_center[0][0],Vf_line_rotated[1]+axles_center[1][0]] # translate vector to axle/wheel center
+        Vf_line_rotated_translated = np.array([Vf_line_rotated[0]+axles_center[0][0],Vf_line_rotated[1]+axles_center[1][0]]) # translate vector to axle/wheel center
+        return Vf_line_rotated_translated
+
+    def draw_wheel_velocity(self,ax= None, z_up=-1,vlratio=10):
+        """
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        vl_ratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
+        
+        the wheel velocity in body frame is first rotated to the global frame, then translated
+        to the axle/wheel center (currently only the front wheel velocity is implemented)
+        """
+        Vf_line_rotated_translated = self.calc_wheel_vel_line(vlratio) # front axle velocity vector in world frame
         # draw_vector_with_text(Vf_line_rotated_translated,"k",text=r"$V_f$",l_text=0.3,z_up=z_up,turn_ang=5/6*math.pi)
         draw_vector_with_text_rf(Vf_line_rotated_translated, ax=ax, z_up=z_up, turn_ang=5/6*math.pi)
         
\ No newline at end of file
@@ -5,6 +5,7 @@ from vehicle2d import *
 from tire2d import *
 class vehicle2d_single_track(vehicle2d):
     """single track vehicle (one tire per axle)"""
+    num_front_tires = 1 # the first num_front_tires entries of get_tires() are on the front axle
     front_tire = []
     rear_tire = []
     front_wheel_angle = [] # radians
@@ -32,11 +33,7 @@ class vehicle2d_single_track(vehicle2d):
 
         self.draw_veh_body(z_up=z_up)
         # calculate the tires' poses
-        tires_center = self.calc_axles_center()
-        tires_wheel_angles_bframe = np.array([self.front_wheel_angle,0]) # assume rear wheel is always alined with body axis
-        tires_headings = tires_wheel_angles_bframe + self.heading # 2x1 matrix
-        tire_pose_front = (tires_center[0,0],tires_center[1,0],tires_headings[0])
-        tire_pose_rear = (tires_center[0,1],tires_center[1,1],tires_headings[1])
+        (tire_pose_front,tire_pose_rear) = self.calc_tire_poses()
         self.update_axle_velocity() # use body velocity, yawrate, and steer angle to calculate axle velocity
         if draw_whl_v:
             self.draw_wheel_velocity(ax=ax, z_up=z_up)
@@ -48,6 +45,30 @@ class vehicle2d_single_track(vehicle2d):
 
         return ax
             
+    def get_tires(self):
+        """return the tires in the front, rear order"""
+        return (self.front_tire,self.rear_tire)
+
+    def calc_tire_poses(self):
+        """calculate the tires' poses in world frame
+        output:
+        tire_poses: tuple of (x_tire, y_tire, heading_tire) per tire, in the front, rear order
+        """
+        tires_center = self.calc_axles_center()
+        tires_wheel_angles_bframe = np.array([self.front_wheel_angle,0]) # assume rear wheel is always alined with body axis
+        tires_headings = tires_wheel_angles_bframe + self.heading # 2x1 matrix
+        tire_pose_front = (tires_center[0,0],tires_center[1,0],tires_headings[0])
+        tire_pose_rear = (tires_center[0,1],tires_center[1,1],tires_headings[1])
+        return (tire_pose_front,tire_pose_rear)
+
+    def get_wheel_angles(self):
+        """return the wheel angles in body frame in the front, rear order"""
+        return (self.front_wheel_angle,0) # assume rear wheel is always alined with body axis
+
+    def calc_tire_centers_batch(self, headings, positions=None):
+        """calculate the (N,2,2) tire centers for N body headings, in the front, rear order"""
+        return axle_centers(headings, self.front_to_cg, self.wheel_base, positions)
+
     def calc_axles_center(self):
         """calculate the front and rear axle geometric center"""
         a = self.front_to_cg
@@ -57,7 +78,7 @@ class vehicle2d_single_track(vehicle2d):
         rotation_matrix = [[math.cos(-self.heading),math.sin(-self.heading)],
                            [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
         axles_center = np.matmul(rotation_matrix,axles_center_bframe) # 2x2 matrix ([[axle_f_x,axle_r_x],[axle_f_y,axle_r_y])
-        return axles_center
+        return axles_center + np.reshape(self.position, (2,1)) # translated to the CG position
             
     def calc_vel_axles_bframe(self):
         """calculate the front and rear axle velocity in body frame
@@ -102,14 +123,11 @@ class vehicle2d_single_track(vehicle2d):
         self.vel_front_bframe = (Vxfb,Vyfb)
         self.vel_rear_bframe = (Vxrb,Vyrb)
     
-    def draw_wheel_velocity(self,ax=None, z_up=-1,vlratio=10):
-        """
-        ax: Matplotlib axis to draw on.
-        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
-        vl_ratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
-        
-        the wheel velocity in body frame is first rotated to the global frame, then translated
-        to the axle/wheel center (currently only the front wheel velocity is implemented)
+    def calc_wheel_vel_line(self,vlratio=10):
+        """calculate the front axle velocity vector in world frame, starting at the front axle center
+        vlratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
+        output:
+        Vf_line: 2x2 matrix in vector format [[x1,x2],[y1,y2]]
         """
         (Vxfb,Vyfb) = self.vel_front_bframe
         Vxfb_scaled = Vxfb / vlratio
@@ -120,6 +138,18 @@ class vehicle2d_single_track(vehicle2d):
                            [-math.sin(-self.heading),math.cos(-self.heading)]] # 2x2 matrix
         Vf_line_rotated = np.matmul(rotation_matrix,Vf_line_default) # force rotated to world frame but centered at tire CG
         axles_center = self.calc_axles_center() # 2x2 matrix ([[axle_f_x,axle_r_x],[axle_f_y,axle_r_y])
-        Vf_line_rotated_translated = [Vf_line_rotated[0]+axles_center[0][0],Vf_line_rotated[1]+axles_center[1][0]] # translate vector to axle/wheel center
+        Vf_line_rotated_translated = np.array([Vf_line_rotated[0]+axles_center[0][0],Vf_line_rotated[1]+axles_center[1][0]]) # translate vector to axle/wheel center
+        return Vf_line_rotated_translated
+
+    def draw_wheel_velocity(self,ax=None, z_up=-1,vlratio=10):
+        """
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        vl_ratio: velocity(m/s)-length(m) ratio for determining the length of velocity arrow on figure
+        
+        the wheel velocity in body frame is first rotated to the global frame, then translated
+        to the axle/wheel center (currently only the front wheel velocity is implemented)
+        """
+        Vf_line_rotated_translated = self.calc_wheel_vel_line(vlratio) # front axle velocity vector in world frame
         # draw_vector_with_text(Vf_line_rotated_translated,"k",text=r"$V_f$",l_text=0.3,z_up=z_up,turn_ang=5/6*math.pi)
         draw_vector_with_text_rf(Vf_line_rotated_translated, ax=ax, z_up=z_up, turn_ang=5/6*math.pi)
\ No newline at end of file
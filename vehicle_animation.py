@@ -0,0 +1,94 @@
+import matplotlib.pyplot as plt
+import math
+import numpy as np
+from matplotlib import animation
+from vehicle_renderer import *
+
+class vehicle_animation:
+    """animation of a logged vehicle trajectory
+    The frames are stepped either by row number or by time through a vehicle_plot, and drawn by a
+    vehicle_renderer so that only the moving artists are returned to FuncAnimation(blit=True).
+    """
+
+    def __init__(self, plot, ax=None, z_up=-1, step_by='time', time_step=1/30, skip=1, start=None, stop=None,
+                 interp=None, renderer_class=vehicle_renderer, **renderer_kwargs):
+        """
+        plot: the vehicle_plot that provides the data and the vehicle
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        step_by: 'time' to step frames at a fixed time_step, 'row' to step frames through the data rows
+        time_step: time between two frames in seconds when step_by is 'time'
+        skip: decimation factor, only every skip-th frame is played
+        start, stop: first and last time (step_by='time') or row number (step_by='row') of the animation
+        interp: None, 'linear' or 'slerp' sample interpolation when step_by is 'time', see vehicle_plot
+        renderer_class: vehicle_renderer, or vehicle_scene to move the artists through transforms
+        renderer_kwargs: passed on to the renderer (e.g. draw_whl_v, fl_ratio)
+        """
+        if ax is None:
+            ax = plt.gca()
+        if step_by not in ('time', 'row'):
+            raise ValueError("step_by must be 'time' or 'row', got %r" % (step_by,))
+        self.plot = plot
+        self.ax = ax
+        self.step_by = step_by
+        self.time_step = time_step
+        self.skip = max(int(skip), 1)
+        self.interp = interp
+        self.renderer = renderer_class(plot.vehicle, ax=ax, z_up=z_up, **renderer_kwargs)
+        self.frames = self.build_frames(start, stop)
+
+    def build_frames(self, start=None, stop=None):
+        """build the sequence of frame values (times or row numbers) after decimation
+        start, stop: first and last time or row number, default to the whole data file
+        """
+        if self.step_by == 'row':
+            start = 0 if start is None else int(start)
+            stop = len(self.plot) - 1 if stop is None else int(stop)
+            return np.arange(start, stop + 1, self.skip)
+        time = self.plot.time_sorted
+        start = time[0] if start is None else start
+        stop = time[-1] if stop is None else stop
+        n_frames = int(math.floor((stop - start) / self.time_step + 1e-9)) + 1
+        return start + self.time_step * np.arange(0, n_frames, self.skip)
+
+    def frame_interval(self):
+        """real-time interval between two played frames in milliseconds"""
+        if self.step_by == 'time':
+            return 1000 * self.time_step * self.skip
+        # rows are not equally spaced in time, use the mean sample period of the played range
+        time = self.plot.data_source.time[self.frames]
+        if len(time) < 2:
+            return 1000 * self.time_step
+        return 1000 * (time[-1] - time[0]) / (len(time) - 1)
+
+    def init_func(self):
+        """create the vehicle artists on the first call and restart the path trace, used as the FuncAnimation init_func"""
+        if not self.renderer.artists:
+            self.renderer.init_artists()
+        self.renderer.reset_trace()
+        return self.renderer.update()
+
+    def update(self, frame):
+        """move the vehicle to one frame value and return the changed artists
+        frame: a time or a row number, as produced by build_frames
+        """
+        if self.step_by == 'row':
+            self.plot.update_vehicle_by_row_num(int(frame))
+        else:
+            self.plot.update_vehicle_by_time(frame, interp=self.interp)
+        return self.renderer.update()
+
+    def animate(self, fig=None, interval=None, blit=True, repeat=True, **kwargs):
+        """create the matplotlib animation
+        fig: the figure holding ax, default to the figure of ax
+        interval: delay between frames in milliseconds, default to real-time playback
+        blit: whether only the changed artists are redrawn
+        kwargs: passed on to FuncAnimation
+        """
+        if fig is None:
+            fig = self.ax.figure
+        if interval is None:
+            interval = self.frame_interval()
+        self.anim = animation.FuncAnimation(fig, self.update, frames=self.frames, init_func=self.init_func,
+                                            interval=interval, blit=blit, repeat=repeat, **kwargs)
+        return self.anim
@@ -0,0 +1,138 @@
+# linked dashboard of the vehicle view and per-wheel time series, driven by one time cursor
+import matplotlib.pyplot as plt
+import numpy as np
+from vehicle_renderer import *
+from vehicle_timeline import *
+
+class vehicle_dashboard:
+    """vehicle view next to time-series panels of the per-wheel quantities of a log, all driven by one time cursor
+    The time series are drawn once into the figure background (and again only when a panel is zoomed or panned).
+    The vehicle artists and the cursor lines are animated artists: moving the cursor restores the cached background
+    and redraws only them with blitting, so the cost of a cursor move does not grow with the number of panels.
+    Click or drag on a time-series panel to move the cursor, or use the left/right arrow keys to step it.
+
+    d = vehicle_dashboard(p, view_limits=((-5, 5), (-5, 5)))
+    d.set_time(8.5)
+    """
+
+    def __init__(self, plot, quantities=('Fx', 'Fy', 'Alpha'), fig=None, z_up=-1, view_limits=((-5, 5), (-5, 5)),
+                 time_step=0.05, interp=None, pyramid=None, renderer_class=vehicle_renderer, **renderer_kwargs):
+        """
+        plot: the vehicle_plot that provides the data and the vehicle
+        quantities: the per-tire quantities to plot, one panel each with a line per tire
+        fig: the Matplotlib figure to fill, a new figure is created when None
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        view_limits: ((xmin, xmax), (ymin, ymax)) fixed limits of the vehicle view in plotting coordinates
+        time_step: cursor step of the arrow keys in seconds
+        interp: None, 'linear' or 'slerp' sample interpolation at the cursor time, see vehicle_plot
+        pyramid: a lod_pyramid of the plot holding the <quantity>_<tire> fields, built when None
+        renderer_class: vehicle_renderer, or vehicle_scene to move the vehicle artists through transforms
+        renderer_kwargs: passed on to the renderer (e.g. fl_ratio), the view is fixed so follow is not supported
+        """
+        if renderer_kwargs.get('follow'):
+            raise ValueError("the vehicle view of a dashboard is blitted over a fixed background, follow is not supported")
+        self.plot = plot
+        self.quantities = tuple(quantities)
+        self.time_step = time_step
+        self.interp = interp
+        self.names = [['%s_%d' % (quantity, i) for i in range(4)] for quantity in self.quantities] # fl, fr, rl, rr
+        if pyramid is None:
+            pyramid = lod_pyramid(plot, fields=[name for names in self.names for name in names])
+        self.pyramid = pyramid
+
+        self.fig = plt.figure(figsize=(12, 6)) if fig is None else fig
+        grid = self.fig.add_gridspec(len(self.quantities), 2, width_ratios=(1, 1.4))
+        self.ax = self.fig.add_subplot(grid[:, 0])
+        self.ax.set_xlim(*view_limits[0])
+        self.ax.set_ylim(*view_limits[1])
+        self.renderer = renderer_class(plot.vehicle, ax=self.ax, z_up=z_up, **renderer_kwargs)
+        self.panels = []
+        for (row, names) in enumerate(self.names):
+            ax = self.fig.add_subplot(grid[row, 1], sharex=self.panels[0].ax if self.panels else None)
+            ax.set_ylabel(self.quantities[row])
+            self.panels.append(timeline_panel(pyramid, names, ax=ax))
+        self.panels[-1].ax.set_xlabel('time (s)')
+
+        self.renderer.init_artists()
+        self.ax.set_xlim(*view_limits[0]) # init_artists rescales to the first state
+        self.ax.set_ylim(*view_limits[1])
+        for panel in self.panels:
+            panel.init_artists()
+        self.animated_artists = list(self.renderer.artists) + [panel.cursor for panel in self.panels]
+        for artist in self.animated_artists:
+            artist.set_animated(True)
+        self.time = pyramid.time[0] if len(pyramid.time) else 0.0
+        self.background = None
+        self.dragging = False
+        canvas = self.fig.canvas
+        self.callback_ids = [canvas.mpl_connect('draw_event', self.on_draw),
+                             canvas.mpl_connect('button_press_event', self.on_press),
+                             canvas.mpl_connect('motion_notify_event', self.on_motion),
+                             canvas.mpl_connect('button_release_event', self.on_release),
+                             canvas.mpl_connect('key_press_event', self.on_key)]
+        self.move_to(self.time)
+
+    def on_draw(self, event):
+        """cache the background (everything but the animated artists) after every full draw"""
+        canvas = self.fig.canvas
+        self.background = canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        """draw the vehicle artists and the cursors over the figure"""
+        for artist in self.animated_artists:
+            self.fig.draw_artist(artist)
+
+    def move_to(self, time):
+        """move the vehicle and the cursors to a time without drawing
+        output:
+        artists: the changed artists
+        """
+        self.time = time
+        self.plot.update_vehicle_by_time(time, interp=self.interp)
+        changed = self.renderer.update()
+        return changed + [panel.set_cursor(time) for panel in self.panels]
+
+    def set_time(self, time):
+        """move every panel to a time, redrawing only the vehicle artists and the cursors over the cached background"""
+        self.move_to(time)
+        canvas = self.fig.canvas
+        if self.background is None:
+            # nothing drawn yet: the first full draw caches the background
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self.draw_animated()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def is_navigating(self):
+        """whether a toolbar zoom or pan mode takes the mouse events"""
+        toolbar = getattr(self.fig.canvas, 'toolbar', None)
+        return toolbar is not None and bool(getattr(toolbar, 'mode', ''))
+
+    def on_press(self, event):
+        if event.button != 1 or event.xdata is None or self.is_navigating():
+            return
+        if any(event.inaxes is panel.ax for panel in self.panels):
+            self.dragging = True
+            self.set_time(event.xdata)
+
+    def on_motion(self, event):
+        if self.dragging and event.xdata is not None and any(event.inaxes is panel.ax for panel in self.panels):
+            self.set_time(event.xdata)
+
+    def on_release(self, event):
+        self.dragging = False
+
+    def on_key(self, event):
+        if event.key in ('left', 'right'):
+            time = self.pyramid.time
+            step = self.time_step if event.key == 'right' else -self.time_step
+            self.set_time(float(np.clip(self.time + step, time[0], time[-1])))
+
+    def disconnect(self):
+        """stop reacting to the figure events"""
+        for callback_id in self.callback_ids:
+            self.fig.canvas.mpl_disconnect(callback_id)
+        self.callback_ids = []
@@ -0,0 +1,164 @@
+# mapping of telemetry log columns onto the vehicle state fields
+import math
+import numpy as np
+
+# the data file columns that make up one vehicle state, tires follow the fl, fr, rl, rr order
+STATE_FIELDS = ('X', 'Y', 'psi', 'xdot', 'ydot',
+                'Fx_0', 'Fx_1', 'Fx_2', 'Fx_3',
+                'Fy_0', 'Fy_1', 'Fy_2', 'Fy_3',
+                'Alpha_0', 'Alpha_1', 'Alpha_2', 'Alpha_3')
+
+# the world frame positions are optional: a log without these columns reads them as 0, only world frame rendering
+# needs them
+OPTIONAL_FIELDS = ('X', 'Y')
+
+# the wheel spin fields of the log, not part of the default state but read by the derived channels
+WHEEL_FIELDS = ('Omega_0', 'Omega_1', 'Omega_2', 'Omega_3',
+                'Kappa_0', 'Kappa_1', 'Kappa_2', 'Kappa_3')
+
+# the per-tire quantities among the state and wheel fields, named <quantity>_<tire index>
+TIRE_QUANTITIES = ('Fx', 'Fy', 'Alpha', 'Omega', 'Kappa')
+
+# scale factors from supported units to the SI units used by the vehicle classes
+UNIT_SCALES = {'rad': 1.0, 'deg': math.pi / 180,
+               'N': 1.0, 'kN': 1000.0,
+               'm/s': 1.0, 'km/h': 1 / 3.6, 'mph': 0.44704,
+               's': 1.0, 'ms': 1e-3}
+
+def state_dtype(fields=STATE_FIELDS, dtype=np.float64):
+    """returns the structured dtype of a vehicle state record"""
+    return np.dtype([(name, dtype) for name in fields])
+
+def unit_scale(unit):
+    """returns the factor that converts a value in unit to SI (a number is used as the factor itself)"""
+    if isinstance(unit, (int, float)):
+        return float(unit)
+    try:
+        return UNIT_SCALES[unit]
+    except KeyError:
+        raise ValueError("unknown unit %r, expected one of %s" % (unit, sorted(UNIT_SCALES))) from None
+
+class data_schema:
+    """description of how a telemetry log maps onto the vehicle state fields
+    The default schema is the drift_data.csv layout. A schema for another simulator only lists what differs, e.g.
+    data_schema(columns={'psi': 'yaw', 'Fx': 'tire{}_fx'}, units={'psi': 'deg', 'Fx': 'kN'}, tire_order=(1,0,3,2))
+    """
+
+    def __init__(self, columns=None, units=None, tire_order=(0, 1, 2, 3), time_column='time', time_unit='s',
+                 fields=STATE_FIELDS):
+        """
+        columns: dictionary from a state field ('psi', 'Fx_2') or a tire quantity ('Fx', 'Fy', 'Alpha') to the
+        source column name. A tire quantity maps to a name pattern where '{}' is replaced by the source tire index.
+        Fields that are not listed keep their own name. A field mapped to None is not in the log and reads as 0, as
+        do the OPTIONAL_FIELDS that are not listed and not in the log.
+        units: dictionary from a state field or tire quantity to the unit of the source column (a key of
+        UNIT_SCALES or a number used as scale factor). Fields that are not listed are assumed in SI units.
+        tire_order: the source tire index of the fl, fr, rl and rr tires
+        time_column, time_unit: name and unit of the source time column
+        fields: the state fields to serve
+        """
+        self.columns = dict(columns or {})
+        self.units = dict(units or {})
+        self.tire_order = tuple(tire_order)
+        self.time_column = time_column
+        self.time_unit = time_unit
+        self.fields = tuple(fields)
+
+    def _lookup(self, table, field):
+        """the entry of a field in columns or units, falling back to its tire quantity entry"""
+        if field in table:
+            return field, table[field]
+        quantity = field.rsplit('_', 1)[0]
+        if quantity in TIRE_QUANTITIES and quantity in table:
+            return quantity, table[quantity]
+        return None, None
+
+    def source_column(self, field):
+        """returns the source column name of a state field"""
+        (key, name) = self._lookup(self.columns, field)
+        (quantity, _, tire) = field.rpartition('_')
+        is_tire_field = quantity in TIRE_QUANTITIES
+        source_tire = self.tire_order[int(tire)] if is_tire_field else None
+        if key is None:
+            # keep the field name, only renumbering the tire
+            return '%s_%d' % (quantity, source_tire) if is_tire_field else field
+        if name is not None and key != field and is_tire_field:
+            return name.format(source_tire)
+        return name
+
+    def with_fields(self, fields):
+        """returns a copy of the schema serving other fields with the same column, unit and tire mappings"""
+        return data_schema(self.columns, self.units, self.tire_order, self.time_column, self.time_unit, fields)
+
+    def signature(self, fields=None):
+        """returns a json-serializable description of how fields map onto the source columns, e.g. to check that
+        data derived from a log was computed with the same mapping
+        fields: the fields to describe, default to the fields of the schema
+        """
+        fields = self.fields if fields is None else fields
+        return {'columns': {field: self.source_column(field) for field in fields},
+                'scales': {field: unit_scale(self._lookup(self.units, field)[1] or 1.0) for field in fields},
+                'tire_order': list(self.tire_order),
+                'time': [self.time_column, unit_scale(self.time_unit)]}
+
+    def resolve(self, names):
+        """resolve the schema against the column names of a log, once at load time
+        names: the column names of the source log, in file order
+        output:
+        a resolved_schema holding the source column indices and scale factors of every field
+        """
+        return resolved_schema(self, list(names))
+
+class resolved_schema:
+    """a data_schema bound to the column names of one log
+    fields: the state fields
+    source_columns: source column name per field
+    column_indices: source column index per field
+    scales: SI scale factor per field
+    time_index, time_scale: source column index and SI scale factor of the time column
+    """
+
+    def __init__(self, schema, names):
+        self.schema = schema
+        self.names = names
+        self.fields = schema.fields
+        self.source_columns = [None if field in OPTIONAL_FIELDS and schema._lookup(schema.columns, field)[0] is None
+                               and schema.source_column(field) not in names else schema.source_column(field)
+                               for field in self.fields]
+        missing = [name for name in self.source_columns + [schema.time_column]
+                   if name is not None and name not in names]
+        if missing:
+            raise KeyError("the log has no column(s) %s required by the schema" % ', '.join(map(repr, missing)))
+        index = {name: i for (i, name) in enumerate(names)}
+        self.column_indices = [index.get(name) for name in self.source_columns] # None for fields not in the log
+        self.scales = [unit_scale(schema._lookup(schema.units, field)[1] or 1.0) for field in self.fields]
+        self.time_column = schema.time_column
+        self.time_index = index[schema.time_column]
+        self.time_scale = unit_scale(schema.time_unit)
+
+    def has_field(self, field):
+        """returns True if the field is read from a column of the log, False if it reads as 0"""
+        return field in self.fields and self.source_columns[self.fields.index(field)] is not None
+
+    @property
+    def usecols(self):
+        """sorted source column indices needed for the time column and the state fields"""
+        return sorted(set(i for i in self.column_indices if i is not None) | {self.time_index})
+
+    def convert_time(self, values):
+        """returns the source time column in seconds, without a copy when no conversion is needed"""
+        return values if self.time_scale == 1.0 else values * self.time_scale
+
+    def build_states(self, column, dtype=np.float64):
+        """build the structured array of vehicle states from source columns
+        column: callable returning the numpy array of a source column by name
+        dtype: numpy dtype of the state fields
+        """
+        names = [name for name in self.source_columns if name is not None]
+        n_rows = len(column(names[0] if names else self.time_column))
+        states = np.zeros(n_rows, dtype=state_dtype(self.fields, dtype))
+        for (field, name, scale) in zip(self.fields, self.source_columns, self.scales):
+            if name is not None:
+                values = column(name)
+                states[field] = values if scale == 1.0 else values * scale
+        return states
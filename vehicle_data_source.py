@@ -0,0 +1,385 @@
+# data sources that serve vehicle states from telemetry logs to vehicle_plot
+import collections
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from vehicle_data_schema import *
+
+class data_source:
+    """base class of the vehicle data sources
+    A data source keeps the time column of the log resident (it is needed for the time index) and serves the
+    vehicle states by row number through get_states(). Subclasses decide how the other columns are stored.
+    The source columns, units and tire order are mapped onto the state fields by a data_schema, resolved once
+    against the log header at load time (self.schema).
+    """
+    schema = None # the resolved_schema of the log
+    time = None # the time column in file order, in seconds
+    live = False # whether rows are still appended (and dropped), the row numbers and time index are then not fixed
+
+    def __len__(self):
+        return len(self.time)
+
+    def get_states(self, row_nums):
+        """get the vehicle states at a row number, an array of row numbers or a slice
+        output:
+        a state record for a single row number, otherwise a structured array of states
+        """
+        raise NotImplementedError
+
+    def iter_states(self, chunk_size=65536):
+        """iterate over the whole log in order, chunk by chunk
+        output:
+        yields (first_row_num, states) with states a structured array of at most chunk_size records
+        """
+        for start in range(0, len(self), chunk_size):
+            yield start, self.get_states(slice(start, min(start + chunk_size, len(self))))
+
+    def read_fields(self, fields):
+        """read whole columns of fields outside the state fields of the schema (e.g. WHEEL_FIELDS)
+        The fields are mapped with the columns, units and tire order of the schema of the source.
+        output:
+        a structured array with the given fields, one record per data row
+        """
+        schema = self.schema.schema.with_fields(fields).resolve(self.schema.names)
+        return schema.build_states(self.columns.__getitem__)
+
+class csv_data_source(data_source):
+    """in-memory data source, the whole csv file is loaded once into numpy arrays
+    columns: one contiguous float64 array per data file column
+    states: structured array of the vehicle states, one record per data row
+    """
+
+    def __init__(self, csv_data_file, schema=None):
+        """
+        csv_data_file: the csv log with a header line, or a pandas DataFrame with the columns of the log (e.g.
+        the output of a simulation)
+        schema: the data_schema of the log, default to the drift_data.csv layout
+        """
+        self.df = csv_data_file if isinstance(csv_data_file, pd.DataFrame) else pd.read_csv(csv_data_file)
+        self.csv_data_file = None if isinstance(csv_data_file, pd.DataFrame) else csv_data_file
+        self.schema = (schema or data_schema()).resolve(self.df.columns)
+        self.columns = {name: np.ascontiguousarray(self.df[name].to_numpy(dtype=np.float64))
+                        for name in self.df.columns}
+        self.time = self.schema.convert_time(self.columns[self.schema.time_column])
+        self.states = self.schema.build_states(self.columns.__getitem__)
+
+    def get_states(self, row_nums):
+        if isinstance(row_nums, (slice, int, np.integer)):
+            return self.states[row_nums]
+        return self.states[np.asarray(row_nums, dtype=np.intp)]
+
+class chunked_csv_data_source(data_source):
+    """streaming data source for csv logs that do not fit in memory
+    Only the time column and the byte offset of every chunk are kept resident. The state columns are parsed
+    chunk by chunk on demand, converted to dtype, and the most recently used chunks are kept in an LRU cache,
+    so memory stays bounded by cache_chunks * chunk_size records whatever the file size.
+    """
+
+    def __init__(self, csv_data_file, schema=None, chunk_size=65536, cache_chunks=8, dtype=np.float64,
+                 block_size=1 << 24):
+        """
+        csv_data_file: the csv log with a header line
+        schema: the data_schema of the log, default to the drift_data.csv layout
+        chunk_size: number of data rows per chunk
+        cache_chunks: number of parsed chunks kept in memory
+        dtype: numpy dtype of the state fields (np.float32 halves the memory of the cache)
+        block_size: bytes read at a time while indexing the file
+        """
+        self.csv_data_file = csv_data_file
+        self.chunk_size = int(chunk_size)
+        self.cache_chunks = max(int(cache_chunks), 1)
+        self.dtype = dtype
+        self.cache = collections.OrderedDict()
+        self.names = list(pd.read_csv(csv_data_file, nrows=0).columns)
+        self.schema = (schema or data_schema()).resolve(self.names)
+        self.chunk_offsets = self.index_chunks(block_size)
+        # the time column is read in chunks as well, only the float64 array is kept
+        time_column = self.schema.time_column
+        self.time = self.schema.convert_time(np.concatenate(
+            [chunk[time_column].to_numpy(dtype=np.float64) for chunk in
+             pd.read_csv(csv_data_file, usecols=[self.schema.time_index], chunksize=self.chunk_size)]))
+
+    def index_chunks(self, block_size):
+        """find the byte offset of the first line of every chunk without parsing the file
+        Blank (empty or whitespace-only) lines are skipped by the csv parser, so they are not counted as rows.
+        output:
+        chunk_offsets: list of byte offsets, one per chunk of chunk_size data rows
+        """
+        offsets = []
+        n_rows = -1 # row number of the next non-blank line
+        (line_start, has_content) = (0, False) # the line running across the block boundary
+        whitespace = np.zeros(256, dtype=bool)
+        whitespace[[9, 10, 13, 32]] = True # tab, newline, carriage return, space
+
+        def add_lines(starts, non_blank):
+            nonlocal n_rows
+            starts = starts[non_blank]
+            rows = n_rows + np.arange(len(starts)) # the header line is row -1
+            is_chunk_start = (rows >= 0) & (rows % self.chunk_size == 0)
+            offsets.extend(int(o) for o in starts[is_chunk_start])
+            n_rows += len(starts)
+
+        with open(self.csv_data_file, 'rb') as f:
+            position = 0
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                data = np.frombuffer(block, dtype=np.uint8)
+                newlines = np.flatnonzero(data == 10)
+                content = np.concatenate(([0], np.cumsum(~whitespace[data])))
+                if len(newlines):
+                    # lines ending in this block: the carried line, then the lines starting after each newline
+                    ends = newlines
+                    begins = np.concatenate(([0], newlines[:-1] + 1))
+                    non_blank = content[ends] - content[begins] > 0
+                    non_blank[0] |= has_content
+                    add_lines(np.concatenate(([line_start], begins[1:] + position)), non_blank)
+                    line_start = int(newlines[-1]) + 1 + position
+                    has_content = bool(content[-1] - content[newlines[-1] + 1] > 0)
+                else:
+                    has_content = has_content or bool(content[-1] > 0)
+                position += len(block)
+        # the last line, when the file does not end with a newline
+        add_lines(np.array([line_start]), np.array([has_content]))
+        return offsets
+
+    def load_chunk(self, chunk_num):
+        """parse one chunk into a structured array of states, served from the LRU cache when possible"""
+        if chunk_num in self.cache:
+            self.cache.move_to_end(chunk_num)
+            return self.cache[chunk_num]
+        n_rows = min(self.chunk_size, len(self) - chunk_num * self.chunk_size)
+        with open(self.csv_data_file, 'rb') as f:
+            f.seek(self.chunk_offsets[chunk_num])
+            df = pd.read_csv(f, header=None, names=self.names, usecols=self.schema.usecols, nrows=n_rows,
+                             dtype=np.float64)
+        states = self.schema.build_states(lambda name: df[name].to_numpy(), self.dtype)
+        self.cache[chunk_num] = states
+        while len(self.cache) > self.cache_chunks:
+            self.cache.popitem(last=False)
+        return states
+
+    def get_states(self, row_nums):
+        if isinstance(row_nums, (int, np.integer)):
+            row_num = int(row_nums) + len(self) if row_nums < 0 else int(row_nums)
+            if not 0 <= row_num < len(self):
+                raise IndexError("row number %d is out of range for %d rows" % (row_nums, len(self)))
+            return self.load_chunk(row_num // self.chunk_size)[row_num % self.chunk_size]
+        if isinstance(row_nums, slice):
+            row_nums = np.arange(*row_nums.indices(len(self)))
+        row_nums = np.asarray(row_nums, dtype=np.intp)
+        row_nums = np.where(row_nums < 0, row_nums + len(self), row_nums)
+        if row_nums.size and (row_nums.min() < 0 or row_nums.max() >= len(self)):
+            raise IndexError("row numbers are out of range for %d rows" % len(self))
+        states = np.empty(row_nums.shape, dtype=state_dtype(self.schema.fields, self.dtype))
+        chunk_nums = row_nums // self.chunk_size
+        for chunk_num in np.unique(chunk_nums):
+            mask = chunk_nums == chunk_num
+            states[mask] = self.load_chunk(int(chunk_num))[row_nums[mask] - chunk_num * self.chunk_size]
+        return states
+
+    def iter_states(self, chunk_size=None):
+        """iterate over the whole log in order with a single sequential read, bypassing the chunk cache
+        chunk_size: number of records per yielded chunk, default to the chunk size of the source
+        """
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+        start = 0
+        for df in pd.read_csv(self.csv_data_file, usecols=self.schema.usecols, chunksize=chunk_size,
+                              dtype=np.float64):
+            states = self.schema.build_states(lambda name: df[name].to_numpy(), self.dtype)
+            yield start, states
+            start += len(states)
+
+    def read_fields(self, fields):
+        schema = self.schema.schema.with_fields(fields).resolve(self.names)
+        return np.concatenate([schema.build_states(lambda name: df[name].to_numpy(), self.dtype) for df in
+                               pd.read_csv(self.csv_data_file, usecols=schema.usecols, chunksize=self.chunk_size,
+                                           dtype=np.float64)])
+
+# binary columnar cache of csv logs
+NPY_CACHE_VERSION = 1
+
+def default_cache_dir(csv_data_file):
+    """returns the default cache directory of a csv log, next to the source file"""
+    return csv_data_file + '.npycache'
+
+def file_signature(csv_data_file, hash_file=False, block_size=1 << 24):
+    """returns the size, modification time and optionally the sha1 hash of a file"""
+    stat = os.stat(csv_data_file)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if hash_file:
+        sha1 = hashlib.sha1()
+        with open(csv_data_file, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                sha1.update(block)
+        signature['sha1'] = sha1.hexdigest()
+    return signature
+
+def count_rows(csv_data_file, block_size=1 << 24):
+    """count the lines after the header line of a csv file, without parsing it
+    This is an upper bound of the data rows: blank lines are counted but skipped by the csv parser.
+    """
+    n_newlines = 0
+    last = b'\n'
+    with open(csv_data_file, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            n_newlines += block.count(b'\n')
+            last = block[-1:]
+    n_lines = n_newlines + (last != b'\n')
+    return max(n_lines - 1, 0)
+
+def convert_csv_to_npy(csv_data_file, cache_dir=None, chunk_size=65536, hash_file=True):
+    """convert a csv log into a columnar binary cache, one float64 .npy file per column plus a header.json
+    The conversion streams the csv chunk by chunk, so it works for logs larger than memory. The cache is written to a
+    temporary directory first and renamed into place, so a reader never sees a half-written cache.
+    csv_data_file: the csv log with a header line
+    cache_dir: the cache directory, default to default_cache_dir(csv_data_file)
+    chunk_size: number of rows parsed at a time
+    hash_file: also store the sha1 hash of the source, so a touched but unchanged source is not reconverted
+    output:
+    cache_dir: the directory of the written cache
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir(csv_data_file)
+    check_cache_replaceable(cache_dir)
+    signature = file_signature(csv_data_file, hash_file=hash_file)
+    names = list(pd.read_csv(csv_data_file, nrows=0).columns)
+    max_rows = count_rows(csv_data_file)
+
+    tmp_dir = tempfile.mkdtemp(prefix='.npycache-', dir=os.path.dirname(os.path.abspath(cache_dir)))
+    try:
+        columns = {name: np.lib.format.open_memmap(os.path.join(tmp_dir, name + '.npy'), mode='w+',
+                                                   dtype=np.float64, shape=(max_rows,)) for name in names}
+        n_rows = 0
+        for df in pd.read_csv(csv_data_file, chunksize=chunk_size, dtype=np.float64):
+            for name in names:
+                columns[name][n_rows:n_rows + len(df)] = df[name].to_numpy()
+            n_rows += len(df)
+        for column in columns.values():
+            column.flush()
+        if n_rows < max_rows:
+            # blank lines were skipped by the parser: shrink the columns to the parsed rows
+            for name in names:
+                path = os.path.join(tmp_dir, name + '.npy')
+                np.save(path + '.tmp.npy', columns[name][:n_rows])
+                columns[name] = None # release the memory map before replacing its file
+                os.replace(path + '.tmp.npy', path)
+        del columns
+        header = {'version': NPY_CACHE_VERSION, 'source': os.path.abspath(csv_data_file), 'columns': names,
+                  'n_rows': n_rows, 'dtype': 'float64', 'signature': signature}
+        with open(os.path.join(tmp_dir, 'header.json'), 'w') as f:
+            json.dump(header, f, indent=1)
+        if check_cache_replaceable(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.replace(tmp_dir, cache_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return cache_dir
+
+def read_cache_header(cache_dir, any_version=False):
+    """returns the header dictionary of a npy cache, or None if there is no readable cache
+    any_version: also return the header of a cache written with another NPY_CACHE_VERSION
+    """
+    try:
+        with open(os.path.join(cache_dir, 'header.json')) as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict) or 'version' not in header:
+        return None
+    return header if any_version or header['version'] == NPY_CACHE_VERSION else None
+
+def check_cache_replaceable(cache_dir):
+    """make sure that writing a npy cache to cache_dir only ever replaces a previous cache
+    output:
+    exists: True if cache_dir holds a cache (of any version) or is an empty directory, False if it does not exist
+    raises FileExistsError when cache_dir is anything else, so user data is never deleted
+    """
+    if not os.path.lexists(cache_dir):
+        return False
+    if os.path.isdir(cache_dir) and not os.path.islink(cache_dir) and \
+            (read_cache_header(cache_dir, any_version=True) is not None or not os.listdir(cache_dir)):
+        return True
+    raise FileExistsError("%s exists and is not a npy cache, it is not replaced" % cache_dir)
+
+def is_cache_valid(csv_data_file, cache_dir=None):
+    """check whether the npy cache of a csv log is up to date with the source
+    The cache is valid when the source size and mtime are unchanged. When only the mtime changed and the cache
+    stores a sha1 hash, the source is hashed and the cache stays valid if the content is the same.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir(csv_data_file)
+    header = read_cache_header(cache_dir)
+    if header is None:
+        return False
+    cached = header['signature']
+    current = file_signature(csv_data_file)
+    if cached['size'] != current['size']:
+        return False
+    if cached['mtime_ns'] == current['mtime_ns']:
+        return True
+    if 'sha1' not in cached or file_signature(csv_data_file, hash_file=True)['sha1'] != cached['sha1']:
+        return False
+    # same content, only touched: refresh the stored mtime so the next check is cheap again
+    header['signature']['mtime_ns'] = current['mtime_ns']
+    with open(os.path.join(cache_dir, 'header.json'), 'w') as f:
+        json.dump(header, f, indent=1)
+    return True
+
+class npy_data_source(data_source):
+    """data source on a columnar npy cache written by convert_csv_to_npy
+    Every column is memory-mapped, so opening a log only reads the header and the pages of the columns that are
+    actually viewed are loaded lazily by the operating system.
+    columns: one read-only memory-mapped float64 array per data file column
+    """
+
+    def __init__(self, cache_dir, schema=None):
+        """
+        cache_dir: the cache directory written by convert_csv_to_npy
+        schema: the data_schema of the cached log, default to the drift_data.csv layout
+        """
+        self.cache_dir = cache_dir
+        self.header = read_cache_header(cache_dir)
+        if self.header is None:
+            raise ValueError("%s is not a npy cache of version %d" % (cache_dir, NPY_CACHE_VERSION))
+        self.columns = {name: np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r')
+                        for name in self.header['columns']}
+        self.schema = (schema or data_schema()).resolve(self.header['columns'])
+        self.time = self.schema.convert_time(self.columns[self.schema.time_column])
+
+    def field_column(self, field):
+        """returns the whole column of a state field, the memory-mapped source column itself when no unit
+        conversion is needed (zero-copy)
+        """
+        i = self.schema.fields.index(field)
+        if self.schema.source_columns[i] is None:
+            return np.zeros(len(self))
+        values = self.columns[self.schema.source_columns[i]]
+        return values if self.schema.scales[i] == 1.0 else values * self.schema.scales[i]
+
+    def get_states(self, row_nums):
+        scalar = isinstance(row_nums, (int, np.integer))
+        if not isinstance(row_nums, slice):
+            row_nums = np.atleast_1d(np.asarray(row_nums, dtype=np.intp))
+        states = self.schema.build_states(lambda name: self.columns[name][row_nums])
+        return states[0] if scalar else states
+
+def open_cached_data_source(csv_data_file, cache_dir=None, schema=None, **kwargs):
+    """open a csv log through its npy cache, converting it first when the cache is missing or stale
+    csv_data_file: the csv log with a header line
+    cache_dir: the cache directory, default to default_cache_dir(csv_data_file)
+    schema: the data_schema of the log, default to the drift_data.csv layout
+    kwargs: passed on to convert_csv_to_npy
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir(csv_data_file)
+    if not is_cache_valid(csv_data_file, cache_dir):
+        convert_csv_to_npy(csv_data_file, cache_dir, **kwargs)
+    return npy_data_source(cache_dir, schema=schema)
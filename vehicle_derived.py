@@ -0,0 +1,198 @@
+# derived channels of telemetry logs, computed once per log and persisted next to the source
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from lib_geometry import tire_centers
+from vehicle_data_source import *
+
+DERIVED_VERSION = 2
+
+def derived_channel_names():
+    """returns the names of the derived channels in storage order"""
+    tires = range(4)
+    return (('beta', 'speed', 'yaw_rate', 'steering',
+             'vx_front', 'vy_front', 'vx_rear', 'vy_rear',
+             'Fxfb', 'Fyfb', 'Fxrb', 'Fyrb') +
+            tuple('vx_%d' % i for i in tires) + tuple('vy_%d' % i for i in tires) +
+            tuple('wheel_angle_%d' % i for i in tires) + tuple('slip_%d' % i for i in tires))
+
+def vehicle_parameters(vehicle):
+    """returns the geometry of a vehicle the derived channels depend on
+    A single track vehicle lumps the two tires of an axle on its center line (zero track widths).
+    """
+    return {'front_to_cg': float(vehicle.front_to_cg), 'wheel_base': float(vehicle.wheel_base),
+            'track_widths': [float(w) for w in getattr(vehicle, 'track_widths', (0.0, 0.0))]}
+
+def calc_derived_channels(states, time, vehicle, wheel_states=None):
+    """calculate the derived channels of a whole log in one vectorized pass
+    states: structured array of the vehicle states of the log (see STATE_FIELDS)
+    time: array of the sample times in seconds
+    vehicle: the vehicle2d subclass instance providing the geometry (front_to_cg, wheel_base, track_widths)
+    wheel_states: optional structured array with the Kappa_i fields (see WHEEL_FIELDS), the combined slips
+    reduce to the slip angles without it
+    output:
+    channels: dictionary from the names of derived_channel_names() to float64 arrays, one value per row
+    'beta' sideslip angle, 'speed' magnitude of the body velocity, 'yaw_rate' derivative of the unwrapped heading,
+    'vx_front'..'vy_rear' axle center velocities and 'vx_i', 'vy_i' wheel center velocities in body frame,
+    'wheel_angle_i' wheel angles in body frame estimated from the slip angles (the rear wheels are not steered),
+    'steering' mean of the front wheel angles, 'Fxfb'..'Fyrb' axle forces in body frame,
+    'slip_i' combined slip magnitude sqrt(kappa^2 + tan(alpha)^2) per tire
+    """
+    time = np.asarray(time, dtype=np.float64)
+    n = len(time)
+    (vx, vy) = (np.asarray(states['xdot'], dtype=np.float64), np.asarray(states['ydot'], dtype=np.float64))
+    channels = {'beta': np.arctan2(vy, vx), 'speed': np.hypot(vx, vy)}
+    # central differences of the heading, rows sharing a timestamp are bridged by their neighbors
+    if n > 1:
+        (dpsi, dt) = (np.gradient(np.unwrap(np.asarray(states['psi'], dtype=np.float64))), np.gradient(time))
+        r = np.divide(dpsi, dt, out=np.zeros(n), where=dt > 0)
+    else:
+        r = np.zeros(n)
+    channels['yaw_rate'] = r
+
+    parameters = vehicle_parameters(vehicle)
+    (a, wheel_base) = (parameters['front_to_cg'], parameters['wheel_base'])
+    (x, y) = tire_centers(np.zeros(1), a, wheel_base, parameters['track_widths'])[0].T # fl, fr, rl, rr in body frame
+    channels.update(vx_front=vx, vy_front=vy + r * a, vx_rear=vx, vy_rear=vy - r * (wheel_base - a))
+
+    fx = np.stack([states['Fx_%d' % i] for i in range(4)]).astype(np.float64)
+    fy = np.stack([states['Fy_%d' % i] for i in range(4)]).astype(np.float64)
+    alpha = np.stack([states['Alpha_%d' % i] for i in range(4)]).astype(np.float64)
+    vxw = vx - r * y[:, None]
+    vyw = vy + r * x[:, None]
+    # alpha = delta - atan2(vy_wheel, vx_wheel) inverted for the front wheels, folded into +-pi/2 when reversing
+    wheel_angles = np.zeros((4, n))
+    wheel_angles[:2] = np.arctan(np.tan(alpha[:2] + np.arctan2(vyw[:2], vxw[:2])))
+    channels['steering'] = wheel_angles[:2].mean(axis=0)
+    (cos, sin) = (np.cos(wheel_angles), np.sin(wheel_angles))
+    fxb = fx * cos - fy * sin
+    fyb = fx * sin + fy * cos
+    channels.update(Fxfb=fxb[0] + fxb[1], Fyfb=fyb[0] + fyb[1], Fxrb=fxb[2] + fxb[3], Fyrb=fyb[2] + fyb[3])
+
+    kappa = np.zeros((4, n)) if wheel_states is None else \
+        np.stack([wheel_states['Kappa_%d' % i] for i in range(4)]).astype(np.float64)
+    slip = np.hypot(kappa, np.tan(alpha))
+    for i in range(4):
+        channels['vx_%d' % i] = vxw[i]
+        channels['vy_%d' % i] = vyw[i]
+        channels['wheel_angle_%d' % i] = wheel_angles[i]
+        channels['slip_%d' % i] = slip[i]
+    return {name: np.ascontiguousarray(channels[name]) for name in derived_channel_names()}
+
+def schema_signature(data_source):
+    """returns the signature of the data_schema mapping of the state and wheel fields the derived channels read"""
+    return data_source.schema.schema.signature(STATE_FIELDS + WHEEL_FIELDS)
+
+def source_file(data_source):
+    """returns the file the data source reads from, or None for in-memory data"""
+    if isinstance(data_source, npy_data_source):
+        return data_source.header['source']
+    return getattr(data_source, 'csv_data_file', None)
+
+def default_derived_dir(csv_data_file):
+    """returns the default directory of the derived channels of a log, next to the source file"""
+    return csv_data_file + '.derived'
+
+def read_derived_header(derived_dir, any_version=False):
+    """returns the header dictionary of persisted derived channels, or None if there are none readable
+    any_version: also return the header of channels written with another DERIVED_VERSION
+    """
+    try:
+        with open(os.path.join(derived_dir, 'header.json')) as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict) or 'version' not in header or 'channels' not in header:
+        return None
+    return header if any_version or header['version'] == DERIVED_VERSION else None
+
+def check_derived_replaceable(derived_dir):
+    """make sure that writing derived channels to derived_dir only ever replaces previous derived channels
+    output:
+    exists: True if derived_dir holds derived channels (of any version) or is an empty directory, False if it does
+    not exist
+    raises FileExistsError when derived_dir is anything else, so user data is never deleted
+    """
+    if not os.path.lexists(derived_dir):
+        return False
+    if os.path.isdir(derived_dir) and not os.path.islink(derived_dir) and \
+            (read_derived_header(derived_dir, any_version=True) is not None or not os.listdir(derived_dir)):
+        return True
+    raise FileExistsError("%s exists and holds no derived channels, it is not replaced" % derived_dir)
+
+def is_derived_valid(derived_dir, csv_data_file, vehicle, n_rows, schema=None):
+    """check whether persisted derived channels are up to date with the source log, the vehicle geometry and the
+    schema mapping of the log (the channels depend on its units, tire order and column mapping)
+    schema: the schema_signature of the data source the channels are derived from
+    """
+    header = read_derived_header(derived_dir)
+    if header is None:
+        return False
+    signature = file_signature(csv_data_file)
+    return (header['n_rows'] == n_rows and header['vehicle'] == vehicle_parameters(vehicle) and
+            header['signature']['size'] == signature['size'] and
+            header['signature']['mtime_ns'] == signature['mtime_ns'] and
+            header['channels'] == list(derived_channel_names()) and header.get('schema') == schema)
+
+def write_derived_channels(channels, derived_dir, csv_data_file, vehicle, schema=None):
+    """write derived channels as one float64 .npy file per channel plus a header.json
+    The directory is written to a temporary directory first and renamed into place, as the npy cache.
+    schema: the schema_signature of the data source, stored to be compared on load
+    """
+    check_derived_replaceable(derived_dir)
+    tmp_dir = tempfile.mkdtemp(prefix='.derived-', dir=os.path.dirname(os.path.abspath(derived_dir)))
+    try:
+        for (name, values) in channels.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), values)
+        header = {'version': DERIVED_VERSION, 'source': os.path.abspath(csv_data_file),
+                  'channels': list(channels), 'n_rows': len(next(iter(channels.values()))),
+                  'vehicle': vehicle_parameters(vehicle), 'signature': file_signature(csv_data_file),
+                  'schema': schema}
+        with open(os.path.join(tmp_dir, 'header.json'), 'w') as f:
+            json.dump(header, f, indent=1)
+        if check_derived_replaceable(derived_dir):
+            shutil.rmtree(derived_dir)
+        os.replace(tmp_dir, derived_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return derived_dir
+
+def load_derived_channels(derived_dir):
+    """returns the persisted derived channels as read-only memory-mapped arrays"""
+    header = read_derived_header(derived_dir)
+    if header is None:
+        raise ValueError("%s holds no derived channels of version %d" % (derived_dir, DERIVED_VERSION))
+    return {name: np.load(os.path.join(derived_dir, name + '.npy'), mmap_mode='r') for name in header['channels']}
+
+def open_derived_channels(data_source, vehicle, derived_dir=None, persist=True):
+    """get the derived channels of a log, computing them only when no up-to-date persisted copy exists
+    data_source: the vehicle_data_source data source of the log
+    vehicle: the vehicle2d subclass instance providing the geometry
+    derived_dir: the directory of the persisted channels, default to default_derived_dir of the source file
+    persist: write the channels to derived_dir after computing them (logs without a source file, e.g. simulation
+    results, are never persisted)
+    output:
+    channels: dictionary of derived channel arrays, see calc_derived_channels
+    """
+    csv_data_file = source_file(data_source)
+    if csv_data_file is None:
+        derived_dir = None # nothing to validate a persisted copy against
+    elif derived_dir is None:
+        derived_dir = default_derived_dir(csv_data_file)
+    schema = schema_signature(data_source) if derived_dir is not None else None
+    if derived_dir is not None and is_derived_valid(derived_dir, csv_data_file, vehicle, len(data_source), schema):
+        return load_derived_channels(derived_dir)
+    states = data_source.states if hasattr(data_source, 'states') else \
+        np.concatenate([states for (_, states) in data_source.iter_states()])
+    try:
+        wheel_states = data_source.read_fields(WHEEL_FIELDS)
+    except KeyError:
+        wheel_states = None # the log has no wheel spin columns
+    channels = calc_derived_channels(states, data_source.time, vehicle, wheel_states)
+    if persist and derived_dir is not None:
+        write_derived_channels(channels, derived_dir, csv_data_file, vehicle, schema)
+    return channels
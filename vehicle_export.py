@@ -0,0 +1,201 @@
+# offline frame and video export of a whole vehicle data log
+import matplotlib
+import math
+import os
+import shutil
+import subprocess
+import multiprocessing
+import numpy as np
+
+# state of one export worker process: its own figure, vehicle, vehicle_plot and vehicle_renderer
+_worker = {}
+
+def _init_worker(csv_data_file, schema, vehicle_class, vehicle_kwargs, render_kwargs):
+    """create the figure (or raster) and vehicle owned by one worker process"""
+    matplotlib.use('Agg') # no display is needed, and each process owns its own canvas
+    import matplotlib.pyplot as plt
+    from vehicle_plot import vehicle_plot
+    from vehicle_renderer import vehicle_renderer
+
+    render_kwargs = dict(render_kwargs)
+    fig_size = render_kwargs.pop('fig_size')
+    xlim = render_kwargs.pop('xlim')
+    ylim = render_kwargs.pop('ylim')
+    _worker['dpi'] = render_kwargs.pop('dpi')
+    _worker['backend'] = render_kwargs.pop('backend')
+
+    vehicle = vehicle_class(**vehicle_kwargs)
+    _worker['plot'] = vehicle_plot(vehicle, csv_data_file=csv_data_file, schema=schema)
+    if _worker['backend'] == 'raster':
+        from vehicle_raster import vehicle_raster
+        size = (int(round(fig_size[0] * _worker['dpi'])), int(round(fig_size[1] * _worker['dpi'])))
+        # the view is placed where the equal-aspect axes of the matplotlib backend would be
+        axes_box = tuple(matplotlib.rcParams['figure.subplot.' + side] for side in ('left', 'bottom', 'right', 'top'))
+        _worker['raster'] = vehicle_raster(vehicle, size=size, xlim=xlim, ylim=ylim, dpi=_worker['dpi'], mode='RGB',
+                                           axes_box=axes_box, **render_kwargs)
+        return
+    fig, ax = plt.subplots(figsize=fig_size)
+    ax.set_aspect('equal')
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    _worker['fig'] = fig
+    _worker['renderer'] = vehicle_renderer(vehicle, ax=ax, **render_kwargs)
+    _worker['renderer'].init_artists()
+
+def _render_times(plot, raster, times):
+    """rasterize the vehicle at every time in turn
+    output:
+    generator of the PIL images, one per time
+    """
+    for time in times:
+        plot.update_vehicle_by_time(time)
+        yield raster.render()
+
+def _render_chunk(task):
+    """render a contiguous chunk of frames in a worker process
+    task: (step_by, list of (frame_num, frame_value, frame_file))
+    output:
+    the number of frames written
+    """
+    (step_by, frames) = task
+    plot = _worker['plot']
+    if _worker['backend'] == 'raster':
+        raster = _worker['raster']
+        if step_by == 'row':
+            images = raster.render_rows(plot, [frame_value for (_, frame_value, _) in frames])
+        else:
+            images = _render_times(plot, raster, [frame_value for (_, frame_value, _) in frames])
+        for ((frame_num, frame_value, frame_file), image) in zip(frames, images):
+            # the image format follows the file pattern extension, PNG encoding dominates the raster export time
+            image_format = raster.Image.registered_extensions().get(os.path.splitext(frame_file)[1].lower(), 'PNG')
+            tmp_file = frame_file + '.part'
+            image.save(tmp_file, format=image_format, **({'compress_level': 1} if image_format == 'PNG' else {}))
+            os.replace(tmp_file, frame_file)
+        return len(frames)
+    fig = _worker['fig']
+    for (frame_num, frame_value, frame_file) in frames:
+        if step_by == 'row':
+            plot.update_vehicle_by_row_num(int(frame_value))
+        else:
+            plot.update_vehicle_by_time(frame_value)
+        _worker['renderer'].update()
+        # write next to the target and rename, so an interrupted export never leaves a truncated frame behind
+        tmp_file = frame_file + '.part'
+        fig.savefig(tmp_file, dpi=_worker['dpi'], format='png')
+        os.replace(tmp_file, frame_file)
+    return len(frames)
+
+def export_frames(csv_data_file, out_dir, schema=None, vehicle_class=None, vehicle_kwargs=None, step_by='row', skip=1,
+                  time_step=1/30, workers=None, resume=True, file_pattern='frame_%06d.png', fig_size=(6.4, 4.8),
+                  dpi=100, xlim=(-5, 5), ylim=(-5, 5), chunk_size=None, backend='matplotlib', **renderer_kwargs):
+    """render every frame of a data log to numbered PNG files with a pool of processes
+    csv_data_file: the data log in the vehicle_plot format (e.g. drift_data.csv)
+    out_dir: the directory the numbered frames are written to
+    schema: the data_schema of the log, default to the drift_data.csv layout
+    vehicle_class: the vehicle2d subclass to draw, default to vehicle2d_dual_track
+    vehicle_kwargs: keyword arguments used to construct the vehicle in every worker
+    step_by: 'row' for one frame per (decimated) data row, 'time' for one frame every time_step seconds
+    skip: decimation factor, only every skip-th frame is rendered
+    time_step: time between two frames in seconds when step_by is 'time'
+    workers: number of worker processes, default to the number of CPUs
+    resume: skip frames whose file already exists, so a partial export can be completed
+    file_pattern: printf-style file name pattern of the frames, numbered from 0
+    fig_size, dpi, xlim, ylim: figure size in inches, resolution and fixed axes limits of every frame
+    chunk_size: number of consecutive frames per task, default to an even split over the workers
+    backend: 'matplotlib' to draw with vehicle_renderer, 'raster' to draw with the much faster vehicle_raster
+    (Pillow) into images of fig_size * dpi pixels showing xlim and ylim where the matplotlib axes would be, without
+    the axes frame and ticks
+    renderer_kwargs: passed on to vehicle_renderer or vehicle_raster (e.g. z_up, fl_ratio)
+    output:
+    frame_files: the list of all frame files in playback order
+    """
+    from vehicle_data_source import chunked_csv_data_source
+    if vehicle_class is None:
+        from vehicle2d_dual_track import vehicle2d_dual_track
+        vehicle_class = vehicle2d_dual_track
+    if step_by not in ('time', 'row'):
+        raise ValueError("step_by must be 'time' or 'row', got %r" % (step_by,))
+    if backend not in ('matplotlib', 'raster'):
+        raise ValueError("backend must be 'matplotlib' or 'raster', got %r" % (backend,))
+    skip = max(int(skip), 1)
+
+    # frame values are computed from the time column only, the workers load the full log themselves
+    time = chunked_csv_data_source(csv_data_file, schema=schema).time
+    if step_by == 'row':
+        frame_values = np.arange(0, len(time), skip)
+    else:
+        n_frames = int(math.floor((time.max() - time.min()) / time_step + 1e-9)) + 1
+        frame_values = time.min() + time_step * np.arange(0, n_frames, skip)
+
+    os.makedirs(out_dir, exist_ok=True)
+    frame_files = [os.path.join(out_dir, file_pattern % i) for i in range(len(frame_values))]
+    todo = [(i, frame_values[i], frame_files[i]) for i in range(len(frame_values))
+            if not (resume and os.path.exists(frame_files[i]))]
+    if not todo:
+        return frame_files
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(todo)))
+    if chunk_size is None:
+        chunk_size = int(math.ceil(len(todo) / workers))
+    tasks = [(step_by, todo[i:i + chunk_size]) for i in range(0, len(todo), chunk_size)]
+
+    render_kwargs = dict(renderer_kwargs, fig_size=fig_size, dpi=dpi, xlim=xlim, ylim=ylim, backend=backend)
+    initargs = (csv_data_file, schema, vehicle_class, vehicle_kwargs or {}, render_kwargs)
+    with multiprocessing.get_context('spawn').Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for _ in pool.imap_unordered(_render_chunk, tasks):
+            pass
+    return frame_files
+
+def write_video(frame_files, video_file, fps=30):
+    """assemble frames into a video in playback order
+    frame_files: the list of frame files in playback order, as returned by export_frames
+    video_file: the output video file (e.g. drift.mp4 or drift.gif)
+    fps: frames per second of the video
+    imageio is used when it is installed, otherwise the frames are piped into a local ffmpeg executable.
+    """
+    try:
+        import imageio.v2 as imageio
+    except ImportError:
+        imageio = None
+
+    if imageio is not None:
+        with imageio.get_writer(video_file, fps=fps) as writer:
+            for frame_file in frame_files:
+                writer.append_data(imageio.imread(frame_file))
+        return video_file
+
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("write_video needs either the imageio package or an ffmpeg executable on the PATH")
+    cmd = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'image2pipe', '-c:v', 'png', '-framerate', str(fps),
+           '-i', '-', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', video_file]
+    with subprocess.Popen(cmd, stdin=subprocess.PIPE) as proc:
+        for frame_file in frame_files:
+            with open(frame_file, 'rb') as f:
+                proc.stdin.write(f.read())
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError("ffmpeg exited with code %d" % proc.returncode)
+    return video_file
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='export the frames of a vehicle data log in parallel')
+    parser.add_argument('csv_data_file')
+    parser.add_argument('out_dir')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--skip', type=int, default=1)
+    parser.add_argument('--step-by', choices=('row', 'time'), default='row')
+    parser.add_argument('--time-step', type=float, default=1/30)
+    parser.add_argument('--no-resume', action='store_true')
+    parser.add_argument('--backend', choices=('matplotlib', 'raster'), default='matplotlib')
+    parser.add_argument('--video', default=None, help='also assemble the frames into this video file')
+    parser.add_argument('--fps', type=float, default=30)
+    args = parser.parse_args()
+    files = export_frames(args.csv_data_file, args.out_dir, step_by=args.step_by, skip=args.skip,
+                          time_step=args.time_step, workers=args.workers, resume=not args.no_resume,
+                          backend=args.backend)
+    if args.video:
+        write_video(files, args.video, fps=args.fps)
@@ -0,0 +1,237 @@
+# scene of many logged runs rendered into one axes, for comparing runs side by side
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.lines import Line2D
+from lib_graphic import *
+
+class fleet_run:
+    """one run of a fleet_scene: a vehicle_plot with its time offset, color and placement"""
+
+    def __init__(self, plot, time_offset=0.0, color='b', label=None, offset=(0.0, 0.0)):
+        """
+        plot: the vehicle_plot that provides the log and the vehicle
+        time_offset: scene time of the log time 0, e.g. to line up the start of a maneuver across runs
+        color: color of the run
+        label: legend label of the run
+        offset: (dX, dY) world frame translation of the run, e.g. to lay runs side by side
+        """
+        self.plot = plot
+        self.time_offset = float(time_offset)
+        self.color = color
+        self.label = label
+        self.offset = np.asarray(offset, dtype=np.float64)
+
+    def log_time(self, time):
+        """log time of a scene time"""
+        return time - self.time_offset
+
+    def time_range(self):
+        """(first, last) scene time of the log"""
+        time = self.plot.time_sorted
+        return (time[0] + self.time_offset, time[-1] + self.time_offset)
+
+class fleet_scene:
+    """K vehicles, each replaying its own log, rendered into one axes with a synchronized time cursor
+    The logs may have different sample rates: at a scene time every run looks up its own sample (or interpolates
+    between its samples). Runs sharing a vehicle object are moved through one calc_geometry_batch call, and the
+    whole fleet is drawn by a fixed set of collections (bodies, tires, CG markers, velocity and tire force arrows)
+    whose vertices are replaced every frame. The number of artists, and so the matplotlib cost of a frame, does not
+    depend on K: only the per-run sample lookups do, and those are a binary search each.
+
+    s = fleet_scene(ax=ax)
+    s.add_run(vehicle_plot(v, 'baseline.csv'), color='b', label='baseline')
+    s.add_run(vehicle_plot(v, 'tuned.csv'), time_offset=-1.2, color='r', label='tuned')
+    s.init_artists()
+    s.set_time(10)
+    """
+
+    def __init__(self, ax=None, z_up=-1, interp=None, draw_tire_force=False, draw_vel=True, draw_paths=True,
+                 fl_ratio=2000, vl_ratio=10, hide_outside=False, path_points=2000):
+        """
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        interp: None for the nearest sample of every log, 'linear' or 'slerp' to interpolate, see vehicle_plot
+        draw_tire_force: whether the tire force arrows are drawn
+        draw_vel: whether the body velocity arrows are drawn
+        draw_paths: whether the whole CG path of every run is drawn once, faded, under the vehicles
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrows
+        hide_outside: hide the runs whose log does not cover the scene time instead of holding their end pose
+        path_points: maximum number of points of a drawn path
+        """
+        if ax is None:
+            ax = plt.gca()
+        self.ax = ax
+        self.z_up = z_up
+        self.interp = interp
+        self.draw_tire_force = draw_tire_force
+        self.draw_vel = draw_vel
+        self.draw_paths = draw_paths
+        self.fl_ratio = fl_ratio
+        self.vl_ratio = vl_ratio
+        self.hide_outside = hide_outside
+        self.path_points = path_points
+        self.runs = []
+        self.collections = []
+
+    def add_run(self, plot, time_offset=0.0, color=None, label=None, offset=(0.0, 0.0)):
+        """add a run to the scene, before init_artists
+        color: color of the run, default to the next color of the matplotlib cycle
+        see fleet_run for the other arguments
+        output:
+        run: the added fleet_run
+        """
+        if color is None:
+            color = 'C%d' % (len(self.runs) % 10)
+        run = fleet_run(plot, time_offset=time_offset, color=color, label=label, offset=offset)
+        self.runs.append(run)
+        return run
+
+    def time_range(self):
+        """(first, last) scene time covered by any run"""
+        ranges = np.array([run.time_range() for run in self.runs])
+        return (ranges[:, 0].min(), ranges[:, 1].max())
+
+    def _pts(self, points):
+        return points_by_convention(points, self.z_up)
+
+    def _add(self, collection):
+        self.ax.add_collection(collection)
+        self.collections.append(collection)
+        return collection
+
+    def build_groups(self):
+        """group the runs by vehicle object, the runs of a group share one batched geometry pass"""
+        groups = {}
+        for (k, run) in enumerate(self.runs):
+            groups.setdefault(id(run.plot.vehicle), []).append(k)
+        self.groups = [(self.runs[ks[0]].plot.vehicle, np.array(ks)) for ks in groups.values()]
+        self.n_tires = np.array([len(run.plot.vehicle.get_tires()) for run in self.runs])
+        self.tire_starts = np.concatenate(([0], np.cumsum(self.n_tires)))
+
+    def init_artists(self):
+        """create the collections of the whole fleet once and draw the runs at the start of the scene
+        output:
+        collections: list of every collection owned by the scene
+        """
+        self.build_groups()
+        self.collections = []
+        colors = np.array([mcolors.to_rgba(run.color) for run in self.runs])
+        tire_colors = np.repeat(colors, self.n_tires, axis=0)
+        if self.draw_paths:
+            paths = []
+            for run in self.runs:
+                data_source = run.plot.data_source
+                step = max(len(data_source) // self.path_points, 1)
+                states = run.plot.get_states_by_row_nums(slice(None, None, step))
+                paths.append(self._pts(np.column_stack((states['X'], states['Y'])) + run.offset))
+            faded = colors.copy()
+            faded[:, 3] *= 0.3
+            self._add(LineCollection(paths, colors=faded, linewidths=0.75))
+        self.body_lines = self._add(LineCollection([], colors=colors, linestyles='--'))
+        self.tire_lines = self._add(LineCollection([], colors=tire_colors))
+        self.cg_markers = self.ax.scatter(np.zeros(len(self.runs)), np.zeros(len(self.runs)), s=12, c=colors,
+                                          zorder=3)
+        self.collections.append(self.cg_markers)
+        self.vel_arrows = self._add(PolyCollection([], facecolors=colors, edgecolors=colors)) if self.draw_vel \
+            else None
+        self.force_arrows = self._add(PolyCollection([], facecolors=np.tile(['r', 'g'], len(tire_colors)),
+                                                     edgecolors=np.tile(['r', 'g'], len(tire_colors)))) \
+            if self.draw_tire_force else None
+        self.ax.set_aspect('equal', adjustable='box')
+        self.set_time(self.time_range()[0])
+        self.ax.autoscale_view()
+        return self.collections
+
+    def get_states(self, time):
+        """look up the state of every run at a scene time
+        output:
+        (states, visible): list of one state record per run, and a boolean array of the runs covering the time
+        """
+        states = []
+        visible = np.ones(len(self.runs), dtype=bool)
+        for (k, run) in enumerate(self.runs):
+            log_time = run.log_time(time)
+            plot = run.plot
+            if self.interp is None:
+                row_num = plot.find_row_by_time(log_time)
+                states.append(plot.get_state_by_row_num(row_num))
+            else:
+                row_num = None
+                states.append(plot.get_states_by_time([log_time], interp=self.interp)[0])
+            if self.hide_outside:
+                (first, last) = (plot.time_sorted[0], plot.time_sorted[-1])
+                visible[k] = first <= log_time <= last
+            run.row_num = row_num
+        return (states, visible)
+
+    def calc_geometry(self, states):
+        """calculate the geometry of every run, one calc_geometry_batch call per vehicle group
+        output:
+        geometry: list of one geometry dictionary (of a single pose) per run
+        """
+        geometry = [None] * len(self.runs)
+        for (vehicle, ks) in self.groups:
+            group = np.array([states[k] for k in ks], dtype=states[ks[0]].dtype)
+            positions = np.stack((group['X'], group['Y']), axis=-1) + np.array([self.runs[k].offset for k in ks])
+            wheel_angles = None
+            if all(self.runs[k].plot.derived is not None and self.runs[k].row_num is not None for k in ks):
+                wheel_angles = np.array([self.runs[k].plot.derived_wheel_angles(self.runs[k].row_num) for k in ks])
+            batch = vehicle.calc_geometry_batch(group['psi'], wheel_angles=wheel_angles,
+                                                vels_bframe=np.stack((group['xdot'], group['ydot']), axis=-1),
+                                                tire_forces=self.runs[ks[0]].plot.tire_forces_of_states(group),
+                                                positions=positions, fl_ratio=self.fl_ratio, vl_ratio=self.vl_ratio)
+            for (j, k) in enumerate(ks):
+                geometry[k] = {key: values[j] for (key, values) in batch.items()}
+        return geometry
+
+    def set_time(self, time):
+        """move every run to a scene time
+        output:
+        collections: the changed collections, e.g. for FuncAnimation(blit=True)
+        """
+        self.time = time
+        (states, visible) = self.get_states(time)
+        geometry = self.calc_geometry(states)
+        pts = self._pts
+        hidden = ~visible
+        bodies = pts(np.array([g['body'] for g in geometry]))
+        tires = pts(np.concatenate([g['tires'] for g in geometry]))
+        centers = pts(np.array([g['positions'] for g in geometry]))
+        if hidden.any():
+            # hidden runs collapse onto a point instead of changing the number of items (and their colors)
+            tire_hidden = np.repeat(hidden, self.n_tires)
+            bodies[hidden] = np.nan
+            tires[tire_hidden] = np.nan
+            centers[hidden] = np.nan
+        self.body_lines.set_segments(bodies)
+        self.tire_lines.set_segments(tires)
+        self.cg_markers.set_offsets(centers)
+        changed = [self.body_lines, self.tire_lines, self.cg_markers]
+        if self.vel_arrows is not None:
+            lines = pts(np.array([g['vel'] for g in geometry]))
+            polygons = arrow_polygons(lines[:, 0], lines[:, 1])
+            polygons[hidden] = np.nan
+            self.vel_arrows.set_verts(polygons, closed=True)
+            changed.append(self.vel_arrows)
+        if self.force_arrows is not None:
+            lines = pts(np.stack([np.concatenate([g[key] for g in geometry]) for key in ('fx', 'fy')], axis=1))
+            lines = lines.reshape(-1, 2, 2) # fx, fy of every tire in turn
+            polygons = arrow_polygons(lines[:, 0], lines[:, 1])
+            polygons[np.repeat(np.repeat(hidden, self.n_tires), 2)] = np.nan
+            self.force_arrows.set_verts(polygons, closed=True)
+            changed.append(self.force_arrows)
+        return changed
+
+    def legend(self, **kwargs):
+        """add a legend of the labeled runs to the axes"""
+        handles = [Line2D([], [], color=run.color, label=run.label) for run in self.runs if run.label is not None]
+        return self.ax.legend(handles=handles, **kwargs)
+
+    def remove(self):
+        """remove all collections of the scene from the axes"""
+        for collection in self.collections:
+            collection.remove()
+        self.collections = []
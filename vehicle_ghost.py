@@ -0,0 +1,107 @@
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from lib_graphic import *
+
+class vehicle_ghost:
+    """ghost (onion-skin) plot of many vehicle poses from a data log
+    All poses are computed in one vectorized pass (vehicle_plot.calc_geometry_by_row_nums) and drawn as a handful
+    of collections: one for the bodies, one for the tires, one for the tire x axes, one per force component, one for
+    the velocities and two for the CG signs, instead of a dozen artists per pose with draw_vehicle. Older poses fade
+    out through per-pose alpha.
+    """
+
+    def __init__(self, plot, ax=None, z_up=-1, alpha_range=(0.15, 1.0), draw_tire_force=True, draw_vel=True,
+                 draw_x_axis=False, fl_ratio=2000, vl_ratio=10, cg_radius=0.1):
+        """
+        plot: the vehicle_plot that provides the data and the vehicle
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        alpha_range: (oldest, newest) alpha of the poses, interpolated linearly in between
+        draw_tire_force: whether the tire force arrows are drawn
+        draw_vel: whether the body velocity arrows are drawn
+        draw_x_axis: whether the tire x axis dashed lines are drawn
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrows
+        cg_radius: radius of the CG signs
+        """
+        if ax is None:
+            ax = plt.gca()
+        self.plot = plot
+        self.ax = ax
+        self.z_up = z_up
+        self.alpha_range = alpha_range
+        self.draw_tire_force = draw_tire_force
+        self.draw_vel = draw_vel
+        self.draw_x_axis = draw_x_axis
+        self.fl_ratio = fl_ratio
+        self.vl_ratio = vl_ratio
+        self.cg_radius = cg_radius
+        self.collections = []
+
+    def pose_colors(self, color, alphas, repeat=1):
+        """RGBA colors of one color with per-pose alphas, each repeated for the items of a pose"""
+        rgba = np.tile(mcolors.to_rgba(color), (len(alphas), 1))
+        rgba[:, 3] = alphas
+        return np.repeat(rgba, repeat, axis=0)
+
+    def _add(self, collection):
+        self.ax.add_collection(collection)
+        self.collections.append(collection)
+        return collection
+
+    def draw_poses(self, row_nums=None, times=None, every=None):
+        """draw one ghost pose per requested row or time
+        row_nums: array-like of row numbers in the data
+        times: alternatively, array-like of times in the data (the nearest rows are used)
+        every: alternatively, draw every every-th row of the whole data file
+        output:
+        collections: the list of collections added to the axes
+        """
+        if row_nums is None and times is not None:
+            row_nums = self.plot.find_row_by_time(np.asarray(times, dtype=np.float64))
+        elif row_nums is None:
+            row_nums = np.arange(0, len(self.plot), every or 1)
+        row_nums = np.atleast_1d(np.asarray(row_nums, dtype=np.intp))
+        n = len(row_nums)
+        geometry = self.plot.calc_geometry_by_row_nums(row_nums, fl_ratio=self.fl_ratio, vl_ratio=self.vl_ratio)
+        m = geometry['tires'].shape[1]
+        alphas = np.linspace(self.alpha_range[0], self.alpha_range[1], n) if n > 1 else np.array([self.alpha_range[1]])
+        pts = lambda points: points_by_convention(points, self.z_up) # plotting coordinates
+
+        self._add(LineCollection(pts(geometry['body']), colors=self.pose_colors('b', alphas), linestyles='--'))
+        self._add(LineCollection(pts(geometry['tires']).reshape(n * m, 5, 2),
+                                 colors=self.pose_colors('k', alphas, m)))
+        if self.draw_x_axis:
+            self._add(LineCollection(pts(geometry['tire_x_axes']).reshape(n * m, 2, 2),
+                                     colors=self.pose_colors('k', alphas, m), linestyles='--', linewidths=0.5))
+        if self.draw_tire_force:
+            for (key, color) in (('fx', 'r'), ('fy', 'g')):
+                lines = pts(geometry[key]).reshape(n * m, 2, 2)
+                colors = self.pose_colors(color, alphas, m)
+                self._add(PolyCollection(arrow_polygons(lines[:, 0], lines[:, 1]),
+                                         facecolors=colors, edgecolors=colors))
+        if self.draw_vel:
+            lines = pts(geometry['vel'])
+            colors = self.pose_colors('k', alphas)
+            self._add(PolyCollection(arrow_polygons(lines[:, 0], lines[:, 1]), facecolors=colors, edgecolors=colors))
+
+        # CG signs: a circle outline and two filled quarter sectors per pose
+        centers = pts(geometry['positions'])
+        circle = arc_points((0, 0), self.cg_radius, 0, 360).T
+        sectors = [np.vstack((arc_points((0, 0), self.cg_radius, t1, t2).T, [[0, 0]]))
+                   for (t1, t2) in ((90, 180), (270, 360))]
+        self._add(LineCollection(centers[:, None, :] + circle, colors=self.pose_colors('k', alphas), linewidths=0.5))
+        self._add(PolyCollection(np.concatenate([centers[:, None, :] + sector for sector in sectors]),
+                                 facecolors=np.tile(self.pose_colors('k', alphas), (2, 1)), edgecolors='none'))
+
+        self.ax.set_aspect('equal', adjustable='box')
+        self.ax.autoscale_view()
+        return self.collections
+
+    def remove(self):
+        """remove all collections of the ghost plot from the axes"""
+        for collection in self.collections:
+            collection.remove()
+        self.collections = []
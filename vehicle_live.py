@@ -0,0 +1,527 @@
+# live telemetry ingestion over asyncio into a ring buffer, and a real-time replay server of csv logs
+import asyncio
+import socket
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from vehicle_data_source import *
+
+class ring_buffer:
+    """fixed-size numpy ring buffer of telemetry rows
+    Rows are written in place into a preallocated (capacity, n_columns) array, overwriting the oldest rows once the
+    buffer is full, so memory stays constant however long the stream runs. Rows are addressed in chronological order,
+    row 0 being the oldest row still held. The buffer is shared between the ingestion thread and the plotting thread
+    and every access holds its lock.
+    """
+
+    def __init__(self, capacity, n_columns, dtype=np.float64):
+        """
+        capacity: number of rows held
+        n_columns: number of columns of a row
+        dtype: numpy dtype of the values
+        """
+        self.capacity = int(capacity)
+        self.data = np.zeros((self.capacity, n_columns), dtype=dtype)
+        self.count = 0 # total number of rows ever appended
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, rows):
+        """append (n, n_columns) rows, only the last capacity rows are kept when n exceeds the capacity"""
+        rows = np.asarray(rows, dtype=self.data.dtype).reshape(-1, self.data.shape[1])
+        n = len(rows)
+        with self.lock:
+            if n > self.capacity:
+                self.count += n - self.capacity
+                rows = rows[-self.capacity:]
+                n = self.capacity
+            i = self.count % self.capacity
+            first = min(n, self.capacity - i)
+            self.data[i:i + first] = rows[:first]
+            self.data[:n - first] = rows[first:]
+            self.count += n
+
+    def physical(self, row_nums):
+        """storage indices of chronological row numbers (negative row numbers count from the latest row)"""
+        n = len(self)
+        row_nums = np.asarray(row_nums, dtype=np.intp)
+        row_nums = np.where(row_nums < 0, row_nums + n, row_nums)
+        if row_nums.size and (row_nums.min() < 0 or row_nums.max() >= n):
+            raise IndexError("row numbers are out of range for %d rows" % n)
+        return (self.count - n + row_nums) % self.capacity
+
+    def rows(self, row_nums):
+        """copy of the rows at chronological row numbers, an array or a slice"""
+        with self.lock:
+            if isinstance(row_nums, slice):
+                row_nums = np.arange(*row_nums.indices(len(self)))
+            return self.data[self.physical(row_nums)]
+
+    def column(self, j):
+        """copy of one column in chronological order"""
+        with self.lock:
+            n = len(self)
+            i = (self.count - n) % self.capacity
+            return np.concatenate((self.data[i:i + n, j], self.data[:max(i + n - self.capacity, 0), j]))
+
+class live_data_source(data_source):
+    """data source fed by a live telemetry stream, holding the latest rows of the stream in a ring_buffer
+    The stream carries csv text with the columns of the log (drift_data.csv layout by default): a header line first,
+    unless the columns are given, then one line per row. It is read with asyncio from a TCP server, UDP datagrams, a
+    pipe or stdin, in a background thread started by start(). Row numbers count from the oldest row still buffered,
+    so row len(self)-1 is always the latest state, and they shift once the buffer wraps. A vehicle_plot on the
+    source therefore only supports apply_state(source.latest_state()), as live_view does, and its time lookups raise
+    a ValueError. snapshot() copies the buffered rows into a fixed data source for time lookups and analysis.
+
+    source = live_data_source().start('tcp://127.0.0.1:5005')
+    p = vehicle_plot(v, data_source=source, world_frame=True)
+    p.apply_state(source.latest_state())
+    """
+    live = True
+
+    def __init__(self, columns=None, capacity=65536, schema=None):
+        """
+        columns: the column names of the stream, default to the header line of the stream
+        capacity: number of rows held in the ring buffer
+        schema: the data_schema of the stream, default to the drift_data.csv layout
+        """
+        self.capacity = int(capacity)
+        self.schema_spec = schema or data_schema()
+        self.buffer = None
+        self.names = None
+        self.partial = b'' # incomplete last line of the stream
+        self.n_bad_rows = 0 # lines that did not parse into a full row
+        self.thread = None
+        self.loop = None
+        self.error = None # the exception that ended the reader thread, if any
+        self.connected = threading.Event() # set by read once the address is open
+        self.udp_buffer_size = 1 << 22 # requested socket receive buffer in bytes
+        if columns is not None:
+            self.set_columns(columns)
+
+    def set_columns(self, names):
+        """set the columns of the stream and allocate the ring buffer"""
+        self.names = [name.strip() for name in names]
+        self.schema = self.schema_spec.resolve(self.names)
+        self.index = {name: i for (i, name) in enumerate(self.names)}
+        self.buffer = ring_buffer(self.capacity, len(self.names))
+
+    def __len__(self):
+        return 0 if self.buffer is None else len(self.buffer)
+
+    @property
+    def n_received(self):
+        """total number of rows received, including the rows already dropped from the ring buffer"""
+        return 0 if self.buffer is None else self.buffer.count
+
+    @property
+    def time(self):
+        """time column of the buffered rows in seconds, a copy in chronological order"""
+        if self.buffer is None:
+            return np.zeros(0)
+        return self.schema.convert_time(self.buffer.column(self.schema.time_index))
+
+    def get_states(self, row_nums):
+        scalar = isinstance(row_nums, (int, np.integer))
+        rows = self.buffer.rows(np.atleast_1d(row_nums) if not isinstance(row_nums, slice) else row_nums)
+        states = self.schema.build_states(lambda name: rows[:, self.index[name]])
+        return states[0] if scalar else states
+
+    def snapshot(self):
+        """copy the buffered rows into a csv_data_source with the schema of the stream
+        output:
+        a data source with fixed row numbers and time index, e.g. for vehicle_plot(v, data_source=...)
+        """
+        if self.buffer is None:
+            raise ValueError("no rows received yet")
+        rows = self.buffer.rows(slice(None))
+        return csv_data_source(pd.DataFrame(rows, columns=self.names), schema=self.schema_spec)
+
+    def latest_state(self):
+        """the state record of the latest row, or None before the first row"""
+        return self.get_states(-1) if len(self) else None
+
+    def feed(self, data):
+        """parse a block of the stream, lines may be split anywhere across blocks
+        data: bytes of csv text
+        """
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        lines = [line for line in (line.strip() for line in lines) if line]
+        if self.names is None and lines:
+            self.set_columns(lines.pop(0).decode().split(','))
+        if not lines:
+            return
+        n_columns = len(self.names)
+        good = [line for line in lines if line.count(b',') == n_columns - 1]
+        self.n_bad_rows += len(lines) - len(good)
+        try:
+            rows = np.array(b','.join(good).split(b','), dtype=np.float64).reshape(-1, n_columns) if good else None
+        except ValueError:
+            # a malformed value: fall back to row by row parsing to keep the good rows
+            parsed = []
+            for line in good:
+                try:
+                    parsed.append(np.array(line.split(b','), dtype=np.float64))
+                except ValueError:
+                    self.n_bad_rows += 1
+            rows = np.array(parsed) if parsed else None
+        if rows is not None:
+            self.buffer.append(rows)
+
+    def feed_datagram(self, data):
+        """parse one datagram, every datagram holds whole lines"""
+        self.partial = b''
+        self.feed(data if data.endswith(b'\n') else data + b'\n')
+
+    async def read_stream(self, reader, block_size=65536):
+        """feed the source from an asyncio StreamReader until the end of the stream"""
+        while True:
+            data = await reader.read(block_size)
+            if not data:
+                break
+            self.feed(data)
+        if self.partial:
+            self.feed(b'\n')
+
+    async def read(self, address):
+        """read the stream of an address until it ends (or forever for UDP)
+        address: 'tcp://host:port' to connect to a telemetry server (e.g. a replay_server),
+        'udp://host:port' to receive datagrams on a local port, 'stdin' (or '-') for the standard input,
+        'pipe://path' for a named pipe
+        """
+        if address in ('stdin', '-'):
+            reader = await self.connect_pipe(sys.stdin.buffer)
+            self.connected.set()
+            await self.read_stream(reader)
+        elif address.startswith('pipe://'):
+            with open(address[len('pipe://'):], 'rb', buffering=0) as pipe:
+                reader = await self.connect_pipe(pipe)
+                self.connected.set()
+                await self.read_stream(reader)
+        elif address.startswith('tcp://'):
+            (host, port) = parse_host_port(address[len('tcp://'):])
+            (reader, writer) = await asyncio.open_connection(host, port)
+            self.connected.set()
+            try:
+                await self.read_stream(reader)
+            finally:
+                writer.close()
+        elif address.startswith('udp://'):
+            (host, port) = parse_host_port(address[len('udp://'):])
+            loop = asyncio.get_running_loop()
+            (transport, _) = await loop.create_datagram_endpoint(lambda: datagram_receiver(self),
+                                                                  local_addr=(host, port))
+            # a larger receive buffer absorbs bursts of datagrams while rows are parsed, UDP still drops on overflow
+            transport.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.udp_buffer_size)
+            self.connected.set()
+            try:
+                await asyncio.Future() # until the reader is stopped
+            finally:
+                transport.close()
+        else:
+            raise ValueError("unsupported address %r, expected tcp://, udp://, pipe:// or stdin" % (address,))
+
+    @staticmethod
+    async def connect_pipe(pipe):
+        """asyncio StreamReader of a pipe file object"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        return reader
+
+    def start(self, address, timeout=10.0):
+        """start reading an address in a background thread with its own event loop, see read
+        Returns once the address is open. An error opening it (e.g. a refused connection) is raised here, later
+        errors end the reader thread and are kept in self.error.
+        timeout: seconds to wait for the address to open, None to wait forever
+        output:
+        the source itself
+        """
+        self.error = None
+        self.connected.clear()
+        loop_ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.task = self.loop.create_task(self.read(address))
+            loop_ready.set()
+            try:
+                self.loop.run_until_complete(self.task)
+            except asyncio.CancelledError:
+                pass
+            except Exception as error:
+                self.error = error
+            finally:
+                close_loop(self.loop)
+                self.connected.set() # wake up start when the reader ends before connecting
+
+        self.thread = threading.Thread(target=run, name='live_data_source', daemon=True)
+        self.thread.start()
+        loop_ready.wait()
+        if not self.connected.wait(timeout):
+            self.stop()
+            raise TimeoutError("could not open %s within %s s" % (address, timeout))
+        if self.error is not None:
+            self.thread.join()
+            self.thread = None
+            raise self.error
+        return self
+
+    def stop(self, timeout=1.0):
+        """stop the reader thread"""
+        if self.thread is None:
+            return
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(lambda: self.task.cancel())
+            self.thread.join(timeout)
+        self.thread = None
+
+class datagram_receiver(asyncio.DatagramProtocol):
+    """asyncio protocol feeding the received datagrams to a live_data_source"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def datagram_received(self, data, addr):
+        self.source.feed_datagram(data)
+
+def close_loop(loop):
+    """cancel the tasks left on a stopped event loop (e.g. connections of a server) and close it"""
+    pending = asyncio.all_tasks(loop)
+    for task in pending:
+        task.cancel()
+    if pending:
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    loop.close()
+
+def parse_host_port(text):
+    """split 'host:port' into (host, port)"""
+    (host, _, port) = text.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+class live_view:
+    """draws the latest state of a live data source at a capped frame rate
+    A matplotlib timer ticks at max_fps. A tick with no new rows does nothing; otherwise only the latest row is
+    applied and the canvas is asked to redraw with draw_idle, which coalesces requests. Rows received between two
+    ticks are never queued for drawing: under load the view skips straight to the newest state, and the rows it
+    skipped are counted in n_skipped_rows.
+    """
+
+    def __init__(self, plot, renderer, fig=None, max_fps=30):
+        """
+        plot: the vehicle_plot on a live_data_source
+        renderer: the vehicle_renderer (or vehicle_scene) drawing the vehicle of the plot
+        fig: the figure of the renderer axes, default to the figure of renderer.ax
+        max_fps: maximum number of frames drawn per second
+        """
+        self.plot = plot
+        self.renderer = renderer
+        self.fig = renderer.ax.figure if fig is None else fig
+        self.max_fps = max_fps
+        self.last_count = 0
+        self.n_frames = 0
+        self.n_skipped_rows = 0
+        self.timer = None
+
+    def update(self):
+        """apply the latest row if new rows arrived, output: whether a frame was requested"""
+        source = self.plot.data_source
+        count = source.n_received
+        if count == self.last_count:
+            return False
+        state = source.latest_state()
+        self.n_skipped_rows += count - self.last_count - 1
+        self.last_count = count
+        self.plot.apply_state(state)
+        if not self.renderer.artists:
+            self.renderer.init_artists()
+        self.renderer.update()
+        self.n_frames += 1
+        return True
+
+    def on_tick(self):
+        if self.update():
+            self.fig.canvas.draw_idle()
+
+    def start(self):
+        """start the frame timer"""
+        self.timer = self.fig.canvas.new_timer(interval=int(1000 / self.max_fps))
+        self.timer.add_callback(self.on_tick)
+        self.timer.start()
+        return self
+
+    def stop(self):
+        """stop the frame timer"""
+        if self.timer is not None:
+            self.timer.stop()
+            self.timer = None
+
+class replay_server:
+    """local server streaming a csv log in real time (or speed times faster) as a live telemetry stream
+    Over TCP every client that connects gets its own replay from the first row: the header line, then the rows,
+    each sent when its logged time is due. Over UDP the rows are sent as datagrams to one target address, the
+    header first. Rows due within one tick are sent together.
+
+    server = replay_server('drift_data.csv', speed=2).start()
+    source = live_data_source().start('tcp://127.0.0.1:5005')
+    """
+
+    def __init__(self, csv_data_file, speed=1.0, host='127.0.0.1', port=5005, protocol='tcp', udp_target=None,
+                 repeat=False, tick=0.01, time_column='time', max_datagram=8192):
+        """
+        csv_data_file: the csv log with a header line
+        speed: replay speed factor, 1 for real time
+        host, port: address the TCP server listens on
+        protocol: 'tcp' or 'udp'
+        udp_target: (host, port) the datagrams are sent to, default to (host, port)
+        repeat: start over at the end of the log
+        tick: pacing period in seconds
+        time_column: name of the time column of the log, in seconds
+        max_datagram: maximum size of a datagram in bytes
+        """
+        if protocol not in ('tcp', 'udp'):
+            raise ValueError("protocol must be 'tcp' or 'udp', got %r" % (protocol,))
+        self.csv_data_file = csv_data_file
+        self.speed = float(speed)
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.udp_target = udp_target or (host, port)
+        self.repeat = repeat
+        self.tick = tick
+        self.time_column = time_column
+        self.max_datagram = max_datagram
+        self.thread = None
+        self.loop = None
+        self.error = None # the exception that ended the server thread, if any
+        self.started = threading.Event()
+
+    async def replay(self, send):
+        """send the log through send(bytes), one call per tick, paced by its time column"""
+        with open(self.csv_data_file, 'rb') as f:
+            header = f.readline()
+            time_index = [name.strip() for name in header.decode().split(',')].index(self.time_column)
+            await send(header)
+            while True:
+                (t0, wall0) = (None, time.monotonic())
+                batch = []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    t = float(line.split(b',', time_index + 1)[time_index])
+                    t0 = t if t0 is None else t0
+                    due = wall0 + (t - t0) / self.speed
+                    if due > time.monotonic():
+                        if batch:
+                            await send(b''.join(batch))
+                            batch = []
+                        await asyncio.sleep(max(due - time.monotonic(), self.tick))
+                    batch.append(line if line.endswith(b'\n') else line + b'\n')
+                if batch:
+                    await send(b''.join(batch))
+                if not self.repeat:
+                    return
+                f.seek(len(header))
+
+    async def handle_client(self, reader, writer):
+        async def send(data):
+            writer.write(data)
+            await writer.drain()
+        try:
+            await self.replay(send)
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass # the client went away or the server is stopping
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """serve until cancelled (TCP) or until the end of the log (UDP without repeat)"""
+        loop = asyncio.get_running_loop()
+        if self.protocol == 'tcp':
+            server = await asyncio.start_server(self.handle_client, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1] # the actual port when 0 was given
+            self.started.set()
+            async with server:
+                await server.serve_forever()
+        else:
+            (transport, _) = await loop.create_datagram_endpoint(asyncio.DatagramProtocol,
+                                                                  remote_addr=self.udp_target)
+            self.started.set()
+
+            async def send(data):
+                # whole lines per datagram
+                lines = data.splitlines(keepends=True)
+                datagram = b''
+                for line in lines:
+                    if datagram and len(datagram) + len(line) > self.max_datagram:
+                        transport.sendto(datagram)
+                        datagram = b''
+                    datagram += line
+                if datagram:
+                    transport.sendto(datagram)
+            try:
+                await self.replay(send)
+            finally:
+                transport.close()
+
+    def run(self):
+        """serve in the current thread"""
+        asyncio.run(self.serve())
+
+    def start(self):
+        """serve in a background thread, returning once the server is listening
+        An error starting the server (e.g. a port already in use) is raised here, later errors end the server
+        thread and are kept in self.error.
+        """
+        self.error = None
+        self.started.clear()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.task = self.loop.create_task(self.serve())
+                self.loop.run_until_complete(self.task)
+            except asyncio.CancelledError:
+                pass
+            except Exception as error:
+                self.error = error
+            finally:
+                close_loop(self.loop)
+                self.started.set() # wake up start when serving fails before listening
+
+        self.thread = threading.Thread(target=run, name='replay_server', daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            self.thread.join()
+            self.thread = None
+            raise self.error
+        return self
+
+    def stop(self, timeout=1.0):
+        """stop the background server"""
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(lambda: self.task.cancel())
+            self.thread.join(timeout)
+        self.thread = None
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='replay a vehicle data log as a live telemetry stream')
+    parser.add_argument('csv_data_file')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5005)
+    parser.add_argument('--udp', action='store_true', help='send datagrams to host:port instead of serving TCP')
+    parser.add_argument('--repeat', action='store_true')
+    args = parser.parse_args()
+    replay_server(args.csv_data_file, speed=args.speed, host=args.host, port=args.port,
+                  protocol='udp' if args.udp else 'tcp', repeat=args.repeat).run()
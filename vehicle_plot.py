@@ -4,42 +4,316 @@ import pandas as pd
 import numpy as np
 from vehicle2d import *
 from tire2d import *
+from vehicle_data_source import *
+from vehicle_derived import *
 
 class vehicle_plot:
     """vehicle plot in 2d
     This class is used to draw the vehicle body and tires. The vehicle body is drawn using the vehicle2d class,
     and the tires are drawn using the tire2d class.
+
+    The vehicle states are served by a data source (see vehicle_data_source). By default the csv data file is
+    converted once at load time into contiguous numpy column arrays (self.columns) and a structured array of
+    vehicle states (self.states), so that per-frame updates are plain array indexing. A chunked_csv_data_source
+    can be passed instead for logs that do not fit in memory.
     """
+    state_fields = STATE_FIELDS
+    derived = None # derived channels of the log once load_derived_channels is called, see vehicle_derived
 
-    def __init__(self, vehicle, csv_data_file=None, **kwargs):
+    def __init__(self, vehicle, csv_data_file=None, data_source=None, use_cache=False, schema=None, world_frame=False,
+                 **kwargs):
+        """
+        vehicle: the vehicle2d subclass instance to update
+        csv_data_file: the csv data file, loaded into memory with a csv_data_source
+        data_source: alternatively, any vehicle_data_source data source
+        use_cache: open csv_data_file through its memory-mapped npy cache, see open_cached_data_source
+        schema: the data_schema mapping the columns of csv_data_file onto the vehicle state, default to the
+        drift_data.csv layout
+        world_frame: place the vehicle CG at the logged (X, Y) position instead of the origin, the log must then have
+        the X and Y columns
+        """
         self.vehicle = vehicle
-        self.df = pd.read_csv(csv_data_file)
+        self.world_frame = world_frame
+        if data_source is None and use_cache:
+            data_source = open_cached_data_source(csv_data_file, schema=schema)
+        elif data_source is None:
+            data_source = csv_data_source(csv_data_file, schema=schema)
+        self.data_source = data_source
+        if world_frame:
+            self.check_world_frame()
+        self.build_time_index()
+
+    def check_world_frame(self):
+        """raise a KeyError if the log has no world frame positions to render in the world frame
+        A live data source that has not received the header of its stream yet cannot be checked.
+        """
+        schema = self.data_source.schema
+        missing = [field for field in ('X', 'Y') if schema is not None and not schema.has_field(field)]
+        if missing:
+            raise KeyError("world_frame needs the %s column(s) missing from the log" % ', '.join(map(repr, missing)))
+
+    # the views below are only available with a csv_data_source (columns also with a npy_data_source)
+    @property
+    def df(self):
+        return self.data_source.df
+
+    @property
+    def columns(self):
+        return self.data_source.columns
+
+    @property
+    def states(self):
+        return self.data_source.states
+
+    def __len__(self):
+        return len(self.data_source)
+
+    def build_time_index(self):
+        """build the sorted time index used by the time-based lookups
+        The data file is usually already in time order, in which case the time column is used as is. Otherwise
+        the rows are stably sorted once, so that rows sharing a timestamp keep their file order.
+        A live data source has no fixed time index, its time lookups raise a ValueError.
+        """
+        if self.data_source.live:
+            (self.time_order, self.time_sorted) = (None, None)
+            return
+        time = self.data_source.time
+        if np.all(time[1:] >= time[:-1]):
+            self.time_order = None
+            self.time_sorted = time
+        else:
+            self.time_order = np.argsort(time, kind='stable')
+            self.time_sorted = time[self.time_order]
+
+    def check_time_index(self):
+        """raise a ValueError when the data source has no fixed time index"""
+        if self.time_sorted is None:
+            raise ValueError("the rows of a live data source shift as the stream arrives, time lookups need a fixed "
+                             "log: apply source.latest_state() (see live_view) or plot a source.snapshot()")
+
+    def load_derived_channels(self, derived_dir=None, persist=True):
+        """compute (or load the persisted) derived channels of the whole log, see open_derived_channels
+        Once loaded, the row updates and the batch geometry also apply the derived yaw rate and wheel angles.
+        derived_dir: the directory of the persisted channels, default to next to the source file
+        persist: write the channels next to the source after computing them
+        output:
+        derived: dictionary of derived channel arrays, one value per row
+        """
+        self.derived = open_derived_channels(self.data_source, self.vehicle, derived_dir=derived_dir, persist=persist)
+        return self.derived
+
+    def derived_wheel_angles(self, row_nums):
+        """returns the (N,m) wheel angles of the vehicle tires at many rows from the derived channels"""
+        if self.vehicle.num_front_tires == 1:
+            steering = self.derived['steering'][row_nums]
+            return np.stack((steering, np.zeros_like(steering)), axis=-1)
+        return np.stack([self.derived['wheel_angle_%d' % i][row_nums] for i in range(4)], axis=-1)
+
+    def derived_by_time(self, times):
+        """interpolate the derived yaw rate and wheel angles at many times, as get_states_by_time
+        output:
+        (yaw_rates, wheel_angles): arrays of N yaw rates and (N,m) wheel angles
+        """
+        (i0, i1, w) = self.bracket_rows(np.atleast_1d(np.asarray(times, dtype=np.float64)))
+        yaw_rate = self.derived['yaw_rate']
+        (r0, r1) = (yaw_rate[i0], yaw_rate[i1])
+        (a0, a1) = (self.derived_wheel_angles(i0), self.derived_wheel_angles(i1))
+        return (r0 + w * (r1 - r0), a0 + w[:, None] * (a1 - a0))
+
+    def apply_derived(self, row_num):
+        """update the vehicle yaw rate and wheel angles from the derived channels at a row number"""
+        self._set_derived(self.derived['yaw_rate'][row_num], self.derived_wheel_angles(row_num))
+
+    def _set_derived(self, yaw_rate, wheel_angles):
+        self.vehicle.yaw_rate = float(yaw_rate)
+        wheel_angles = tuple(float(angle) for angle in wheel_angles)
+        if self.vehicle.num_front_tires == 1:
+            self.vehicle.front_wheel_angle = wheel_angles[0]
+        else:
+            self.vehicle.wheel_angles = wheel_angles
+
+    def find_row_by_time(self, time, mode='nearest'):
+        """find the row number(s) of the data file for a given time with a binary search
+        time: the time (or array of times) in the data
+        mode: 'previous' for the last row at or before time, 'next' for the first row at or after time,
+        'nearest' for whichever of the two is closer (ties resolve to 'previous')
+        Among rows sharing a timestamp, 'previous' and 'nearest' return the last one (the most up-to-date state)
+        and 'next' returns the first one.
+        output:
+        row_num: the row number (or array of row numbers) in the data
+        """
+        self.check_time_index()
+        ts = self.time_sorted
+        n = len(ts)
+        time = np.asarray(time, dtype=np.float64)
+        i_prev = np.clip(np.searchsorted(ts, time, side='right') - 1, 0, n - 1)
+        i_next = np.clip(np.searchsorted(ts, time, side='left'), 0, n - 1)
+        if mode == 'previous':
+            idx = i_prev
+        elif mode == 'next':
+            idx = i_next
+        elif mode == 'nearest':
+            idx = np.where(np.abs(ts[i_next] - time) < np.abs(time - ts[i_prev]), i_next, i_prev)
+        else:
+            raise ValueError("mode must be 'nearest', 'previous' or 'next', got %r" % (mode,))
+        if self.time_order is not None:
+            idx = self.time_order[idx]
+        return idx if idx.ndim else int(idx)
+
+    def bracket_rows(self, times):
+        """find the samples bracketing many times for interpolation
+        times: array of times in the data
+        output:
+        (i0, i1, w): row numbers of the samples at or before (i0) and after (i1) every time, and the weights of
+        the i1 samples. i0 is the last of the rows sharing its timestamp, as find_row_by_time(mode='previous'),
+        and times outside the data range are clamped to the first/last sample (w = 0).
+        """
+        self.check_time_index()
+        ts = self.time_sorted
+        n = len(ts)
+        i0 = np.clip(np.searchsorted(ts, times, side='right') - 1, 0, max(n - 1, 0))
+        i1 = np.minimum(i0 + 1, max(n - 1, 0))
+        dt = ts[i1] - ts[i0]
+        w = np.divide(times - ts[i0], dt, out=np.zeros_like(times), where=dt > 0)
+        w = np.clip(w, 0.0, 1.0)
+        if self.time_order is not None:
+            i0 = self.time_order[i0]
+            i1 = self.time_order[i1]
+        return (i0, i1, w)
+
+    def get_states_by_time(self, times, interp=None):
+        """get the vehicle states at many times at once, optionally interpolated between samples
+        times: array-like of times in the data
+        interp: None for the nearest sample, 'linear' for linear interpolation of every state field,
+        'slerp' for linear interpolation with the heading psi interpolated along the shortest arc
+        Times outside the data range are clamped to the first/last sample.
+        output:
+        states: structured array with the fields in state_fields, one record per requested time
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        if interp is None:
+            return self.data_source.get_states(self.find_row_by_time(times))
+        if interp not in ('linear', 'slerp'):
+            raise ValueError("interp must be None, 'linear' or 'slerp', got %r" % (interp,))
+
+        (i0, i1, w) = self.bracket_rows(times)
+        s0 = self.data_source.get_states(i0)
+        s1 = self.data_source.get_states(i1)
+        states = np.empty(len(times), dtype=s0.dtype)
+        for name in self.state_fields:
+            states[name] = s0[name] + w * (s1[name] - s0[name])
+        if interp == 'slerp':
+            # on the unit circle, slerp between two headings is linear interpolation of the wrapped difference
+            dpsi = np.mod(s1['psi'] - s0['psi'] + math.pi, 2 * math.pi) - math.pi
+            states['psi'] = s0['psi'] + w * dpsi
+        return states
+
+    def get_state_by_time(self, time, mode='nearest', interp=None):
+        """get the vehicle state record at a time of the data file
+        time: the time in the data
+        mode: row lookup mode when interp is None, see find_row_by_time
+        interp: None, 'linear' or 'slerp', see get_states_by_time
+        """
+        if interp is None:
+            return self.data_source.get_states(self.find_row_by_time(time, mode=mode))
+        return self.get_states_by_time(time, interp=interp)[0]
+
+    def get_state_by_row_num(self, row_num):
+        """get the vehicle state record at a row number of the data file
+        row_num: the row number in the data
+        """
+        return self.data_source.get_states(row_num)
+
+    def get_states_by_row_nums(self, row_nums):
+        """get the vehicle states at many row numbers at once
+        row_nums: array-like of row numbers (or a slice) in the data
+        output:
+        states: structured array with the fields in state_fields, one record per requested row
+        """
+        return self.data_source.get_states(row_nums)
+
+    def tire_forces_of_states(self, states):
+        """returns the (N,m,2) tire forces (longitudinal, lateral) of many state records, one per vehicle tire
+        The logs hold the four tires of a dual track vehicle (fl, fr, rl, rr), a single track vehicle gets the sum
+        of the two tires of each axle.
+        """
+        tire_forces = np.stack((np.stack([states['Fx_%d' % i] for i in range(4)], axis=-1),
+                                np.stack([states['Fy_%d' % i] for i in range(4)], axis=-1)), axis=-1) # (N,4,2)
+        if len(self.vehicle.get_tires()) == 2:
+            tire_forces = tire_forces[:, 0::2] + tire_forces[:, 1::2]
+        return tire_forces
+
+    def calc_geometry_by_row_nums(self, row_nums, **kwargs):
+        """calculate the drawing geometry of many rows of the data file in one vectorized pass
+        row_nums: array-like of row numbers (or a slice) in the data
+        kwargs: passed on to the calc_geometry_batch method of the vehicle (e.g. fl_ratio, vl_ratio)
+        output:
+        geometry: dictionary of world frame arrays, see vehicle2d.calc_geometry_batch
+        """
+        states = self.get_states_by_row_nums(row_nums)
+        tire_forces = self.tire_forces_of_states(states)
+        vels_bframe = np.stack((states['xdot'], states['ydot']), axis=-1) # (N,2)
+        if self.world_frame:
+            kwargs.setdefault('positions', np.stack((states['X'], states['Y']), axis=-1))
+        if self.derived is not None:
+            kwargs.setdefault('wheel_angles', self.derived_wheel_angles(
+                row_nums if isinstance(row_nums, slice) else np.asarray(row_nums, dtype=np.intp)))
+        return self.vehicle.calc_geometry_batch(states['psi'], vels_bframe=vels_bframe,
+                                                tire_forces=tire_forces, **kwargs)
+
+    def apply_state(self, state):
+        """update the vehicle pose and tire forces from one state record
+        state: a record of the states array (or any mapping with the state_fields keys)
+        """
+        F_tire_fl = [state['Fx_0'], state['Fy_0']]
+        F_tire_fr = [state['Fx_1'], state['Fy_1']]
+        F_tire_rl = [state['Fx_2'], state['Fy_2']]
+        F_tire_rr = [state['Fx_3'], state['Fy_3']]
+        slip_angles = (state['Alpha_0'], state['Alpha_1'], state['Alpha_2'], state['Alpha_3'])
+
+        position = (state['X'],state['Y']) if self.world_frame else None
+        self.vehicle.update_body_pose(heading=state['psi'],vel_bframe=(state['xdot'],state['ydot']),position=position)
+        self.vehicle.update_tire_forces(tire_forces=(F_tire_fl,F_tire_fr,F_tire_rl,F_tire_rr),\
+                            slip_angles=slip_angles)
 
     def update_vehicle_by_row_num(self, row_num):
         """update the vehicle pose by row number of the data file
-        This current function is coupled with a specific data file format. It will be generalized in the future.
+        The data file columns are mapped onto the vehicle state by the data_schema of the data source.
         row_num: the row number in the data
         """
-        psi = self.df.iloc[row_num]['psi']
-        xdot = self.df.iloc[row_num]['xdot']
-        ydot = self.df.iloc[row_num]['ydot']
-        F_tire_fl = [self.df.iloc[row_num]['Fx_0'], self.df.iloc[row_num]['Fy_0']]
-        F_tire_fr = [self.df.iloc[row_num]['Fx_1'], self.df.iloc[row_num]['Fy_1']]
-        F_tire_rl = [self.df.iloc[row_num]['Fx_2'], self.df.iloc[row_num]['Fy_2']]
-        F_tire_rr = [self.df.iloc[row_num]['Fx_3'], self.df.iloc[row_num]['Fy_3']]
-        slip_angle_fl = self.df.iloc[row_num]['Alpha_0']
-        slip_angle_fr = self.df.iloc[row_num]['Alpha_1']
-        slip_angle_rl = self.df.iloc[row_num]['Alpha_2']
-        slip_angle_rr = self.df.iloc[row_num]['Alpha_3']
-
-        self.vehicle.update_body_pose(heading=psi,vel_bframe=(xdot,ydot))
-        self.vehicle.update_tire_forces(tire_forces=(F_tire_fl,F_tire_fr,F_tire_rl,F_tire_rr),\
-                            slip_angles=(slip_angle_fl,slip_angle_fr,slip_angle_rl,slip_angle_rr))
+        self.apply_state(self.get_state_by_row_num(row_num))
+        if self.derived is not None:
+            self.apply_derived(row_num)
+
+    def iter_vehicle_updates(self, skip=1, chunk_size=65536):
+        """stream through the whole data file in order, updating the vehicle at every skip-th row
+        The data source is read chunk by chunk, so memory stays bounded for logs of any length. The generator can be
+        used directly as the frames of an animation.
+        skip: decimation factor, only every skip-th row is applied
+        chunk_size: number of rows read at a time
+        output:
+        yields the row number the vehicle was updated to
+        """
+        for (start, states) in self.data_source.iter_states(chunk_size):
+            first = (-start) % skip
+            for i in range(first, len(states), skip):
+                self.apply_state(states[i])
+                if self.derived is not None:
+                    self.apply_derived(start + i)
+                yield start + i
 
-    def update_vehicle_by_time(self, time):
+    def update_vehicle_by_time(self, time, mode='nearest', interp=None):
         """update the vehicle pose by time
         time: the time in the data
+        mode: 'nearest', 'previous' or 'next' sample lookup, see find_row_by_time
+        interp: None to use the looked-up sample, 'linear' or 'slerp' to interpolate between samples
+        Once the derived channels are loaded, the yaw rate and wheel angles are taken from the looked-up row, or
+        interpolated like the states.
         """
-        # find the row number in the data file that is closest to the given time
-        row_num = self.df.index[(self.df['time']-time).abs().argsort()[0]]
-        self.update_vehicle_by_row_num(row_num)
+        if interp is None:
+            self.update_vehicle_by_row_num(self.find_row_by_time(time, mode=mode))
+            return
+        self.apply_state(self.get_states_by_time(time, interp=interp)[0])
+        if self.derived is not None:
+            (yaw_rates, wheel_angles) = self.derived_by_time(time)
+            self._set_derived(yaw_rates[0], wheel_angles[0])
@@ -0,0 +1,274 @@
+# headless raster backend for bulk frame generation without matplotlib artists
+import math
+import numpy as np
+from lib_graphic import unit_shape, arrow_polygons, points_by_convention
+
+def dash_segments(points, on, off):
+    """split polylines into dashes, continuing the dash pattern around the corners like matplotlib does
+    points: (...,k,2) polylines
+    on, off: lengths of the dashes and of the gaps, in the units of points
+    output:
+    segments: (...,M,2,2) [start, end] pieces of the dashes, a dash across a corner is split into two pieces
+    valid: (...,M) boolean mask of the pieces that exist
+    """
+    points = np.asarray(points, dtype=np.float64)
+    d = np.diff(points, axis=-2)
+    length = np.hypot(d[..., 0], d[..., 1])
+    s0 = np.cumsum(length, axis=-1) - length # arc length at the start of every edge
+    period = on + off
+    n_dashes = int(np.ceil(np.max(s0[..., -1] + length[..., -1], initial=0) / period)) + 1
+    t0 = np.arange(n_dashes) * period # dash starts along the whole polyline
+    # intersect every dash with every edge: (...,k-1,n_dashes) intervals in edge arc length
+    a = np.maximum(t0, s0[..., None]) - s0[..., None]
+    b = np.minimum(t0 + on, (s0 + length)[..., None]) - s0[..., None]
+    valid = b > a
+    u = d / np.where(length > 0, length, 1.0)[..., None] # unit direction of every edge
+    starts = points[..., :-1, None, :] + a[..., None] * u[..., None, :]
+    ends = points[..., :-1, None, :] + b[..., None] * u[..., None, :]
+    shape = valid.shape[:-2] + (-1,)
+    segments = np.stack((starts, ends), axis=-2).reshape(shape + (2, 2))
+    return segments, valid.reshape(shape)
+
+class vehicle_raster:
+    """headless rasterizer of the vehicle diagram, drawing with Pillow's ImageDraw
+    Draws the same elements as draw_vehicle (dashed body outline, CG sign, yaw rate arc, velocity vector, tires,
+    tire x axes and force arrows) with the matplotlib colors, line widths and dash patterns, supersampled and
+    reduced for anti-aliasing. The geometry comes from the vectorized calc_geometry_batch of the vehicle, so a
+    whole chunk of frames is mapped to pixels, dashed and turned into arrow outlines at once, and each frame only
+    issues the draw calls. Meant for thumbnails and video frames on machines without a display;
+    np.asarray(image) gives the (H,W,4) RGBA (or (H,W,3) RGB) buffer.
+    By default the view fills the whole image. Pass the axes_box of a matplotlib figure to place the view where its
+    equal-aspect axes would be; the axes frame, ticks and tick labels are not drawn.
+    """
+
+    def __init__(self, vehicle, size=(320, 320), xlim=(-5, 5), ylim=(-5, 5), z_up=-1, draw_front_tire_force=True,
+                 draw_rear_tire_force=True, draw_vel=True, draw_whl_v=False, draw_x_axis=True, draw_labels=True,
+                 fl_ratio=2000, vl_ratio=10, dpi=100, supersample=2, mode='RGBA', background=(255, 255, 255),
+                 axes_box=None):
+        """
+        vehicle: the vehicle2d subclass instance to render
+        size: (width, height) of the images in pixels
+        xlim, ylim: view limits in plotting coordinates, the view keeps an equal aspect ratio like the matplotlib axes
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        draw_front_tire_force, draw_rear_tire_force: whether the front/rear tire force arrows are drawn
+        draw_vel: whether the vehicle body velocity vector is drawn
+        draw_whl_v: whether the front axle velocity vector is drawn
+        draw_x_axis: whether the tire x axis dashed lines are drawn
+        draw_labels: whether the "V" and "r" labels are drawn
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrows
+        dpi: pixels per inch, converts the matplotlib line widths and font sizes (in points) to pixels
+        supersample: integer drawing scale before reducing to size, 1 disables anti-aliasing
+        mode: 'RGBA' or 'RGB' mode of the images
+        background: RGB background color
+        axes_box: (left, bottom, right, top) of the axes in figure fractions, like matplotlib.figure.SubplotParams,
+        default to the whole image
+        """
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError:
+            raise ImportError("vehicle_raster needs the Pillow package") from None
+        self.Image = Image
+        self.ImageDraw = ImageDraw
+        self.vehicle = vehicle
+        self.size = (int(size[0]), int(size[1]))
+        self.z_up = z_up
+        self.draw_front_tire_force = draw_front_tire_force
+        self.draw_rear_tire_force = draw_rear_tire_force
+        self.draw_vel = draw_vel
+        self.draw_whl_v = draw_whl_v
+        self.draw_x_axis = draw_x_axis
+        self.draw_labels = draw_labels
+        self.fl_ratio = fl_ratio
+        self.vl_ratio = vl_ratio
+        self.supersample = max(int(supersample), 1)
+        self.mode = mode
+        self.background = tuple(background)
+        # pixel mapping of the supersampled canvas: like an equal-aspect matplotlib axes (adjustable='box'), the
+        # axes box shrinks to the aspect of the view limits, centered in the space of axes_box
+        (w, h) = self.size
+        (left, bottom, right, top) = (0.0, 0.0, 1.0, 1.0) if axes_box is None else axes_box
+        self.canvas_size = (w * self.supersample, h * self.supersample)
+        self.scale = self.supersample * min((right - left) * w / (xlim[1] - xlim[0]),
+                                            (top - bottom) * h / (ylim[1] - ylim[0])) # pixels per meter
+        self.center = ((xlim[0] + xlim[1]) / 2, (ylim[0] + ylim[1]) / 2)
+        self.pixel_center = (self.supersample * w * (left + right) / 2,
+                             self.supersample * h * (1 - (bottom + top) / 2)) # image rows run downwards
+        self.pt = dpi / 72 * self.supersample # pixels per point
+        self.font = None
+        if draw_labels:
+            try:
+                self.font = ImageFont.load_default(size=10 * self.pt)
+            except TypeError: # Pillow without FreeType support has a single bitmap font size
+                self.font = ImageFont.load_default()
+        self.cg_radius = 0.1
+        n_tires = len(vehicle.get_tires())
+        self.force_tires = [i for i in range(n_tires) if (self.draw_front_tire_force if i < vehicle.num_front_tires
+                                                          else self.draw_rear_tire_force)]
+
+    def to_pixels(self, points):
+        """map (...,2) world frame points to (...,2) pixel coordinates of the supersampled canvas"""
+        points = points_by_convention(points, self.z_up)
+        (x0, y0) = self.pixel_center
+        return np.stack((x0 + (points[..., 0] - self.center[0]) * self.scale,
+                         y0 - (points[..., 1] - self.center[1]) * self.scale), axis=-1)
+
+    def width(self, linewidth):
+        """pixel width of a matplotlib line width in points"""
+        return max(int(round(linewidth * self.pt)), 1)
+
+    def dashes(self, points, linewidth):
+        """per-frame lists of the dash pieces of (N,...,k,2) pixel polylines, dashed like linestyle '--'"""
+        # matplotlib scales the '--' pattern of (3.7, 1.6) points with the line width
+        (segments, valid) = dash_segments(points, 3.7 * linewidth * self.pt, 1.6 * linewidth * self.pt)
+        n = len(points)
+        segments = segments.reshape(n, -1, 4).tolist()
+        valid = valid.reshape(n, -1).tolist()
+        return [[segment for (segment, ok) in zip(frame, frame_valid) if ok]
+                for (frame, frame_valid) in zip(segments, valid)]
+
+    def arrows(self, starts, ends, width=0.01, head_width=0.05, head_length=0.1, extend_head=False):
+        """(...,7,2) pixel arrow outlines of arrows between world frame points, sized in meter like ax.arrow
+        extend_head: place the head past the end point, like ax.arrow(length_includes_head=False)
+        """
+        starts = self.to_pixels(starts)
+        ends = self.to_pixels(ends)
+        if extend_head:
+            d = ends - starts
+            ends = ends + d / np.maximum(np.hypot(d[..., 0], d[..., 1]), 1e-12)[..., None] * head_length * self.scale
+        shape = starts.shape[:-1]
+        polygons = arrow_polygons(starts.reshape(-1, 2), ends.reshape(-1, 2), width=width * self.scale,
+                                  head_width=head_width * self.scale, head_length=head_length * self.scale)
+        # closed rings, the outline is stroked centered on the edge like the matplotlib patch edge
+        return np.concatenate((polygons, polygons[:, :1]), axis=1).reshape(shape + (16,))
+
+    def pixel_geometry(self, geometry, yaw_rates=None):
+        """map the world frame arrays of calc_geometry_batch to pixel coordinates, for all frames at once
+        yaw_rates: optional array of N yaw rates setting the yaw rate arc direction, default to the vehicle's
+        output:
+        pixels: dictionary of per-frame lists of pixel coordinates, ready for ImageDraw
+        """
+        n = len(geometry['body'])
+        pixels = {'body': self.dashes(self.to_pixels(geometry['body']), 1.5),
+                  'tires': self.to_pixels(geometry['tires']).reshape(n, -1, 10).tolist()}
+        r = self.cg_radius * self.scale
+        cg = self.to_pixels(geometry['positions'])
+        pixels['cg_boxes'] = np.concatenate((cg - r, cg + r), axis=-1).tolist()
+        if self.draw_x_axis:
+            pixels['tire_x_axes'] = self.dashes(self.to_pixels(geometry['tire_x_axes']), 0.5)
+        arrows = []
+        if 'fx' in geometry and self.force_tires:
+            lines = np.stack((geometry['fx'][:, self.force_tires], geometry['fy'][:, self.force_tires]), axis=2)
+            polygons = self.arrows(lines[..., 0, :], lines[..., 1, :]).reshape(n, -1, 16)
+            colors = [(255, 0, 0), (0, 128, 0)] * len(self.force_tires)
+            arrows.append((polygons.tolist(), colors))
+        pixels['v_labels'] = []
+        for (key, draw) in (('vel', self.draw_vel), ('whl_vel', self.draw_whl_v)):
+            if key not in geometry or not draw:
+                continue
+            vel = geometry[key]
+            arrows.append((self.arrows(vel[:, None, 0], vel[:, None, 1]).tolist(), [(0, 0, 0)]))
+            # the "V" label at a 150 degree u-turn of 0.3 m from the arrow head, see vector_text_position
+            angle = np.arctan2(vel[:, 1, 1] - vel[:, 0, 1], vel[:, 1, 0] - vel[:, 0, 0]) + 5/6 * math.pi
+            labels = self.to_pixels(vel[:, 1]) + 0.3 * self.scale * np.stack((np.cos(angle), -np.sin(angle)), axis=-1)
+            pixels['v_labels'].append(labels.tolist())
+
+        # yaw rate arc arrows, the head extends past the arc end like arc_arrow
+        if yaw_rates is None:
+            yaw_rates = np.full(n, self.vehicle.yaw_rate, dtype=np.float64)
+        arcs = np.where((np.asarray(yaw_rates) > 0)[:, None, None], unit_shape('arc', 50, 0, 180),
+                        unit_shape('arc', 50, 0, -180))
+        arcs = geometry['positions'][:, None, :] + 0.2 * arcs
+        pixels['yaw_arcs'] = self.to_pixels(arcs).reshape(n, -1).tolist()
+        heads = self.arrows(arcs[:, None, -2], arcs[:, None, -1], width=0.001, extend_head=True)
+        arrows.append((heads.tolist(), [(0, 0, 0)]))
+        pixels['arrows'] = arrows
+        # the "r" label sits 0.4 m above the CG on the figure
+        pixels['r_labels'] = (cg - (0, 0.4 * self.scale)).tolist()
+        return pixels
+
+    def draw_frame(self, pixels, i):
+        """draw frame i of the pixel geometry returned by pixel_geometry
+        output:
+        image: the PIL image of the frame
+        """
+        image = self.Image.new('RGB', self.canvas_size, self.background)
+        draw = self.ImageDraw.Draw(image)
+        black = (0, 0, 0)
+        width = self.width(1.5)
+        for dash in pixels['body'][i]:
+            draw.line(dash, fill=(0, 0, 255), width=width)
+
+        # CG sign, the quarter sectors are fixed on the figure (PIL angles run clockwise in image coordinates)
+        box = pixels['cg_boxes'][i]
+        draw.pieslice(box, 180, 270, fill=black)
+        draw.pieslice(box, 0, 90, fill=black)
+        draw.ellipse(box, outline=black, width=self.width(0.5))
+        draw.line(pixels['yaw_arcs'][i], fill=black, width=self.width(0.5), joint='curve')
+
+        for tire in pixels['tires'][i]:
+            draw.line(tire, fill=black, width=width, joint='curve')
+        if self.draw_x_axis:
+            x_axis_width = self.width(0.5)
+            for tire_dashes in pixels['tire_x_axes'][i]:
+                draw.line(tire_dashes, fill=black, width=x_axis_width)
+        edge_width = self.width(1.0)
+        for (polygons, colors) in pixels['arrows']:
+            for (polygon, color) in zip(polygons[i], colors):
+                draw.polygon(polygon, fill=color)
+                draw.line(polygon, fill=color, width=edge_width)
+
+        if self.draw_labels:
+            self._text(draw, pixels['r_labels'][i], 'r')
+            for labels in pixels['v_labels']:
+                self._text(draw, labels[i], 'V')
+
+        if self.supersample > 1:
+            image = image.reduce(self.supersample)
+        return image if self.mode == 'RGB' else image.convert(self.mode)
+
+    def _text(self, draw, xy, text):
+        """draw a label with its baseline left corner at a pixel position"""
+        try:
+            draw.text(tuple(xy), text, fill=(0, 0, 0), font=self.font, anchor='ls')
+        except ValueError: # bitmap fonts have no anchor support
+            draw.text(tuple(xy), text, fill=(0, 0, 0), font=self.font)
+
+    def render_geometry(self, geometry, yaw_rates=None):
+        """rasterize every frame of a calc_geometry_batch result
+        yaw_rates: optional array of N yaw rates, default to the yaw rate of the vehicle
+        output:
+        generator of the PIL images, one per frame
+        """
+        pixels = self.pixel_geometry(geometry, yaw_rates)
+        for i in range(len(geometry['body'])):
+            yield self.draw_frame(pixels, i)
+
+    def render(self):
+        """rasterize the current state of the vehicle
+        output:
+        image: the PIL image
+        """
+        vehicle = self.vehicle
+        tire_forces = [[(tire.longitudinal_force_tframe, tire.lateral_force_tframe) for tire in vehicle.get_tires()]]
+        geometry = vehicle.calc_geometry_batch([vehicle.heading], vels_bframe=[vehicle.vel_bframe],
+                                               tire_forces=tire_forces, fl_ratio=self.fl_ratio,
+                                               vl_ratio=self.vl_ratio, yaw_rates=[vehicle.yaw_rate])
+        return next(self.render_geometry(geometry))
+
+    def render_rows(self, plot, row_nums, chunk_size=1024):
+        """rasterize rows of a data log, computing the geometry of chunk_size rows in one vectorized pass
+        plot: the vehicle_plot that provides the data (its vehicle should be the vehicle of the raster)
+        row_nums: array-like of row numbers in the data
+        output:
+        generator of the PIL images, one per row
+        """
+        row_nums = np.asarray(row_nums, dtype=np.intp)
+        for i in range(0, len(row_nums), chunk_size):
+            rows = row_nums[i:i + chunk_size]
+            # the yaw rates of the rows once the derived channels are loaded, otherwise the vehicle's
+            yaw_rates = np.full(len(rows), self.vehicle.yaw_rate) if plot.derived is None else \
+                plot.derived['yaw_rate'][rows]
+            geometry = plot.calc_geometry_by_row_nums(rows, fl_ratio=self.fl_ratio, vl_ratio=self.vl_ratio,
+                                                      yaw_rates=yaw_rates)
+            yield from self.render_geometry(geometry, yaw_rates)
@@ -0,0 +1,181 @@
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+import math
+import numpy as np
+from lib_graphic import *
+
+class vehicle_renderer:
+    """retained-mode renderer of a vehicle diagram
+    The matplotlib artists for the vehicle body, CG sign, yaw rate arc, velocity vectors and tires are created
+    once by init_artists(). Every later call to update() only moves them to the current vehicle state through
+    set_data/set_position, so an animation never has to clear the axes or allocate new artists per frame.
+    Works with any vehicle2d subclass that provides get_tires(), calc_tire_poses() and num_front_tires.
+    In world frame mode (vehicle positions from the log), the path of the CG can be traced and the view can follow
+    the vehicle.
+    """
+
+    def __init__(self, vehicle, ax=None, z_up=-1, draw_front_tire_force=True, draw_rear_tire_force=True,
+                 draw_whl_v=False, draw_vel=True, fl_ratio=2000, vl_ratio=10, draw_trace=False, follow=False,
+                 view_size=(10, 10), trace_kwargs=None):
+        """
+        vehicle: the vehicle2d subclass instance to render
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        draw_front_tire_force, draw_rear_tire_force: whether the front/rear tire force arrows are drawn
+        draw_whl_v: whether the front axle velocity vector is drawn
+        draw_vel: whether the vehicle body velocity vector is drawn
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrows
+        draw_trace: whether the path of the vehicle CG is traced, one point per update
+        follow: whether the axes limits are centered on the vehicle at every update (camera follow). The limits
+        change every frame, so a follow animation must be run with blit=False.
+        view_size: (width, height) of the view in meter when follow is set
+        trace_kwargs: passed on to the path_trace (e.g. colors, linewidths)
+        """
+        if ax is None:
+            ax = plt.gca()
+        self.vehicle = vehicle
+        self.ax = ax
+        self.z_up = z_up
+        self.draw_front_tire_force = draw_front_tire_force
+        self.draw_rear_tire_force = draw_rear_tire_force
+        self.draw_whl_v = draw_whl_v
+        self.draw_vel = draw_vel
+        self.fl_ratio = fl_ratio
+        self.vl_ratio = vl_ratio
+        self.draw_trace = draw_trace
+        self.follow = follow
+        self.view_size = view_size
+        self.trace_kwargs = trace_kwargs or {}
+        self.cg_radius = 0.1
+        self.artists = []
+
+    def _xy(self, points):
+        """plotting coordinates of a 2xN world frame matrix"""
+        return xy_by_convention(points, self.z_up)
+
+    def _new_arrow(self, color, width=0.01, head_width=0.05, head_length=0.1, length_includes_head=True):
+        """create a zero-length arrow patch that is later moved by _set_arrow"""
+        arrow = mpatches.FancyArrow(0, 0, 0, 0, width=width, head_width=head_width, head_length=head_length,
+                                    length_includes_head=length_includes_head, edgecolor=color, facecolor=color)
+        self.ax.add_patch(arrow)
+        return arrow
+
+    def _set_arrow(self, arrow, line):
+        """move an arrow patch onto a 2x2 world frame vector [[x1,x2],[y1,y2]]"""
+        (x, y) = self._xy(line)
+        arrow.set_data(x=x[0], y=y[0], dx=x[1] - x[0], dy=y[1] - y[0])
+
+    def init_artists(self):
+        """create all artists of the vehicle diagram once and draw the current vehicle state
+        output:
+        artists: list of every artist owned by the renderer
+        """
+        ax = self.ax
+        self.artists = []
+        # vehicle body
+        self.body_line, = ax.plot([], [], 'b', linestyle="--")
+        # center of gravity sign, moved to the CG through its placement transform
+        (self.cg_placement, self.cg_patches) = cg_sign(radius=self.cg_radius, ax=ax)
+        # yaw rate arc arrow
+        self.yaw_arc, = ax.plot([], [], 'k', linewidth=0.5)
+        self.yaw_arrow = self._new_arrow('k', width=0.001, length_includes_head=False)
+        self.yaw_text = ax.text(0, 0.4, r"$r$", color='k', fontsize=10)
+        self.artists += [self.body_line] + self.cg_patches + [self.yaw_arc, self.yaw_arrow, self.yaw_text]
+        # body and front axle velocity vectors
+        if self.draw_vel:
+            self.vel_arrow = self._new_arrow('black')
+            self.vel_text = ax.text(0, 0, r"$V$", color='black', fontsize=10)
+            self.artists += [self.vel_arrow, self.vel_text]
+        if self.draw_whl_v:
+            self.whl_v_arrow = self._new_arrow('black')
+            self.whl_v_text = ax.text(0, 0, r"$V$", color='black', fontsize=10)
+            self.artists += [self.whl_v_arrow, self.whl_v_text]
+        # tires, the force arrows of all tires share one arrow_collection (red longitudinal, green lateral)
+        self.tire_artists = []
+        self.force_tires = []
+        for (i, tire) in enumerate(self.vehicle.get_tires()):
+            tire_line, = ax.plot([], [], 'k', linestyle="-")
+            x_axis_line, = ax.plot([], [], 'k--', linewidth=0.5)
+            is_front = i < self.vehicle.num_front_tires
+            if (self.draw_front_tire_force if is_front else self.draw_rear_tire_force):
+                self.force_tires.append(i)
+            self.tire_artists.append((tire_line, x_axis_line))
+            self.artists += [tire_line, x_axis_line]
+        self.force_arrows = None
+        if self.force_tires:
+            self.force_arrows = arrow_collection(ax=ax, colors=['r', 'g'] * len(self.force_tires))
+            self.artists.append(self.force_arrows.collection)
+        if self.draw_trace:
+            self.trace = path_trace(ax=ax, **self.trace_kwargs)
+            self.artists.append(self.trace.collection)
+        ax.set_aspect('equal', adjustable='box')
+
+        self.update()
+        # artists start empty, so rescale once to the first drawn state unless the axes limits are fixed
+        ax.relim()
+        ax.autoscale_view()
+        return self.artists
+
+    def update(self):
+        """move the existing artists to the current vehicle state
+        output:
+        artists: list of the artists that changed, e.g. for FuncAnimation(blit=True)
+        """
+        if not self.artists:
+            return self.init_artists()
+        vehicle = self.vehicle
+        changed = [self.body_line] + self.cg_patches + [self.yaw_arc, self.yaw_arrow, self.yaw_text]
+        self.body_line.set_data(*self._xy(vehicle.calc_body_edges()))
+
+        (x_cg, y_cg) = self._xy(vehicle.position) # CG in plotting coordinates
+        move_placement(self.cg_placement, (x_cg, y_cg), self.cg_radius)
+        self.yaw_text.set_position((x_cg, y_cg + 0.4))
+        points = arc_points(vehicle.position, 0.2, 0, 180 if vehicle.yaw_rate > 0 else -180)
+        self.yaw_arc.set_data(*self._xy(points))
+        self._set_arrow(self.yaw_arrow, points[:, -2:])
+
+        if self.draw_vel:
+            V_line = vehicle.calc_veh_vel_line(self.vl_ratio)
+            self._set_arrow(self.vel_arrow, V_line)
+            self.vel_text.set_position(vector_text_position(V_line, z_up=self.z_up))
+            changed += [self.vel_arrow, self.vel_text]
+        vehicle.update_axle_velocity() # use body velocity, yawrate, and steer angle to calculate axle velocity
+        if self.draw_whl_v:
+            Vf_line = vehicle.calc_wheel_vel_line(self.vl_ratio)
+            self._set_arrow(self.whl_v_arrow, Vf_line)
+            self.whl_v_text.set_position(vector_text_position(Vf_line, z_up=self.z_up))
+            changed += [self.whl_v_arrow, self.whl_v_text]
+
+        force_lines = []
+        for (i, (tire, tire_pose, (tire_line, x_axis_line))) in enumerate(zip(
+                vehicle.get_tires(), vehicle.calc_tire_poses(), self.tire_artists)):
+            tire_line.set_data(*self._xy(tire.calc_tire_edges(tire_pose)))
+            x_axis_line.set_data(*self._xy(tire.calc_tire_x_axis(tire_pose)))
+            changed += [tire_line, x_axis_line]
+            if i in self.force_tires:
+                force_lines += tire.calc_tire_force_lines(tire_pose, self.fl_ratio)
+        if self.force_arrows is not None:
+            # 2x2 [[x1,x2],[y1,y2]] vectors to [start, end] pairs in plotting coordinates
+            lines = points_by_convention(np.transpose(force_lines, (0, 2, 1)), self.z_up)
+            self.force_arrows.set_arrows(lines[:, 0], lines[:, 1])
+            changed.append(self.force_arrows.collection)
+        if self.draw_trace:
+            self.trace.append(x_cg, y_cg)
+            changed.append(self.trace.collection)
+        if self.follow:
+            (w, h) = self.view_size
+            self.ax.set_xlim(x_cg - w / 2, x_cg + w / 2)
+            self.ax.set_ylim(y_cg - h / 2, y_cg + h / 2)
+        return changed
+
+    def reset_trace(self):
+        """remove all points of the path trace, e.g. when an animation restarts"""
+        if self.draw_trace and self.artists:
+            self.trace.reset()
+
+    def remove(self):
+        """remove all artists of the renderer from the axes"""
+        for artist in self.artists:
+            artist.remove()
+        self.artists = []
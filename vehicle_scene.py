@@ -0,0 +1,228 @@
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+import math
+import numpy as np
+from matplotlib.transforms import Affine2D
+from lib_graphic import *
+from lib_geometry import rectangle_outline
+
+def convention_transform(z_up=-1):
+    """returns the Affine2D from world frame to plotting coordinates
+    z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+    In z-down convention the world x axis points up on the figure, so x and y are swapped.
+    """
+    if z_up == 1:
+        return Affine2D()
+    return Affine2D(np.array([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]]))
+
+class scene_node:
+    """a frame of the vehicle scene graph, placed by a local Affine2D in the frame of its parent
+    transform maps the node frame to display coordinates. It is a composite of the local transforms up to the root,
+    so changing the local transform of a node moves every artist of the node and of its children.
+    """
+
+    def __init__(self, parent_transform):
+        """
+        parent_transform: the transform of the parent node, or the root transform to display coordinates
+        """
+        self.local = Affine2D()
+        self.transform = self.local + parent_transform
+
+    def set_pose(self, x=0, y=0, heading=0):
+        """place the node frame at (x, y) with a heading in radians, in the frame of the parent"""
+        self.local.clear().rotate(heading).translate(x, y)
+        return self
+
+class vehicle_scene:
+    """retained-mode vehicle diagram drawn through a scene graph of transforms
+    The body outline, tires, tire x axes and arrows are defined once in their own frame. The scene graph is
+    root (z-up or z-down convention) -> vehicle (position, heading) -> axle -> tire (wheel angle), plus a CG node
+    that only follows the position so the CG sign and yaw rate arc keep their orientation. update() sets one
+    Affine2D per node, only the arrow lengths (forces and velocities) are recomputed per frame, and set_z_up()
+    switches the convention of the whole scene by changing the root transform.
+    Has the same interface as vehicle_renderer (init_artists, update, reset_trace, remove) and works with any
+    vehicle2d subclass that provides get_tires(), get_wheel_angles(), calc_tire_centers_batch() and num_front_tires.
+    """
+
+    def __init__(self, vehicle, ax=None, z_up=-1, draw_front_tire_force=True, draw_rear_tire_force=True,
+                 draw_whl_v=False, draw_vel=True, fl_ratio=2000, vl_ratio=10, draw_trace=False, follow=False,
+                 view_size=(10, 10), trace_kwargs=None):
+        """
+        vehicle: the vehicle2d subclass instance to render
+        ax: Matplotlib axis to draw on.
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        draw_front_tire_force, draw_rear_tire_force: whether the front/rear tire force arrows are drawn
+        draw_whl_v: whether the front axle velocity vector is drawn
+        draw_vel: whether the vehicle body velocity vector is drawn
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrows
+        draw_trace: whether the path of the vehicle CG is traced, one point per update
+        follow: whether the axes limits are centered on the vehicle at every update (camera follow)
+        view_size: (width, height) of the view in meter when follow is set
+        trace_kwargs: passed on to the path_trace (e.g. colors, linewidths)
+        """
+        if ax is None:
+            ax = plt.gca()
+        self.vehicle = vehicle
+        self.ax = ax
+        self.z_up = z_up
+        self.draw_front_tire_force = draw_front_tire_force
+        self.draw_rear_tire_force = draw_rear_tire_force
+        self.draw_whl_v = draw_whl_v
+        self.draw_vel = draw_vel
+        self.fl_ratio = fl_ratio
+        self.vl_ratio = vl_ratio
+        self.draw_trace = draw_trace
+        self.follow = follow
+        self.view_size = view_size
+        self.trace_kwargs = trace_kwargs or {}
+        self.cg_radius = 0.1
+        self.artists = []
+
+    def build_nodes(self):
+        """build the scene graph of the vehicle in its body frame layout"""
+        vehicle = self.vehicle
+        self.root = convention_transform(self.z_up)
+        root_transform = self.root + self.ax.transData
+        self.body = scene_node(root_transform)
+        self.cg = scene_node(root_transform)
+        a = vehicle.front_to_cg
+        b = vehicle.wheel_base - vehicle.front_to_cg
+        self.axles = [scene_node(self.body.transform).set_pose(a, 0),
+                      scene_node(self.body.transform).set_pose(-b, 0)]
+        # tire centers in body frame, relative to the center of their axle
+        centers = vehicle.calc_tire_centers_batch(np.zeros(1))[0]
+        self.tire_axles = [0 if i < vehicle.num_front_tires else 1 for i in range(len(centers))]
+        self.tire_offsets = [(x - (a if axle == 0 else -b), y) for ((x, y), axle) in zip(centers, self.tire_axles)]
+        self.tires = [scene_node(self.axles[axle].transform) for axle in self.tire_axles]
+
+    def _line(self, points, node, *args, **kwargs):
+        """plot a (k,2) local frame polyline in the frame of a node"""
+        line, = self.ax.plot(points[:, 0], points[:, 1], *args, transform=node.transform, **kwargs)
+        return line
+
+    def init_artists(self):
+        """build the scene graph, create all artists once in their local frame and draw the current vehicle state
+        output:
+        artists: list of every artist owned by the scene
+        """
+        ax = self.ax
+        vehicle = self.vehicle
+        self.build_nodes()
+        self.artists = []
+        # vehicle body, fixed in body frame
+        self.body_line = self._line(rectangle_outline(*vehicle.body_size), self.body, 'b', linestyle="--")
+        # center of gravity sign and yaw rate arc, fixed in the CG frame
+        (_, self.cg_patches) = cg_sign(radius=self.cg_radius, ax=ax, transform=self.cg.transform)
+        self.yaw_arc = self._line(np.zeros((0, 2)), self.cg, 'k', linewidth=0.5)
+        self.yaw_arrow = mpatches.FancyArrow(0, 0, 0, 0, width=0.001, head_width=0.05, head_length=0.1,
+                                             length_includes_head=False, edgecolor='k', facecolor='k',
+                                             transform=self.cg.transform)
+        ax.add_patch(self.yaw_arrow)
+        self.yaw_sign = 0
+        # the yaw rate label sits 0.4 above the CG on the figure, in either convention
+        self.yaw_text = ax.text(0, 0, r"$r$", color='k', fontsize=10,
+                                transform=self.cg.local + self.root + Affine2D().translate(0, 0.4) + ax.transData)
+        self.artists += [self.body_line] + self.cg_patches + [self.yaw_arc, self.yaw_arrow, self.yaw_text]
+        # body and front axle velocity vectors, in body frame
+        if self.draw_vel:
+            self.vel_arrow = arrow_collection(ax=ax, colors='black', transform=self.body.transform)
+            self.vel_text = ax.text(0, 0, r"$V$", color='black', fontsize=10, transform=self.body.transform)
+            self.artists += [self.vel_arrow.collection, self.vel_text]
+        if self.draw_whl_v:
+            self.whl_v_arrow = arrow_collection(ax=ax, colors='black', transform=self.axles[0].transform)
+            self.whl_v_text = ax.text(0, 0, r"$V$", color='black', fontsize=10, transform=self.axles[0].transform)
+            self.artists += [self.whl_v_arrow.collection, self.whl_v_text]
+        # tires, fixed in tire frame except for the force arrow lengths
+        self.tire_artists = []
+        for (i, (tire, node)) in enumerate(zip(vehicle.get_tires(), self.tires)):
+            (w, d) = tire.tire_size
+            tire_line = self._line(rectangle_outline(d, w), node, 'k', linestyle="-")
+            x_axis_line = self._line(np.array([[1.0, 0.0], [-1.0, 0.0]]), node, 'k--', linewidth=0.5)
+            self.artists += [tire_line, x_axis_line]
+            is_front = i < vehicle.num_front_tires
+            force_arrows = None
+            if (self.draw_front_tire_force if is_front else self.draw_rear_tire_force):
+                force_arrows = arrow_collection(ax=ax, colors=['r', 'g'], transform=node.transform)
+                self.artists.append(force_arrows.collection)
+            self.tire_artists.append(force_arrows)
+        if self.draw_trace:
+            self.trace = path_trace(ax=ax, **self.trace_kwargs)
+            self.artists.append(self.trace.collection)
+        ax.set_aspect('equal', adjustable='box')
+
+        self.update()
+        # artists start at the origin, so rescale once to the first drawn state unless the axes limits are fixed
+        ax.relim()
+        ax.autoscale_view()
+        return self.artists
+
+    def _set_vector(self, arrow, text, vector):
+        """move a local frame arrow and its label onto a vector (x, y) drawn from the node origin"""
+        arrow.set_arrows([(0.0, 0.0)], [vector])
+        text.set_position(vector_text_position([[0, vector[0]], [0, vector[1]]], z_up=1))
+
+    def set_z_up(self, z_up):
+        """switch the drawing convention of the whole scene in place"""
+        self.z_up = z_up
+        self.root.set(convention_transform(z_up))
+        if self.draw_trace and self.artists:
+            self.trace.reset()
+
+    def update(self):
+        """move the scene graph nodes to the current vehicle state
+        output:
+        artists: list of the artists that changed, e.g. for FuncAnimation(blit=True)
+        """
+        if not self.artists:
+            return self.init_artists()
+        vehicle = self.vehicle
+        (x, y) = vehicle.position
+        self.body.set_pose(x, y, vehicle.heading)
+        self.cg.set_pose(x, y)
+
+        yaw_sign = 1 if vehicle.yaw_rate > 0 else -1
+        if yaw_sign != self.yaw_sign:
+            # the arc only flips with the sign of the yaw rate
+            points = arc_points((0, 0), 0.2, 0, 180 * yaw_sign)
+            self.yaw_arc.set_data(points[0], points[1])
+            self.yaw_arrow.set_data(x=points[0][-2], y=points[1][-2], dx=points[0][-1] - points[0][-2],
+                                    dy=points[1][-1] - points[1][-2])
+            self.yaw_sign = yaw_sign
+
+        if self.draw_vel:
+            (Vxb, Vyb) = vehicle.vel_bframe
+            self._set_vector(self.vel_arrow, self.vel_text, (Vxb / self.vl_ratio, Vyb / self.vl_ratio))
+        vehicle.update_axle_velocity() # use body velocity, yawrate, and steer angle to calculate axle velocity
+        if self.draw_whl_v:
+            (Vxfb, Vyfb) = vehicle.vel_front_bframe
+            self._set_vector(self.whl_v_arrow, self.whl_v_text, (Vxfb / self.vl_ratio, Vyfb / self.vl_ratio))
+
+        for (tire, node, offset, wheel_angle, force_arrows) in zip(vehicle.get_tires(), self.tires, self.tire_offsets,
+                                                                   vehicle.get_wheel_angles(), self.tire_artists):
+            node.set_pose(offset[0], offset[1], wheel_angle)
+            if force_arrows is not None:
+                Fxt = tire.longitudinal_force_tframe / self.fl_ratio
+                Fyt = tire.lateral_force_tframe / self.fl_ratio
+                force_arrows.set_arrows([(0.0, 0.0), (0.0, 0.0)], [(Fxt, 0.0), (0.0, Fyt)])
+
+        (x_cg, y_cg) = xy_by_convention(vehicle.position, self.z_up) # CG in plotting coordinates
+        if self.draw_trace:
+            self.trace.append(x_cg, y_cg)
+        if self.follow:
+            (w, h) = self.view_size
+            self.ax.set_xlim(x_cg - w / 2, x_cg + w / 2)
+            self.ax.set_ylim(y_cg - h / 2, y_cg + h / 2)
+        # every artist hangs below the moved body or CG node
+        return list(self.artists)
+
+    def reset_trace(self):
+        """remove all points of the path trace, e.g. when an animation restarts"""
+        if self.draw_trace and self.artists:
+            self.trace.reset()
+
+    def remove(self):
+        """remove all artists of the scene from the axes"""
+        for artist in self.artists:
+            artist.remove()
+        self.artists = []
@@ -0,0 +1,570 @@
+# batched simulation of single-track (bicycle) and dual-track (four-wheel) vehicle models, with output in the
+# drift_data.csv layout
+import math
+import numpy as np
+import pandas as pd
+from vehicle2d_single_track import *
+from vehicle_data_source import csv_data_source
+
+# the columns of drift_data.csv, tires follow the fl, fr, rl, rr order
+LOG_COLUMNS = (('time', 'X', 'Y', 'Z', 'psi', 'Xdot', 'Ydot', 'Zdot', 'xdot', 'ydot', 'zdot') +
+               tuple('%s_%d' % (quantity, i) for quantity in ('Omega', 'Fx', 'Fy', 'Kappa', 'Alpha') for i in range(4)))
+
+# the integrated states of the single-track model, rows of the (6, M) state arrays: world position, heading,
+# body velocity and yaw rate
+SIM_STATES = ('X', 'Y', 'psi', 'xdot', 'ydot', 'r')
+
+# the integrated states of the dual-track model, the body states followed by the wheel spin rates
+DUAL_TRACK_STATES = SIM_STATES + ('Omega_0', 'Omega_1', 'Omega_2', 'Omega_3')
+
+GRAVITY = 9.81
+
+# Dormand-Prince 5(4) tableau: nodes, stage coefficients, 5th order weights and 5th - 4th order error weights
+DP_C = (0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0)
+DP_A = ((),
+        (1/5,),
+        (3/40, 9/40),
+        (44/45, -56/15, 32/9),
+        (19372/6561, -25360/2187, 64448/6561, -212/729),
+        (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+        (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84))
+DP_E = (71/57600, 0.0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)
+
+def batch_input(values, n_vehicles, n_times):
+    """broadcast an input of the simulation to the batch
+    values: a scalar, a (T,) time series shared by all vehicles, an (M, 1) constant per vehicle, an (M, T) array
+    sampled at the output times, or a callable of the time returning a scalar or M values
+    output:
+    the scalar or callable itself, otherwise a read-only (M, T) array
+    """
+    if callable(values) or np.ndim(values) == 0:
+        return values
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[None, :]
+    return np.broadcast_to(values, (n_vehicles, n_times))
+
+def wheel_input(values, n_vehicles, n_times, n_wheels=4):
+    """broadcast a per-wheel input of the simulation to the batch
+    values: a scalar, a (4,) constant per wheel, a (4, M, T) array sampled at the output times, or a callable of the
+    time returning values broadcastable to (4, M)
+    output:
+    the scalar or callable itself, otherwise a read-only (4, M, T) array
+    """
+    if callable(values) or np.ndim(values) == 0:
+        return values
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None, None]
+    return np.broadcast_to(values, (n_wheels, n_vehicles, n_times))
+
+def input_sampler(times, inputs):
+    """returns a function of the time giving the values of the inputs
+    times: (T,) output times
+    inputs: scalars, callables of the time, or arrays sampled at the output times along their last axis, which are
+    interpolated linearly in between
+    """
+    n_times = len(times)
+    last = max(n_times - 2, 0)
+
+    def sample(t):
+        i = min(max(int(np.searchsorted(times, t, side='right')) - 1, 0), last)
+        span = times[i + 1] - times[i] if n_times > 1 else 1.0
+        w = min(max((t - times[i]) / span, 0.0), 1.0)
+        values = []
+        for u in inputs:
+            if callable(u):
+                values.append(u(t))
+            elif np.ndim(u) == 0:
+                values.append(u)
+            elif n_times == 1 or w == 0.0:
+                values.append(u[..., i])
+            else:
+                values.append(u[..., i] * (1 - w) + u[..., i + 1] * w)
+        return values
+    return sample
+
+class batch_sim:
+    """base class of the simulations of a batch of M vehicles, advanced together as NumPy arrays
+    A subclass defines the state rows (state_names), derivatives(state, *inputs) of (n_states, M) states and
+    simulate(), which prepares the inputs and calls integrate().
+    """
+    state_names = ()
+
+    def __len__(self):
+        return len(self.mass)
+
+    def derivatives(self, state, *inputs):
+        """time derivatives of (n_states, M) states"""
+        raise NotImplementedError
+
+    def rk4_step(self, t, state, h, sample):
+        """one classic Runge-Kutta 4 step of size h from t"""
+        k1 = self.derivatives(state, *sample(t))
+        mid = sample(t + h / 2)
+        k2 = self.derivatives(state + h / 2 * k1, *mid)
+        k3 = self.derivatives(state + h / 2 * k2, *mid)
+        k4 = self.derivatives(state + h * k3, *sample(t + h))
+        return state + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def rk45_interval(self, t0, t1, state, h, sample, rtol, atol):
+        """advance the batch from t0 to t1 with adaptive Dormand-Prince 5(4) steps
+        The step size is shared by the batch and set by the vehicle with the largest error, so the whole batch
+        stays one array operation per stage.
+        output:
+        (state, h, n_steps, n_rejected) with h the proposed size of the next step
+        """
+        (t, n_steps, n_rejected) = (t0, 0, 0)
+        k = [self.derivatives(state, *sample(t))]
+        while t1 - t > 1e-12 * max(abs(t1), 1.0):
+            step = min(h, t1 - t)
+            for (c, a) in zip(DP_C[1:], DP_A[1:]):
+                stage = state + step * sum(a_j * k_j for (a_j, k_j) in zip(a, k) if a_j)
+                k.append(self.derivatives(stage, *sample(t + c * step)))
+            # the last stage is evaluated at the 5th order solution
+            error = step * sum(e * k_j for (e, k_j) in zip(DP_E, k) if e)
+            scale = atol + rtol * np.maximum(np.abs(state), np.abs(stage))
+            error_norm = np.sqrt(np.mean((error / scale) ** 2, axis=0)).max() if state.size else 0.0
+            if error_norm <= 1.0:
+                (t, state, k) = (t + step if step < t1 - t else t1, stage, [k[-1]])
+                n_steps += 1
+            else:
+                k = k[:1]
+                n_rejected += 1
+            factor = 5.0 if error_norm == 0 else min(max(0.9 * error_norm ** -0.2, 0.2), 5.0)
+            # a step shortened to reach t1 does not shrink the next one
+            h = max(h, step * factor) if error_norm <= 1.0 else step * factor
+        return (state, h, n_steps, n_rejected)
+
+    def initial_states(self, initial_state, n_states=None):
+        """returns the (n_states, M) initial states, broadcast from one state or given per vehicle
+        The batch is as large as the vehicle parameters or the initial states, so a single set of parameters can be
+        run from many initial states.
+        """
+        n_states = len(self.state_names) if n_states is None else n_states
+        state = np.asarray(initial_state, dtype=np.float64).reshape(n_states, -1)
+        n_vehicles = np.broadcast_shapes((len(self),), state.shape[1:])[0]
+        return np.array(np.broadcast_to(state, (n_states, n_vehicles)))
+
+    def integrate(self, times, state, inputs, input_shapes, method='rk4', substeps=1, rtol=1e-6, atol=1e-6):
+        """integrate the batch over the output times
+        times: (T,) increasing output times in s, the first one is the time of state
+        state: (n_states, M) initial states
+        inputs: the inputs passed on to derivatives(), see input_sampler
+        input_shapes: the shape of every input value, e.g. (M,) or (4, M)
+        method: 'rk4' for fixed Runge-Kutta 4 steps, substeps per output interval, or 'rk45' for adaptive
+        Dormand-Prince 5(4) steps with the rtol and atol tolerances
+        output:
+        (states, input_values, n_steps, n_rejected) with states the (n_states, M, T) states and input_values the
+        values of the inputs at the output times, of shape input_shape + (T,)
+        """
+        if method not in ('rk4', 'rk45'):
+            raise ValueError("unknown method %r, expected 'rk4' or 'rk45'" % method)
+        sample = input_sampler(times, inputs)
+        states = np.empty(state.shape + (len(times),))
+        input_values = [np.empty(shape + (len(times),)) for shape in input_shapes]
+
+        def record(i, t, state):
+            states[..., i] = state
+            for (values, value) in zip(input_values, sample(t)):
+                values[..., i] = value
+
+        record(0, times[0], state)
+        (n_steps, n_rejected) = (0, 0)
+        h = times[1] - times[0] if len(times) > 1 else 0.0
+        for i in range(1, len(times)):
+            (t0, t1) = (times[i - 1], times[i])
+            if method == 'rk4':
+                step = (t1 - t0) / substeps
+                for j in range(substeps):
+                    state = self.rk4_step(t0 + j * step, state, step, sample)
+                n_steps += substeps
+            else:
+                (state, h, steps, rejected) = self.rk45_interval(t0, t1, state, h, sample, rtol, atol)
+                n_steps += steps
+                n_rejected += rejected
+            record(i, t1, state)
+        return (states, input_values, n_steps, n_rejected)
+
+class single_track_sim(batch_sim):
+    """simulation of a batch of M single-track vehicles
+    The planar model integrates the world position (X, Y), heading psi, body velocity (xdot, ydot) and yaw rate r
+    of every vehicle. Each vehicle has its own mass, yaw inertia and axle cornering stiffnesses, the CG location
+    comes from the vehicle2d_single_track. The axle velocities follow calc_vel_axles_bframe and the slip angles
+    use the sign convention of the Alpha columns of drift_data.csv:
+    alpha_f = delta - atan2(ydot + a*r, xdot), alpha_r = -atan2(ydot - b*r, xdot)
+    so a positive slip angle gives a positive lateral force along the tire y axis.
+
+    sim = single_track_sim(mass=np.linspace(1200, 2200, 1000))
+    result = sim.simulate(np.arange(0, 10, 0.01), steering=0.05)
+    p = vehicle_plot(v, data_source=result.data_source(0), world_frame=True)
+    """
+    state_names = SIM_STATES
+
+    def __init__(self, vehicle=None, mass=1700, yaw_inertia=2900, cornering_stiffness=(160000, 190000),
+                 tire_model=None, wheel_radius=0.32):
+        """
+        vehicle: the vehicle2d_single_track providing front_to_cg and wheel_base, default to vehicle2d_single_track()
+        mass: vehicle mass in kg, a scalar or M values
+        yaw_inertia: yaw moment of inertia in kg*m^2, a scalar or M values
+        cornering_stiffness: (front, rear) axle cornering stiffness in N/rad of the default tire model, a pair or an
+        (M, 2) array
+        tire_model: a tire2d tire_model, or any callable(alpha, kappa, normal_load) returning (fx, fy), evaluated with
+        the axle slip angles and static axle loads; a (front, rear) pair of them for different axles. Default to
+        linear_tire_model axles with cornering_stiffness. The slip ratio is 0 and only the lateral force is used, the
+        longitudinal axle forces are inputs of simulate.
+        wheel_radius: rolling radius of the wheels in m, only used for the wheel speeds of the output
+        """
+        if vehicle is None:
+            vehicle = vehicle2d_single_track()
+        self.vehicle = vehicle
+        self.a = vehicle.front_to_cg
+        self.b = vehicle.wheel_base - vehicle.front_to_cg
+        stiffness = np.asarray(cornering_stiffness, dtype=np.float64).reshape(-1, 2)
+        (self.mass, self.yaw_inertia, self.cf, self.cr) = (
+            np.array(values) for values in np.broadcast_arrays(np.atleast_1d(np.asarray(mass, dtype=np.float64)),
+                                                               np.atleast_1d(np.asarray(yaw_inertia, dtype=np.float64)),
+                                                               stiffness[:, 0], stiffness[:, 1]))
+        # static axle loads, the model has no load transfer
+        wheel_base = vehicle.wheel_base
+        self.normal_load_front = self.mass * GRAVITY * self.b / wheel_base
+        self.normal_load_rear = self.mass * GRAVITY * self.a / wheel_base
+        if tire_model is None:
+            tire_model = (linear_tire_model(cornering_stiffness=self.cf),
+                          linear_tire_model(cornering_stiffness=self.cr))
+        self.tire_models = tuple(tire_model) if isinstance(tire_model, (tuple, list)) else (tire_model, tire_model)
+        self.wheel_radius = wheel_radius
+
+    def slip_angles(self, state, steering):
+        """front and rear axle slip angles of (6, M) states, in radians"""
+        (vx, vy, r) = state[3:6]
+        return (steering - np.arctan2(vy + self.a * r, vx), -np.arctan2(vy - self.b * r, vx))
+
+    def lateral_forces(self, state, steering, fx_front, fx_rear):
+        """front and rear axle lateral forces in tire frame of (6, M) states, in N"""
+        (alpha_f, alpha_r) = self.slip_angles(state, steering)
+        (front, rear) = self.tire_models
+        return (front(alpha_f, 0.0, self.normal_load_front)[1], rear(alpha_r, 0.0, self.normal_load_rear)[1])
+
+    def derivatives(self, state, steering, fx_front, fx_rear):
+        """time derivatives of (6, M) states
+        steering: front wheel angles in radians
+        fx_front, fx_rear: longitudinal forces of the front and rear axle in tire frame, in N
+        """
+        (psi, vx, vy, r) = state[2:6]
+        (fy_front, fy_rear) = self.lateral_forces(state, steering, fx_front, fx_rear)
+        (cos_delta, sin_delta) = (np.cos(steering), np.sin(steering))
+        # front axle forces rotated from the tire frame to the body frame
+        fx_front_b = fx_front * cos_delta - fy_front * sin_delta
+        fy_front_b = fx_front * sin_delta + fy_front * cos_delta
+        (cos_psi, sin_psi) = (np.cos(psi), np.sin(psi))
+        return np.stack(np.broadcast_arrays(vx * cos_psi - vy * sin_psi,
+                                            vx * sin_psi + vy * cos_psi,
+                                            r,
+                                            (fx_front_b + fx_rear) / self.mass + r * vy,
+                                            (fy_front_b + fy_rear) / self.mass - r * vx,
+                                            (self.a * fy_front_b - self.b * fy_rear) / self.yaw_inertia))
+
+    def simulate(self, times, initial_state=None, steering=0.0, fx_front=0.0, fx_rear=0.0, method='rk4', substeps=1,
+                 rtol=1e-6, atol=1e-6):
+        """integrate the batch over the output times
+        times: (T,) increasing output times in s, the first one is the time of initial_state
+        initial_state: (6,) or (6, M) initial states in SIM_STATES order, default to 10 m/s straight ahead at the origin
+        steering: front wheel angle in radians, see batch_input for the accepted shapes
+        fx_front, fx_rear: longitudinal force of the front and rear axle in tire frame in N, see batch_input
+        method, substeps, rtol, atol: the integration method and its settings, see batch_sim.integrate
+        output:
+        a single_track_result holding the states and inputs at the output times
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if initial_state is None:
+            initial_state = (0.0, 0.0, 0.0, 10.0, 0.0, 0.0)
+        state = self.initial_states(initial_state)
+        (n_vehicles, n_times) = (state.shape[1], len(times))
+        inputs = [batch_input(values, n_vehicles, n_times) for values in (steering, fx_front, fx_rear)]
+        (states, input_values, n_steps, n_rejected) = self.integrate(times, state, inputs, [(n_vehicles,)] * 3,
+                                                                     method, substeps, rtol, atol)
+        return single_track_result(self, times, states, input_values, n_steps, n_rejected)
+
+class dual_track_sim(batch_sim):
+    """simulation of a batch of M dual-track (four-wheel) vehicles
+    The planar model integrates the world position (X, Y), heading psi, body velocity (xdot, ydot), yaw rate r and
+    the spin rate Omega of every wheel. The wheel quantities are (4, M) arrays in the fl, fr, rl, rr order:
+    - wheel velocities in body frame from the wheel positions (xi, yi) of the vehicle: vxi = xdot - r*yi,
+      vyi = ydot + r*xi, and vi their component along the wheel heading
+    - slip angles alpha = delta_i - atan2(vyi, vxi), with the Alpha sign convention of drift_data.csv, and slip
+      ratios kappa = (Omega*R - vi) / |vi|
+    - normal loads: the static loads plus the steady-state lateral load transfer of the lateral acceleration r*xdot
+    - tire forces of the tire model, rotated to the body frame and summed into the body forces and yaw moment
+    The wheels spin with I_w * dOmega/dt = torque - R*fx. The spin rates make the system stiff at low speed or high
+    slip stiffness, so the default method is the adaptive 'rk45', which picks a stable step by itself.
+
+    sim = dual_track_sim()
+    result = sim.simulate(np.arange(0, 10, 0.005), initial_state=initial_states, steering=0.1,
+                          wheel_torques=(0, 0, 300, 300))
+    """
+    state_names = DUAL_TRACK_STATES
+
+    def __init__(self, vehicle=None, mass=1700, yaw_inertia=2900, tire_model=None, wheel_radius=0.32,
+                 wheel_inertia=1.2, cg_height=0.5, min_slip_speed=1.0):
+        """
+        vehicle: the vehicle2d_dual_track providing the wheel positions (front_to_cg, wheel_base, track_widths),
+        default to vehicle2d_dual_track()
+        mass: vehicle mass in kg, a scalar or M values
+        yaw_inertia: yaw moment of inertia in kg*m^2, a scalar or M values
+        tire_model: a tire2d tire_model, or any callable(alpha, kappa, normal_load) of wheel arrays returning the
+        (fx, fy) tire forces in tire frame, default to a linear tire bounded by the friction circle
+        wheel_radius: rolling radius of the wheels in m
+        wheel_inertia: spin inertia of a wheel in kg*m^2
+        cg_height: CG height in m for the lateral load transfer, 0 for static loads
+        min_slip_speed: lower bound in m/s of the wheel speed dividing the slip ratio, keeps it finite at standstill
+        """
+        if vehicle is None:
+            from vehicle2d_dual_track import vehicle2d_dual_track
+            vehicle = vehicle2d_dual_track()
+        self.vehicle = vehicle
+        (self.mass, self.yaw_inertia) = (
+            np.array(values) for values in np.broadcast_arrays(np.atleast_1d(np.asarray(mass, dtype=np.float64)),
+                                                               np.atleast_1d(np.asarray(yaw_inertia, dtype=np.float64))))
+        # wheel positions in body frame as (4, 1) columns, so they broadcast against (4, M) wheel arrays
+        positions = vehicle.calc_tire_centers_batch(np.zeros(1))[0]
+        (self.wheel_x, self.wheel_y) = (positions[:, 0:1], positions[:, 1:2])
+        self.is_front = (np.arange(len(positions)) < vehicle.num_front_tires)[:, None]
+        # share of the vehicle weight on each wheel, and the lateral load transfer per unit of weight and of
+        # lateral acceleration in g
+        a = vehicle.front_to_cg
+        b = vehicle.wheel_base - a
+        axle_share = np.where(self.is_front, b, a) / vehicle.wheel_base
+        track_width = np.where(self.is_front, vehicle.track_widths[0], vehicle.track_widths[1])
+        self.static_share = axle_share / 2
+        self.transfer_share = -np.sign(self.wheel_y) * axle_share * cg_height / track_width
+        if tire_model is None:
+            tire_model = linear_tire_model(cornering_stiffness=80000, longitudinal_stiffness=100000, friction=1.0)
+        self.tire_model = tire_model
+        self.wheel_radius = wheel_radius
+        self.wheel_inertia = wheel_inertia
+        self.min_slip_speed = min_slip_speed
+
+    def wheel_angles(self, steering):
+        """returns the (4, M) wheel angles in body frame for the front wheel angles"""
+        return np.where(self.is_front, steering, 0.0)
+
+    def wheel_velocities(self, state, wheel_angles):
+        """wheel velocities of (10, M) states
+        output:
+        (vx, vy, v) (4, M) arrays: body frame velocity of the wheel centers and its component along the wheel heading
+        """
+        (vx, vy, r) = state[3:6]
+        vxw = vx - r * self.wheel_y
+        vyw = vy + r * self.wheel_x
+        return (vxw, vyw, vxw * np.cos(wheel_angles) + vyw * np.sin(wheel_angles))
+
+    def slips(self, state, wheel_angles):
+        """slip angles and slip ratios of (10, M) states
+        output:
+        (alpha, kappa) (4, M) arrays
+        """
+        (vxw, vyw, v) = self.wheel_velocities(state, wheel_angles)
+        alpha = wheel_angles - np.arctan2(vyw, vxw)
+        kappa = (state[6:10] * self.wheel_radius - v) / np.maximum(np.abs(v), self.min_slip_speed)
+        return (alpha, kappa)
+
+    def normal_loads(self, state):
+        """(4, M) normal loads of (10, M) states"""
+        lateral_acceleration = state[5] * state[3] / GRAVITY
+        return np.maximum(self.static_share + self.transfer_share * lateral_acceleration, 0.0) * self.mass * GRAVITY
+
+    def tire_forces(self, state, steering):
+        """tire forces of (10, M) states
+        steering: front wheel angles in radians
+        output:
+        (fx, fy, alpha, kappa, wheel_angles) (4, M) arrays, the forces in tire frame
+        """
+        wheel_angles = self.wheel_angles(steering)
+        (alpha, kappa) = self.slips(state, wheel_angles)
+        (fx, fy) = self.tire_model(alpha, kappa, self.normal_loads(state))
+        return (fx, fy, alpha, kappa, wheel_angles)
+
+    def derivatives(self, state, steering, wheel_torques):
+        """time derivatives of (10, M) states
+        steering: front wheel angles in radians
+        wheel_torques: drive (positive) or brake (negative) torques of the wheels in N*m, broadcastable to (4, M)
+        """
+        (psi, vx, vy, r) = state[2:6]
+        (fx, fy, _, _, wheel_angles) = self.tire_forces(state, steering)
+        (cos_delta, sin_delta) = (np.cos(wheel_angles), np.sin(wheel_angles))
+        # tire forces rotated from the tire frames to the body frame
+        fxb = fx * cos_delta - fy * sin_delta
+        fyb = fx * sin_delta + fy * cos_delta
+        yaw_moment = (self.wheel_x * fyb - self.wheel_y * fxb).sum(axis=0)
+        (cos_psi, sin_psi) = (np.cos(psi), np.sin(psi))
+        body = np.stack(np.broadcast_arrays(vx * cos_psi - vy * sin_psi,
+                                            vx * sin_psi + vy * cos_psi,
+                                            r,
+                                            fxb.sum(axis=0) / self.mass + r * vy,
+                                            fyb.sum(axis=0) / self.mass - r * vx,
+                                            yaw_moment / self.yaw_inertia))
+        spin = (wheel_torques - self.wheel_radius * fx) / self.wheel_inertia
+        return np.concatenate((body, np.broadcast_to(spin, fx.shape)))
+
+    def simulate(self, times, initial_state=None, steering=0.0, wheel_torques=0.0, method='rk45', substeps=1,
+                 rtol=1e-6, atol=1e-6):
+        """integrate the batch over the output times
+        times: (T,) increasing output times in s, the first one is the time of initial_state
+        initial_state: (10,) or (10, M) initial states in DUAL_TRACK_STATES order, or (6,) or (6, M) body states
+        with freely rolling wheels, default to 10 m/s straight ahead at the origin
+        steering: front wheel angle in radians, see batch_input for the accepted shapes
+        wheel_torques: drive (positive) or brake (negative) torques of the wheels in N*m, see wheel_input
+        method, substeps, rtol, atol: the integration method and its settings, see batch_sim.integrate
+        output:
+        a dual_track_result holding the states and inputs at the output times
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if initial_state is None:
+            initial_state = (0.0, 0.0, 0.0, 10.0, 0.0, 0.0)
+        if len(initial_state) == len(SIM_STATES):
+            body = self.initial_states(initial_state, len(SIM_STATES))
+            (n_vehicles, n_times) = (body.shape[1], len(times))
+            steering = batch_input(steering, n_vehicles, n_times)
+            # freely rolling wheels: the spin rates match the wheel velocities along the wheel headings
+            wheel_angles = self.wheel_angles(input_sampler(times, [steering])(times[0])[0])
+            state = np.concatenate((body, self.wheel_velocities(body, wheel_angles)[2] / self.wheel_radius))
+        else:
+            state = self.initial_states(initial_state)
+        (n_vehicles, n_times) = (state.shape[1], len(times))
+        inputs = [batch_input(steering, n_vehicles, n_times), wheel_input(wheel_torques, n_vehicles, n_times)]
+        (states, input_values, n_steps, n_rejected) = self.integrate(times, state, inputs,
+                                                                     [(n_vehicles,), (4, n_vehicles)],
+                                                                     method, substeps, rtol, atol)
+        return dual_track_result(self, times, states, input_values, n_steps, n_rejected)
+
+class sim_result:
+    """states and inputs of a simulated batch at the output times
+    A subclass computes the drift_data.csv columns of its model in log_columns().
+    times: (T,) output times in s
+    states: (n_states, M, T) states in the state_names order of the simulation
+    n_steps, n_rejected: number of accepted and rejected integration steps
+    """
+
+    def __init__(self, sim, times, states, n_steps, n_rejected=0):
+        self.sim = sim
+        self.times = times
+        self.states = states
+        self.n_steps = n_steps
+        self.n_rejected = n_rejected
+        self._columns = None
+
+    def __len__(self):
+        return self.states.shape[1]
+
+    def log_columns(self):
+        """compute the drift_data.csv columns of the whole batch
+        output:
+        dictionary from LOG_COLUMNS to (M, T) arrays
+        """
+        raise NotImplementedError
+
+    def body_columns(self):
+        """the drift_data.csv columns of the body states, the motion is planar"""
+        (X, Y, psi, vx, vy) = self.states[:5]
+        zeros = np.zeros(X.shape)
+        return {'time': np.broadcast_to(self.times, X.shape), 'X': X, 'Y': Y, 'Z': zeros, 'psi': psi,
+                'Xdot': vx * np.cos(psi) - vy * np.sin(psi), 'Ydot': vx * np.sin(psi) + vy * np.cos(psi),
+                'Zdot': zeros, 'xdot': vx, 'ydot': vy, 'zdot': zeros}
+
+    def to_frame(self, vehicle_num):
+        """returns the DataFrame of one vehicle in the drift_data.csv layout"""
+        columns = self.log_columns()
+        return pd.DataFrame({name: columns[name][vehicle_num] for name in LOG_COLUMNS})
+
+    def write_csv(self, file_pattern, vehicle_nums=None):
+        """write one csv log per vehicle in the drift_data.csv layout
+        file_pattern: file name with a '{}' replaced by the vehicle number, e.g. 'sweep_{}.csv'
+        vehicle_nums: the vehicles to write, default to the whole batch
+        output:
+        the list of written file names
+        """
+        if vehicle_nums is None:
+            vehicle_nums = range(len(self))
+        file_names = []
+        for vehicle_num in vehicle_nums:
+            file_name = file_pattern.format(vehicle_num)
+            self.to_frame(vehicle_num).to_csv(file_name, index=False)
+            file_names.append(file_name)
+        return file_names
+
+    def data_source(self, vehicle_num):
+        """returns an in-memory csv_data_source of one vehicle, e.g. for vehicle_plot(v, data_source=...)"""
+        return csv_data_source(self.to_frame(vehicle_num))
+
+class single_track_result(sim_result):
+    """states and inputs of a single_track_sim batch at the output times
+    steering, fx_front, fx_rear: (M, T) inputs
+    """
+
+    def __init__(self, sim, times, states, inputs, n_steps, n_rejected=0):
+        super(single_track_result, self).__init__(sim, times, states, n_steps, n_rejected)
+        (self.steering, self.fx_front, self.fx_rear) = inputs
+
+    def log_columns(self):
+        """compute the drift_data.csv columns of the whole batch
+        Each axle is split evenly between its left and right tire. The lateral tire forces are written with the
+        sign convention of the Fy columns of drift_data.csv, which point against the body y axis (the log satisfies
+        d(ydot)/dt + r*xdot = -sum(Fy)/m). The wheels roll freely (Kappa = 0).
+        output:
+        dictionary from LOG_COLUMNS to (M, T) arrays
+        """
+        if self._columns is not None:
+            return self._columns
+        sim = self.sim
+        (vx, vy, r) = self.states[3:6]
+        delta = self.steering
+        # the vehicle parameters broadcast along the last axis, so the forces are computed on (6, T, M) states
+        states_t = self.states.transpose(0, 2, 1)
+        (alpha_f, alpha_r) = (alpha.T for alpha in sim.slip_angles(states_t, delta.T))
+        (fy_front, fy_rear) = (force.T for force in sim.lateral_forces(states_t, delta.T, self.fx_front.T,
+                                                                       self.fx_rear.T))
+        # wheel speed from the velocity of the axle along the wheel heading
+        omega_f = (vx * np.cos(delta) + (vy + sim.a * r) * np.sin(delta)) / sim.wheel_radius
+        omega_r = vx / sim.wheel_radius
+        columns = self.body_columns()
+        zeros = columns['Z']
+        per_axle = {'Omega': (omega_f, omega_r), 'Fx': (self.fx_front / 2, self.fx_rear / 2),
+                    'Fy': (-fy_front / 2, -fy_rear / 2), 'Kappa': (zeros, zeros), 'Alpha': (alpha_f, alpha_r)}
+        for (quantity, (front, rear)) in per_axle.items():
+            for i in range(4):
+                columns['%s_%d' % (quantity, i)] = np.broadcast_to(front if i < 2 else rear, vx.shape)
+        self._columns = columns
+        return columns
+
+class dual_track_result(sim_result):
+    """states and inputs of a dual_track_sim batch at the output times
+    steering: (M, T) front wheel angles
+    wheel_torques: (4, M, T) wheel torques
+    """
+
+    def __init__(self, sim, times, states, inputs, n_steps, n_rejected=0):
+        super(dual_track_result, self).__init__(sim, times, states, n_steps, n_rejected)
+        (self.steering, self.wheel_torques) = inputs
+
+    def log_columns(self):
+        """compute the drift_data.csv columns of the whole batch
+        The lateral tire forces are written with the sign convention of the Fy columns of drift_data.csv, see
+        single_track_result.log_columns.
+        output:
+        dictionary from LOG_COLUMNS to (M, T) arrays
+        """
+        if self._columns is not None:
+            return self._columns
+        shape = (4,) + self.states.shape[1:]
+        (fx, fy, alpha, kappa) = (np.empty(shape) for i in range(4))
+        for i in range(len(self.times)):
+            (fx[..., i], fy[..., i], alpha[..., i], kappa[..., i], _) = self.sim.tire_forces(self.states[..., i],
+                                                                                          self.steering[:, i])
+        columns = self.body_columns()
+        per_wheel = {'Omega': self.states[6:10], 'Fx': fx, 'Fy': -fy, 'Kappa': kappa, 'Alpha': alpha}
+        for (quantity, values) in per_wheel.items():
+            for i in range(4):
+                columns['%s_%d' % (quantity, i)] = values[i]
+        self._columns = columns
+        return columns
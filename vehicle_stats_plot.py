@@ -1,10 +1,44 @@
 import matplotlib.pyplot as plt
-import math
 import numpy as np
-import pandas as pd
-import seaborn as sns
 from vehicle2d_single_track import *
 
+# the terms of the sideslip dynamics, betaDot = q4 + q5 + q6 + q7 + q8
+SIDESLIP_TERMS = ('q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q7', 'q8')
+SIDESLIP_LABELS = (r"$\delta$", r"$\beta$", r"$\delta-\beta$", r"$F_{yft}\cos{(\delta-\beta)} / mV$",
+                   r"$F_{xft}\sin{(\delta-\beta)} / mV$", r"$F_{yrt}\cos{\beta} / mV$", r"$-F_{xrt}\sin(\beta) / mV$",
+                   r"$-r$")
+SIDESLIP_RATE_TERMS = ('q4', 'q5', 'q6', 'q7', 'q8') # the terms summing to betaDot
+SIDESLIP_EQUATION = r"$\dot{\beta}=\frac{F_{xft}\sin{(\delta-\beta)}+F_{yft}\cos{(\delta-\beta)}+F_{yrt}\cos{\beta}-F_{xrt}\sin(\beta)}{mV}-r$"
+
+def calc_sideslip_terms_batch(steering, vels_bframe, front_tire_forces, rear_tire_forces, yaw_rates, mass,
+                              speeds=None):
+    """calculate the sideslip dynamics terms q1 to q8 of many samples in one vectorized pass
+    steering: array of N front wheel angles in radian
+    vels_bframe: (N,2) array of body frame velocities (xdot, ydot)
+    front_tire_forces, rear_tire_forces: (N,2) arrays of the axle tire forces (Fx, Fy) in tire frame
+    yaw_rates: array of N yaw rates in rad/s
+    mass: vehicle mass in kg (a scalar or an array of N masses)
+    speeds: scalar or array of N speeds V, default to the magnitude of the body frame velocities
+    output:
+    terms: dictionary from 'q1'..'q8' and 'beta_dot' to arrays of N values
+    """
+    vels_bframe = np.asarray(vels_bframe, dtype=np.float64)
+    (front, rear) = (np.asarray(front_tire_forces, dtype=np.float64), np.asarray(rear_tire_forces, dtype=np.float64))
+    delta = np.asarray(steering, dtype=np.float64)
+    beta = np.arctan2(vels_bframe[..., 1], vels_bframe[..., 0])
+    if speeds is None:
+        speeds = np.hypot(vels_bframe[..., 0], vels_bframe[..., 1])
+    mv = mass * np.asarray(speeds, dtype=np.float64)
+    q3 = delta - beta
+    terms = {'q1': delta * np.ones_like(beta), 'q2': beta, 'q3': q3,
+             'q4': front[..., 1] * np.cos(q3) / mv,
+             'q5': front[..., 0] * np.sin(q3) / mv,
+             'q6': rear[..., 1] * np.cos(beta) / mv,
+             'q7': -rear[..., 0] * np.sin(beta) / mv,
+             'q8': -np.asarray(yaw_rates, dtype=np.float64) * np.ones_like(beta)}
+    terms['beta_dot'] = sum(terms[name] for name in SIDESLIP_RATE_TERMS)
+    return terms
+
 class vehicle_stats_plot:
     """a class to create templated vehicle stats plots"""
     plot_settings = [] # some plot settings TBD
@@ -23,32 +57,88 @@ class vehicle_stats_plot:
         """
         fig,ax = plt.subplots(1,1)
         
-        delta = veh_obj.front_wheel_angle
-        beta = math.atan2(veh_obj.vel_bframe[1],veh_obj.vel_bframe[0])
-        (Fxfb,Fyfb,Fxrb,Fyrb) = veh_obj.calc_force_axles_bframe()
-        Fxft=veh_obj.front_tire.longitudinal_force_tframe
-        Fyft=veh_obj.front_tire.lateral_force_tframe
-        Fxrt=veh_obj.rear_tire.longitudinal_force_tframe
-        Fyrt=veh_obj.rear_tire.lateral_force_tframe
-        m_veh = self.vehicle_info["mass"]
-        V = self.vehicle_info["velocity"]
-        r = veh_obj.yaw_rate
-        
-        q1 = delta
-        q2 = beta
-        q3 = delta-beta
-        q4 = Fyft*math.cos(q3)/m_veh/V
-        q5 = Fxft*math.sin(q3)/m_veh/V
-        q6 = Fyrt*math.cos(beta)/m_veh/V
-        q7 = -Fxrt*math.sin(beta)/m_veh/V
-        q8 = -r
-        
-        df = pd.DataFrame()
-        df['name'] = [r"$\delta$",r"$\beta$",r"$\delta-\beta$",r"$F_{yft}\cos{(\delta-\beta)} / mV$",
-                     r"$F_{xft}\sin{(\delta-\beta)} / mV$",r"$F_{yrt}\cos{\beta} / mV$",r"$-F_{xrt}\sin(\beta) / mV$",r"$-r$"]
-        df['value'] = [q1,q2,q3,q4,q5,q6,q7,q8]
+        front = veh_obj.front_tire
+        rear = veh_obj.rear_tire
+        terms = calc_sideslip_terms_batch([veh_obj.front_wheel_angle], [veh_obj.vel_bframe],
+                                          [(front.longitudinal_force_tframe, front.lateral_force_tframe)],
+                                          [(rear.longitudinal_force_tframe, rear.lateral_force_tframe)],
+                                          [veh_obj.yaw_rate], self.vehicle_info["mass"],
+                                          speeds=self.vehicle_info["velocity"])
         
-        df2 = pd.melt(df, id_vars ='name', var_name='type of change', value_name='change in the output')
-        for typ, df in zip(df2['type of change'].unique(),df2.groupby('type of change')):
-            ax.barh(df[1]['name'], df[1]['change in the output'], height=0.3, label=typ)
-        plt.title(r"$\dot{\beta}=\frac{F_{xft}\sin{(\delta-\beta)}+F_{yft}\cos{(\delta-\beta)}+F_{yrt}\cos{\beta}-F_{xrt}\sin(\beta)}{mV}-r$")
\ No newline at end of file
+        ax.barh(SIDESLIP_LABELS, [terms[name][0] for name in SIDESLIP_TERMS], height=0.3, label='value')
+        plt.title(SIDESLIP_EQUATION)
+
+    def calc_sideslip_terms_by_row_nums(self, plot, row_nums=slice(None), steering=None, yaw_rates=None,
+                                        lateral_force_sign=1):
+        """calculate the sideslip dynamics terms of whole logs in one vectorized pass
+        The axle forces are the sums of the fl/fr and rl/rr tire forces of the log. The yaw rate is the time
+        derivative of the unwrapped heading, and the steering angle is estimated from the front slip angles as
+        delta = alpha + atan2(ydot + r*a, xdot), with a the front axle to CG distance of the plot vehicle. Both are
+        read from the derived channels of the plot instead when they are loaded (see load_derived_channels).
+        plot: the vehicle_plot that provides the data
+        row_nums: array-like of row numbers (or a slice) in the data, default to the whole log
+        steering, yaw_rates: optional arrays of the front wheel angles and yaw rates of the rows, overriding the
+        estimates
+        lateral_force_sign: -1 for logs whose lateral tire forces point opposite the tire y axis (e.g. drift_data.csv)
+        output:
+        terms: dictionary from 'q1'..'q8', 'beta_dot' and 'time' to arrays, one value per row
+        """
+        states = plot.get_states_by_row_nums(row_nums)
+        time = plot.data_source.time[row_nums] if isinstance(row_nums, slice) \
+            else plot.data_source.time[np.asarray(row_nums, dtype=np.intp)]
+        vels_bframe = np.stack((states['xdot'], states['ydot']), axis=-1)
+        derived = plot.derived
+        if derived is not None:
+            rows = row_nums if isinstance(row_nums, slice) else np.asarray(row_nums, dtype=np.intp)
+            yaw_rates = derived['yaw_rate'][rows] if yaw_rates is None else yaw_rates
+            steering = derived['steering'][rows] if steering is None else steering
+        if yaw_rates is None:
+            # central differences, rows sharing a timestamp are bridged by their neighbors
+            (dpsi, dt) = (np.gradient(np.unwrap(states['psi'])), np.gradient(time)) if len(time) > 1 \
+                else (np.zeros(len(time)), np.ones(len(time)))
+            yaw_rates = np.divide(dpsi, dt, out=np.zeros_like(dpsi), where=dt > 0)
+        if steering is None:
+            front_slip = (states['Alpha_0'] + states['Alpha_1']) / 2
+            steering = front_slip + np.arctan2(states['ydot'] + yaw_rates * plot.vehicle.front_to_cg, states['xdot'])
+        axle = lambda quantity, tires: states['%s_%d' % (quantity, tires[0])] + states['%s_%d' % (quantity, tires[1])]
+        front = np.stack((axle('Fx', (0, 1)), lateral_force_sign * axle('Fy', (0, 1))), axis=-1)
+        rear = np.stack((axle('Fx', (2, 3)), lateral_force_sign * axle('Fy', (2, 3))), axis=-1)
+        terms = calc_sideslip_terms_batch(steering, vels_bframe, front, rear, yaw_rates, self.vehicle_info["mass"])
+        terms['time'] = time
+        return terms
+
+    def plot_sideslip_history(self, terms, names=SIDESLIP_RATE_TERMS, ax=None, stacked=False, draw_beta_dot=True):
+        """plot the time histories of sideslip terms computed by calc_sideslip_terms_by_row_nums
+        terms: dictionary of term arrays with a 'time' entry
+        names: the terms to plot
+        ax: the axes to draw on, a new figure is created when None
+        stacked: draw the contributions as stacked areas, positive values stacked above zero and negative values
+        below, so that the dominant term at any time is the widest band
+        draw_beta_dot: whether the sum betaDot is drawn on top as a line
+        output:
+        ax: the axes drawn on
+        """
+        if ax is None:
+            (fig, ax) = plt.subplots(1, 1)
+        time = terms['time']
+        labels = dict(zip(SIDESLIP_TERMS, SIDESLIP_LABELS))
+        if stacked:
+            (upper, lower) = (np.zeros(len(time)), np.zeros(len(time)))
+            for (i, name) in enumerate(names):
+                values = terms[name]
+                color = 'C%d' % i
+                positive = np.maximum(values, 0)
+                negative = np.minimum(values, 0)
+                ax.fill_between(time, upper, upper + positive, color=color, linewidth=0, label=labels.get(name, name))
+                ax.fill_between(time, lower, lower + negative, color=color, linewidth=0)
+                upper = upper + positive
+                lower = lower + negative
+        else:
+            for name in names:
+                ax.plot(time, terms[name], linewidth=1, label=labels.get(name, name))
+        if draw_beta_dot:
+            ax.plot(time, terms['beta_dot'], 'k', linewidth=1, label=r"$\dot{\beta}$")
+        ax.set_xlabel('time (s)')
+        ax.legend(loc='upper right')
+        ax.set_title(SIDESLIP_EQUATION)
+        return ax
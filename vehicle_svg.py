@@ -0,0 +1,224 @@
+# streaming SVG export of vehicle pose sequences without a matplotlib figure
+import math
+import numpy as np
+from lib_graphic import unit_shape, arrow_polygons, points_by_convention
+
+class vehicle_svg:
+    """SVG writer that streams vehicle poses to a file as they are generated
+    The document is written element by element and nothing but the current chunk of poses is held in memory. The
+    shapes shared by every pose (tire outline with its x axis, CG sign, yaw rate arcs) are written once in <defs>
+    and placed per pose with <use transform="translate() rotate()">, and the styles are CSS classes, so a pose costs
+    a few short elements: the body path, the arrows and the <use> references. All coordinates are in meter in the
+    plotting frame of the z_up convention, line widths and dash patterns follow draw_vehicle.
+
+    with vehicle_svg(v, 'drift.svg', xlim=(-50, 50), ylim=(-50, 50)) as svg:
+        svg.write_rows(p, range(0, len(p), 25))
+    """
+
+    def __init__(self, vehicle, svg_file, xlim=(-5, 5), ylim=(-5, 5), width=6.4, z_up=-1, draw_tire_force=True,
+                 draw_vel=True, draw_x_axis=True, draw_labels=False, fl_ratio=2000, vl_ratio=10, precision=3):
+        """
+        vehicle: the vehicle2d subclass instance providing the shapes (body and tire size, number of tires)
+        svg_file: file name or writable text file object of the SVG document
+        xlim, ylim: view limits in plotting coordinates
+        width: width of the document in inches, the height follows from the aspect ratio of the limits
+        z_up: the SAE-670 z-up (or z-down) convention for drawing. 1 for z-up, -1 for z-down
+        draw_tire_force: whether the tire force arrows are drawn
+        draw_vel: whether the body velocity arrows are drawn
+        draw_x_axis: whether the tire x axis dashed lines are drawn
+        draw_labels: whether the "V" and "r" labels are drawn at every pose
+        fl_ratio: force(N)-length(m) ratio of the tire force arrows
+        vl_ratio: velocity(m/s)-length(m) ratio of the velocity arrows
+        precision: number of decimals of the coordinates in meter
+        """
+        self.vehicle = vehicle
+        self.svg_file = svg_file
+        self.xlim = xlim
+        self.ylim = ylim
+        self.width = width
+        self.z_up = z_up
+        self.draw_tire_force = draw_tire_force
+        self.draw_vel = draw_vel
+        self.draw_x_axis = draw_x_axis
+        self.draw_labels = draw_labels
+        self.fl_ratio = fl_ratio
+        self.vl_ratio = vl_ratio
+        self.number = '%%.%df' % precision
+        self.m_per_pt = (xlim[1] - xlim[0]) / (width * 72) # converts matplotlib sizes in points to meter
+        self.cg_radius = 0.1
+        self.file = None
+        self.n_poses = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _points(self, points):
+        """SVG point list 'x,y x,y ...' of (k,2) plotting coordinates"""
+        number = self.number
+        return ' '.join((number + ',' + number) % (x, y) for (x, y) in points)
+
+    def _path(self, points, closed=False):
+        """SVG path data of a (k,2) polyline in plotting coordinates"""
+        return 'M' + self._points(points) + ('Z' if closed else '')
+
+    def _dashed_style(self, linewidth):
+        """stroke width and '--' dash pattern of a matplotlib line width, in meter"""
+        (on, off) = (3.7 * linewidth * self.m_per_pt, 1.6 * linewidth * self.m_per_pt)
+        return 'stroke-width:%g;stroke-dasharray:%g %g' % (linewidth * self.m_per_pt, on, off)
+
+    def open(self):
+        """start the document: header, styles and the shared shapes in <defs>"""
+        if self.file is not None:
+            return
+        if hasattr(self.svg_file, 'write'):
+            (self.file, self.owns_file) = (self.svg_file, False)
+        else:
+            (self.file, self.owns_file) = (open(self.svg_file, 'w'), True)
+        ((x0, x1), (y0, y1)) = (self.xlim, self.ylim)
+        (w, h) = (x1 - x0, y1 - y0)
+        m = self.m_per_pt
+        write = self.file.write
+        write('<?xml version="1.0" encoding="utf-8"?>\n'
+              '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" '
+              'width="%gpt" height="%gpt" viewBox="%g %g %g %g">\n' % (w / m, h / m, x0, -y1, w, h))
+        write('<style>\n'
+              '.body{fill:none;stroke:#0000ff;%s}\n' % self._dashed_style(1.5) +
+              '.tire{fill:none;stroke:#000000;stroke-width:%g}\n' % (1.5 * m) +
+              '.xaxis{fill:none;stroke:#000000;%s}\n' % self._dashed_style(0.5) +
+              '.thin{fill:none;stroke:#000000;stroke-width:%g}\n' % (0.5 * m) +
+              '.fx{fill:#ff0000;stroke:#ff0000;stroke-width:%g}\n' % m +
+              '.fy{fill:#008000;stroke:#008000;stroke-width:%g}\n' % m +
+              '.vel{fill:#000000;stroke:#000000;stroke-width:%g}\n' % m +
+              '.label{font-family:sans-serif;font-style:italic;font-size:%gpx}\n' % (10 * m) +
+              '</style>\n')
+        write('<defs>\n')
+        # tire outline (and x axis) in the tire frame, placed with the tire heading in plotting coordinates
+        (tw, td) = self.vehicle.tire_size
+        write('<g id="tire"><rect class="tire" x="%g" y="%g" width="%g" height="%g"/>' % (-td / 2, -tw / 2, td, tw))
+        if self.draw_x_axis:
+            write('<path class="xaxis" d="M-1,0 1,0"/>')
+        write('</g>\n')
+        # CG sign, fixed on the figure: circle and the filled 90-180 and 270-360 degree quarter sectors, in the y-up
+        # frame of the flipped group it is used in (sweep flag 0 runs clockwise there, 1 counterclockwise)
+        r = self.cg_radius
+        write('<g id="cg"><circle class="thin" r="%g"/>'
+              '<path d="M0,0 L%g,0 A%g,%g 0 0,0 0,%g Z M0,0 L0,%g A%g,%g 0 0,1 %g,0 Z"/></g>\n'
+              % (r, -r, r, r, r, -r, r, r, r))
+        # yaw rate arc arrows at the CG for positive and negative yaw rates, as drawn by arc_arrow
+        for (name, theta2) in (('yaw_pos', 180), ('yaw_neg', -180)):
+            arc = points_by_convention(0.2 * unit_shape('arc', 50, 0, theta2), self.z_up)
+            d = arc[-1] - arc[-2]
+            tip = arc[-1] + d / np.hypot(*d) * 0.1
+            head = arrow_polygons(arc[-2], tip, width=0.001)[0]
+            write('<g id="%s"><path class="thin" d="%s"/><path class="vel" d="%s"/></g>\n'
+                  % (name, self._path(arc), self._path(head, closed=True)))
+        write('</defs>\n')
+        # flip to the y-up plotting frame, every following coordinate is in meter
+        write('<g transform="scale(1,-1)">\n')
+        self.labels = []
+
+    def _angle(self, headings):
+        """rotation in degrees of shapes symmetric about their axes, in plotting coordinates"""
+        headings = np.asarray(headings)
+        return np.degrees(headings if self.z_up == 1 else math.pi / 2 - headings)
+
+    def write_geometry(self, geometry, yaw_rates=None, opacities=None):
+        """stream the poses of a calc_geometry_batch result
+        yaw_rates: optional array of N yaw rates setting the yaw rate arc direction, default to the vehicle's
+        opacities: optional array of N opacities of the poses (e.g. to fade older poses)
+        """
+        if self.file is None:
+            self.open()
+        n = len(geometry['body'])
+        pts = lambda points: points_by_convention(points, self.z_up)
+        bodies = pts(geometry['body'])
+        centers = pts(geometry['tire_centers'])
+        angles = self._angle(geometry['tire_headings'])
+        cgs = pts(geometry['positions'])
+        if yaw_rates is None:
+            yaw_rates = np.full(n, self.vehicle.yaw_rate)
+        arrows = []
+        if self.draw_tire_force and 'fx' in geometry:
+            for key in ('fx', 'fy'):
+                lines = pts(geometry[key])
+                arrows.append((key, arrow_polygons(lines[..., 0, :].reshape(-1, 2),
+                                                   lines[..., 1, :].reshape(-1, 2)).reshape(n, -1, 7, 2)))
+        if self.draw_vel and 'vel' in geometry:
+            vel = pts(geometry['vel'])
+            arrows.append(('vel', arrow_polygons(vel[:, 0], vel[:, 1])[:, None]))
+        number = self.number
+        write = self.file.write
+        for i in range(n):
+            opacity = '' if opacities is None else ' opacity="%.3g"' % opacities[i]
+            write('<g%s>' % opacity)
+            write('<path class="body" d="%s"/>' % self._path(bodies[i]))
+            for (center, angle) in zip(centers[i], angles[i]):
+                write(('<use xlink:href="#tire" transform="translate(' + number + ',' + number + ') rotate(%.2f)"/>')
+                      % (center[0], center[1], angle))
+            (x, y) = cgs[i]
+            write(('<use xlink:href="#cg" transform="translate(' + number + ',' + number + ')"/>') % (x, y))
+            write(('<use xlink:href="#%s" transform="translate(' + number + ',' + number + ')"/>')
+                  % ('yaw_pos' if yaw_rates[i] > 0 else 'yaw_neg', x, y))
+            for (style, polygons) in arrows:
+                write('<path class="%s" d="%s"/>' % (style, ' '.join(self._path(polygon, closed=True)
+                                                                     for polygon in polygons[i])))
+            write('</g>\n')
+            if self.draw_labels:
+                # text is written outside the flipped group, so it is kept upright
+                self.labels.append((x, y + 0.4, 'r'))
+                if 'vel' in geometry:
+                    world = geometry['vel'][i]
+                    angle = math.atan2(world[1, 1] - world[0, 1], world[1, 0] - world[0, 0]) + 5/6 * math.pi
+                    head = pts(world[1])
+                    self.labels.append((head[0] + 0.3 * math.cos(angle), head[1] + 0.3 * math.sin(angle), 'V'))
+        self.n_poses += n
+        if self.labels:
+            self._flush_labels()
+
+    def _flush_labels(self):
+        """write the pending labels in an unflipped group between two flipped ones"""
+        number = self.number
+        write = self.file.write
+        write('</g>\n<g class="label">')
+        for (x, y, text) in self.labels:
+            write(('<text x="' + number + '" y="' + number + '">%s</text>') % (x, -y, text))
+        write('</g>\n<g transform="scale(1,-1)">\n')
+        self.labels = []
+
+    def write_pose(self, opacity=None):
+        """stream the current state of the vehicle as one pose"""
+        vehicle = self.vehicle
+        tire_forces = [[(tire.longitudinal_force_tframe, tire.lateral_force_tframe) for tire in vehicle.get_tires()]]
+        geometry = vehicle.calc_geometry_batch([vehicle.heading], vels_bframe=[vehicle.vel_bframe],
+                                               tire_forces=tire_forces, fl_ratio=self.fl_ratio,
+                                               vl_ratio=self.vl_ratio)
+        self.write_geometry(geometry, opacities=None if opacity is None else [opacity])
+
+    def write_rows(self, plot, row_nums, chunk_size=1024, alpha_range=None):
+        """stream rows of a data log, computing the geometry of chunk_size rows at a time
+        plot: the vehicle_plot that provides the data (its vehicle should be the vehicle of the writer)
+        row_nums: array-like of row numbers in the data
+        alpha_range: optional (oldest, newest) opacity of the poses, interpolated linearly in between
+        """
+        row_nums = np.asarray(row_nums, dtype=np.intp)
+        opacities = None
+        if alpha_range is not None:
+            opacities = np.linspace(alpha_range[0], alpha_range[1], len(row_nums)) if len(row_nums) > 1 \
+                else np.array([alpha_range[1]])
+        for i in range(0, len(row_nums), chunk_size):
+            geometry = plot.calc_geometry_by_row_nums(row_nums[i:i + chunk_size], fl_ratio=self.fl_ratio,
+                                                      vl_ratio=self.vl_ratio)
+            self.write_geometry(geometry, opacities=None if opacities is None else opacities[i:i + chunk_size])
+
+    def close(self):
+        """end the document and close the file if it was opened by the writer"""
+        if self.file is None:
+            return
+        self.file.write('</g>\n</svg>\n')
+        if self.owns_file:
+            self.file.close()
+        self.file = None
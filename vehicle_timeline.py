@@ -0,0 +1,221 @@
+# multi-resolution min/max/mean pyramid of telemetry channels for zoomable timeline panels
+import matplotlib.pyplot as plt
+import math
+import numpy as np
+from numpy.lib import recfunctions
+
+class lod_pyramid:
+    """level-of-detail pyramid of the telemetry channels of a vehicle_plot
+    Level k >= 1 holds the min, max and mean of every channel over consecutive blocks of factor**k samples (in time
+    order), so a window of any length is summarized by at most max_points blocks of the finest level that fits.
+    Level 0 is the log itself and is not stored: it is read from the data source only when a window holds fewer
+    samples than the requested number of points. Like a waveform viewer, the min/max envelope keeps every spike
+    visible whatever the zoom.
+
+    pyramid = lod_pyramid(p, fields=('Fy_0', 'Fy_2', 'psi'))
+    (time, lower, upper, mean) = pyramid.query('Fy_0', 10, 20, max_points=800)
+    """
+
+    def __init__(self, plot, fields=None, channels=None, factor=4, chunk_size=65536):
+        """
+        plot: the vehicle_plot that provides the data
+        fields: the state fields to summarize, default to every state field of the data source
+        channels: optional dictionary of extra per-row arrays to summarize (e.g. the derived channels of the plot)
+        factor: number of blocks of a level merged into one block of the next level
+        chunk_size: number of rows read at a time while building the first level (rounded to a multiple of factor)
+        """
+        self.plot = plot
+        self.fields = tuple(plot.data_source.schema.fields if fields is None else fields)
+        self.channels = dict(channels or {})
+        self.names = self.fields + tuple(self.channels)
+        self.column = {name: i for (i, name) in enumerate(self.names)}
+        self.factor = max(int(factor), 2)
+        self.time = plot.time_sorted
+        self.order = plot.time_order # None when the log is already in time order
+        self.levels = self.build(max(chunk_size // self.factor, 1) * self.factor)
+
+    def rows(self, start, stop):
+        """row numbers (or a slice) of the samples start to stop in time order"""
+        return slice(start, stop) if self.order is None else self.order[start:stop]
+
+    def read(self, start, stop):
+        """read the (n,C) values of every channel for the samples start to stop in time order"""
+        rows = self.rows(start, stop)
+        values = np.empty((stop - start, len(self.names)))
+        if self.fields:
+            states = self.plot.get_states_by_row_nums(rows)
+            # one strided copy of the selected fields rather than a copy per field
+            values[:, :len(self.fields)] = recfunctions.structured_to_unstructured(states[list(self.fields)])
+        for (i, name) in enumerate(self.channels, len(self.fields)):
+            values[:, i] = np.asarray(self.channels[name])[rows]
+        return values
+
+    @staticmethod
+    def reduce(lower, upper, sums, counts, size):
+        """merge consecutive runs of size blocks (the last one may be shorter) of a level into one block each"""
+        n_full = len(counts) - len(counts) % size
+        blocks = lambda values: values[:n_full].reshape((n_full // size, size) + values.shape[1:])
+        merged = [blocks(lower).min(axis=1), blocks(upper).max(axis=1), blocks(sums).sum(axis=1),
+                  blocks(counts).sum(axis=1)]
+        if n_full < len(counts):
+            tails = (lower[n_full:].min(axis=0), upper[n_full:].max(axis=0), sums[n_full:].sum(axis=0),
+                     counts[n_full:].sum(axis=0))
+            merged = [np.concatenate((head, [tail])) for (head, tail) in zip(merged, tails)]
+        return merged
+
+    def build(self, chunk_size):
+        """build the levels, streaming the log chunk by chunk for the first level
+        output:
+        levels: list of dictionaries with 'time' (block start times), 'count', 'min', 'max' and 'mean' arrays, the
+        first entry being None for the unstored level 0
+        """
+        n = len(self.time)
+        parts = []
+        for start in range(0, n, chunk_size):
+            values = self.read(start, min(start + chunk_size, n))
+            parts.append(self.reduce(values, values, values, np.ones(len(values)), self.factor))
+        levels = [None]
+        (lower, upper, sums, counts) = [np.concatenate(arrays) for arrays in zip(*parts)] if parts else \
+            (np.empty((0, len(self.names))),) * 3 + (np.empty(0),)
+        size = self.factor
+        while True:
+            levels.append({'time': self.time[::size], 'count': counts, 'min': lower, 'max': upper,
+                           'mean': sums / np.maximum(counts, 1)[:, None], 'block_size': size})
+            if len(counts) <= 1:
+                return levels
+            (lower, upper, sums, counts) = self.reduce(lower, upper, sums, counts, self.factor)
+            size *= self.factor
+
+    def select_level(self, n_samples, max_points):
+        """returns the finest level that summarizes n_samples consecutive samples in at most max_points blocks"""
+        if n_samples <= max_points:
+            return 0
+        level = int(math.ceil(math.log(n_samples / max(max_points, 1), self.factor)))
+        return min(max(level, 1), len(self.levels) - 1)
+
+    def query(self, name, t0=None, t1=None, max_points=1000):
+        """summarize one channel over a time window in at most about max_points points
+        name: a state field or extra channel name
+        t0, t1: time window, default to the whole log
+        max_points: the number of points that can be shown, typically the pixel width of the panel
+        output:
+        (time, lower, upper, mean): arrays of the block start times and the min, max and mean of the channel per
+        block, the full-resolution samples (lower = upper = mean) when the window is short enough
+        """
+        (i0, i1) = self.window(t0, t1)
+        level = self.select_level(i1 - i0, max_points)
+        if level == 0:
+            rows = self.rows(i0, i1)
+            if name in self.channels:
+                values = np.asarray(self.channels[name])[rows]
+            else:
+                values = self.plot.get_states_by_row_nums(rows)[name].astype(np.float64)
+            return (self.time[i0:i1], values, values, values)
+        blocks = self.levels[level]
+        size = blocks['block_size']
+        (b0, b1) = (i0 // size, -(-i1 // size))
+        column = self.column[name]
+        return (blocks['time'][b0:b1], blocks['min'][b0:b1, column], blocks['max'][b0:b1, column],
+                blocks['mean'][b0:b1, column])
+
+    def window(self, t0=None, t1=None):
+        """returns the (start, stop) sample numbers in time order of the samples between t0 and t1, widened by
+        one sample on each side so that lines run to the window edges"""
+        n = len(self.time)
+        i0 = 0 if t0 is None else max(int(np.searchsorted(self.time, t0, side='right')) - 1, 0)
+        i1 = n if t1 is None else min(int(np.searchsorted(self.time, t1, side='left')) + 1, n)
+        return (i0, max(i1, i0))
+
+    def envelope(self, name, t0=None, t1=None, max_points=1000):
+        """polyline of the min/max envelope of a channel, as drawn by waveform viewers
+        Every block contributes a vertical stroke from its min to its max, so the line needs 2 points per block.
+        output:
+        (time, values) arrays of at most about 2*max_points points
+        """
+        (time, lower, upper, _) = self.query(name, t0, t1, max_points)
+        if lower is upper:
+            return (time, lower)
+        return (np.repeat(time, 2), np.column_stack((lower, upper)).ravel())
+
+class timeline_panel:
+    """time-series panel of telemetry channels drawn from a lod_pyramid
+    The lines always hold O(pixels) points: when the x limits change (zoom, pan or set_window), the channels are
+    queried again at the level matching the panel width. A vertical cursor marks the current time.
+    """
+
+    def __init__(self, pyramid, names, ax=None, draw_mean=True, points_per_pixel=1, line_kwargs=None):
+        """
+        pyramid: the lod_pyramid holding the channels
+        names: the channels to draw
+        ax: Matplotlib axis to draw on.
+        draw_mean: whether the block means are drawn over the min/max envelopes when zoomed out
+        points_per_pixel: number of blocks per horizontal pixel of the panel
+        line_kwargs: passed on to the envelope lines (e.g. linewidth)
+        """
+        if ax is None:
+            ax = plt.gca()
+        self.pyramid = pyramid
+        self.names = tuple(names)
+        self.ax = ax
+        self.draw_mean = draw_mean
+        self.points_per_pixel = points_per_pixel
+        self.line_kwargs = line_kwargs or {}
+        self.artists = []
+        self.updating = False
+
+    def max_points(self):
+        """number of points the panel can show, from its width in pixels"""
+        return max(int(self.ax.bbox.width * self.points_per_pixel), 2)
+
+    def init_artists(self):
+        """create the envelope, mean and cursor lines once and draw the whole log
+        output:
+        artists: list of every artist owned by the panel
+        """
+        ax = self.ax
+        self.envelope_lines = []
+        self.mean_lines = []
+        for (i, name) in enumerate(self.names):
+            color = 'C%d' % i
+            line, = ax.plot([], [], color=color, linewidth=0.5, label=name, **self.line_kwargs)
+            self.envelope_lines.append(line)
+            if self.draw_mean:
+                mean, = ax.plot([], [], color=color, linewidth=1)
+                self.mean_lines.append(mean)
+        self.cursor = ax.axvline(self.pyramid.time[0] if len(self.pyramid.time) else 0, color='k', linewidth=0.5)
+        self.artists = self.envelope_lines + self.mean_lines + [self.cursor]
+        time = self.pyramid.time
+        if len(time):
+            ax.set_xlim(time[0], time[-1])
+        self.refresh()
+        ax.relim()
+        ax.autoscale_view(scalex=False)
+        ax.legend(loc='upper right')
+        ax.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+        return self.artists
+
+    def refresh(self):
+        """query every channel again for the current x limits of the panel"""
+        if self.updating:
+            return
+        self.updating = True
+        (t0, t1) = self.ax.get_xlim()
+        max_points = self.max_points()
+        for (i, name) in enumerate(self.names):
+            (time, lower, upper, mean) = self.pyramid.query(name, t0, t1, max_points)
+            if lower is upper:
+                self.envelope_lines[i].set_data(time, lower)
+            else:
+                self.envelope_lines[i].set_data(np.repeat(time, 2), np.column_stack((lower, upper)).ravel())
+            if self.draw_mean:
+                self.mean_lines[i].set_data(time, mean)
+        self.updating = False
+
+    def set_window(self, t0, t1):
+        """zoom the panel onto a time window, the lines are refreshed through the xlim_changed callback"""
+        self.ax.set_xlim(t0, t1)
+
+    def set_cursor(self, time):
+        """move the cursor line to a time and return it"""
+        self.cursor.set_xdata([time, time])
+        return self.cursor